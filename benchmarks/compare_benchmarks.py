@@ -0,0 +1,62 @@
+import argparse
+import json
+import sys
+
+"""
+Compare two benchmark result files (see run_benchmarks.py), e.g., of two commits. Exits with status 1 if the
+throughput of any corpus or the time of any stage got worse by more than the given threshold.
+"""
+
+
+def relative_change(baseline: float, value: float):
+    return (value - baseline) / baseline if baseline > 0 else 0.0
+
+
+def compare(baseline: dict, results: dict, threshold: float):
+    regressions = []
+    for name, corpus_results in results["corpora"].items():
+        if name not in baseline["corpora"]:
+            continue
+        corpus_baseline = baseline["corpora"][name]
+        print(f"corpus {name}:")
+
+        for key in ["videos_per_second", "end_to_end_videos_per_second"]:
+            change = relative_change(corpus_baseline[key], corpus_results[key])
+            print(f"  {key:<30} {corpus_baseline[key]:10.2f} -> {corpus_results[key]:10.2f} ({change:+.1%})")
+            if change < -threshold:
+                regressions.append(f"{name}: {key}")
+
+        for stage, stage_results in corpus_results["stages"].items():
+            if stage not in corpus_baseline["stages"]:
+                continue
+            baseline_ms, ms = corpus_baseline["stages"][stage]["ms_per_video"], stage_results["ms_per_video"]
+            change = relative_change(baseline_ms, ms)
+            print(f"  {stage + ' (ms/video)':<30} {baseline_ms:10.2f} -> {ms:10.2f} ({change:+.1%})")
+            if change > threshold:
+                regressions.append(f"{name}: {stage}")
+
+        key = "peak_traced_memory_mb"
+        change = relative_change(corpus_baseline[key], corpus_results[key])
+        print(f"  {key:<30} {corpus_baseline[key]:10.2f} -> {corpus_results[key]:10.2f} ({change:+.1%})")
+
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('baseline', type=str)
+    parser.add_argument('results', type=str)
+    # relative change that is reported as regression
+    parser.add_argument('--threshold', type=float, default=0.1)
+    args = parser.parse_args()
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.results, "r", encoding="utf-8") as f:
+        results = json.load(f)
+
+    print(f"baseline: {baseline['commit']}, results: {results['commit']}")
+    regressions = compare(baseline, results, args.threshold)
+    if len(regressions) > 0:
+        print(f"\nregressions (> {args.threshold:.0%}): {', '.join(regressions)}")
+        sys.exit(1)
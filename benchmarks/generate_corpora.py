@@ -0,0 +1,95 @@
+import argparse
+import json
+import os
+import random
+
+"""
+Generate the synthetic captioned event corpora of the benchmark suite. The corpora are generated deterministically
+(fixed seed), i.e., regenerating them results in the same files. Sentences are built like generated captions of Dense
+Video Captioning models (stock phrases, compound nouns, properties, prepositional objects and pronouns).
+"""
+CORPORA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpora")
+
+# name: (number of videos, minimum and maximum number of events per video, seed)
+CORPORA = {
+    "short": (200, 1, 2, 0),
+    "typical": (200, 3, 5, 1),  # ActivityNet Captions has 3.65 events per video on average
+    "long": (40, 20, 40, 2)
+}
+
+SUBJECTS = ["man", "woman", "girl", "boy", "person", "young man", "little girl", "group of people", "dog", "crowd"]
+PRONOUNS = {"man": "he", "woman": "she", "girl": "she", "boy": "he", "person": "he", "young man": "he",
+            "little girl": "she", "group of people": "they", "dog": "it", "crowd": "they"}
+ADJECTIVES = ["red", "large", "small", "white", "black", "blue", "wooden", "old", "young", "green"]
+OBJECTS = ["ball", "frisbee", "guitar", "ice cream", "parking lot", "t-shirt", "peanut butter", "table", "bike",
+           "camera", "swimming pool", "paint brush", "field", "kitchen", "rope", "horse", "car", "knife", "cake"]
+VERB_PHRASES = ["is holding", "throws", "is playing", "rides", "is standing in front of", "walks onto",
+                "is seen speaking to", "picks up", "puts down", "is cutting", "is sitting on", "jumps over",
+                "is running around", "takes out", "is talking to", "kicks", "is cleaning", "brings"]
+STOCK_SENTENCES = ["A man is seen speaking to the camera.", "The video ends with the closing credits.",
+                   "A woman is standing in a kitchen.", "A large group of people are seen standing around."]
+
+
+def generate_sentence(rng: random.Random, previous_subject: str):
+    if rng.random() < 0.15:
+        return rng.choice(STOCK_SENTENCES), previous_subject
+
+    if previous_subject is not None and rng.random() < 0.3:
+        subject = previous_subject
+        subject_str = PRONOUNS[subject].capitalize()
+        verb_phrase = rng.choice(VERB_PHRASES)
+        verb_phrase = verb_phrase.replace("is ", "are ") if subject_str == "They" else verb_phrase
+    else:
+        subject = rng.choice(SUBJECTS)
+        subject_str = rng.choice(["A", "The"]) + " " + subject
+        verb_phrase = rng.choice(VERB_PHRASES)
+
+    obj = rng.choice(OBJECTS)
+    if rng.random() < 0.4:
+        obj = rng.choice(ADJECTIVES) + " " + obj
+    sentence = f"{subject_str} {verb_phrase} a {obj}"
+
+    if rng.random() < 0.3:
+        sentence += f" and {rng.choice(['then', 'quickly', 'slowly'])} {rng.choice(VERB_PHRASES)} the " \
+                    f"{rng.choice(OBJECTS)}"
+
+    return sentence + ".", subject
+
+
+def generate_video(rng: random.Random, n_events: int):
+    duration = round(rng.uniform(30.0, 240.0), 2)
+    sentences, timestamps = [], []
+    subject = None
+    for _ in range(n_events):
+        sentence, subject = generate_sentence(rng, subject)
+        start = round(rng.uniform(0.0, duration * 0.9), 2)
+        end = round(min(duration, start + rng.uniform(2.0, duration * 0.4)), 2)
+        sentences.append(sentence)
+        timestamps.append([start, end])
+
+    return sentences, timestamps
+
+
+def generate_corpus(name: str, path: str):
+    n_videos, min_events, max_events, seed = CORPORA[name]
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        for video_idx in range(n_videos):
+            sentences, timestamps = generate_video(rng, rng.randint(min_events, max_events))
+            record = {"video_id": f"{name}_{video_idx:05d}", "sentences": sentences, "timestamps": timestamps}
+            f.write(json.dumps(record) + "\n")
+
+
+def get_corpus_path(name: str):
+    return os.path.join(CORPORA_DIR, f"{name}.jsonl")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--corpora', type=str, nargs='*', default=list(CORPORA.keys()))
+    args = parser.parse_args()
+
+    os.makedirs(CORPORA_DIR, exist_ok=True)
+    for name in args.corpora:
+        generate_corpus(name, get_corpus_path(name))
+        print(f"generated corpus {name}: {get_corpus_path(name)}")
@@ -0,0 +1,215 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import time
+import tracemalloc
+from collections import defaultdict
+
+import spacy
+
+from src import nlp_lib
+from src.corpus_lib import iter_videos
+from src.entities_lib import EntitiesLib, ExtractionContext
+from src.extraction_lib import RELATION_ENGINES, extract_videos
+from src.utils import sort_by_starting_time
+from src.wordnet_lib import WordNetDictionary, WordNetLemmatizerWrapped
+from benchmarks.generate_corpora import CORPORA, get_corpus_path, generate_corpus
+
+"""
+Reproducible benchmark of the extraction pipeline on the bundled synthetic corpora (see generate_corpora.py).
+Measured are the time per stage (sentence concatenation, spaCy parse, coreference resolution, noun and compound
+detection, properties, relations), videos per second (stage-wise and batched end-to-end) and peak memory.
+The results are written to a JSON file, use compare_benchmarks.py to compare the results of two commits.
+"""
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+STAGES = ["concat", "parse", "coref", "nouns", "properties", "relations"]
+
+
+def get_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_corpus(name: str):
+    path = get_corpus_path(name)
+    if not os.path.isfile(path):
+        generate_corpus(name, path)
+
+    return [(video_id,) + tuple(sort_by_starting_time(sentences, timestamps))
+            for video_id, sentences, timestamps in iter_videos(path)]
+
+
+def benchmark_stages(videos: list, wn_dictionary: WordNetDictionary, wn_lemmatizer: WordNetLemmatizerWrapped,
+                     relation_engine: str = "tokens"):
+    """
+    run the pipeline video by video and measure the time of each stage (and of each spaCy pipeline component)
+    """
+    nlp = nlp_lib.get_nlp()
+    stage_times = defaultdict(float)
+    component_times = defaultdict(float)
+
+    for _, sentences, timestamps in videos:
+        t = time.perf_counter()
+        text = nlp_lib.concat_sentences(sentences, len(sentences))
+        stage_times["concat"] += time.perf_counter() - t
+
+        # run the pipeline components one by one (NeuralCoref is measured as its own stage)
+        t = time.perf_counter()
+        doc = nlp.make_doc(text)
+        component_times["tokenizer"] += time.perf_counter() - t
+        for name, component in nlp.pipeline:
+            t = time.perf_counter()
+            doc = component(doc)
+            component_times[name] += time.perf_counter() - t
+        assert nlp_lib.has_n_sentences(doc, len(sentences)), f"unexpected number of sentences:\n{text}"
+
+        t = time.perf_counter()
+        context = ExtractionContext(doc, wn_dictionary, wn_lemmatizer)
+        stage_times["nouns"] += time.perf_counter() - t
+
+        t = time.perf_counter()
+        EntitiesLib.extract_entities_and_properties(doc, timestamps, wn_dictionary, wn_lemmatizer, context)
+        stage_times["properties"] += time.perf_counter() - t
+
+        t = time.perf_counter()
+        RELATION_ENGINES[relation_engine].extract_relations(doc, timestamps, wn_dictionary, wn_lemmatizer, context)
+        stage_times["relations"] += time.perf_counter() - t
+
+    stage_times["coref"] = component_times.get("neuralcoref", 0.0)
+    stage_times["parse"] = sum(v for k, v in component_times.items() if k != "neuralcoref")
+
+    return stage_times, component_times
+
+
+def benchmark_end_to_end(videos: list, wn_dictionary: WordNetDictionary, wn_lemmatizer: WordNetLemmatizerWrapped,
+                         batch_size: int, relation_engine: str = "tokens"):
+    t = time.perf_counter()
+    for _ in extract_videos(videos, wn_dictionary, wn_lemmatizer, batch_size=batch_size,
+                            relation_engine=relation_engine):
+        pass
+
+    return time.perf_counter() - t
+
+
+def benchmark_memory(videos: list, wn_dictionary: WordNetDictionary, wn_lemmatizer: WordNetLemmatizerWrapped,
+                     batch_size: int):
+    """
+    peak memory allocated by Python during end-to-end extraction (separate run, as tracing slows down the extraction)
+    """
+    tracemalloc.start()
+    for _ in extract_videos(videos, wn_dictionary, wn_lemmatizer, batch_size=batch_size):
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return peak
+
+
+def run_corpus(name: str, wn_dictionary: WordNetDictionary, wn_lemmatizer: WordNetLemmatizerWrapped,
+               repeats: int, batch_size: int, relation_engine: str = "tokens"):
+    videos = load_corpus(name)
+    n_videos = len(videos)
+    n_sentences = sum(len(sentences) for _, sentences, _ in videos)
+
+    # the fastest of all repetitions is reported (least disturbed by other processes)
+    best_stage_times, best_component_times, best_end_to_end = None, None, None
+    for _ in range(repeats):
+        stage_times, component_times = benchmark_stages(videos, wn_dictionary, wn_lemmatizer, relation_engine)
+        if best_stage_times is None or sum(stage_times.values()) < sum(best_stage_times.values()):
+            best_stage_times, best_component_times = stage_times, component_times
+
+        end_to_end = benchmark_end_to_end(videos, wn_dictionary, wn_lemmatizer, batch_size, relation_engine)
+        best_end_to_end = end_to_end if best_end_to_end is None else min(best_end_to_end, end_to_end)
+
+    total_time = sum(best_stage_times[stage] for stage in STAGES)
+
+    return {
+        "n_videos": n_videos,
+        "n_sentences": n_sentences,
+        "stages": {
+            stage: {
+                "total_s": best_stage_times[stage],
+                "ms_per_video": 1000 * best_stage_times[stage] / n_videos,
+                "share": best_stage_times[stage] / total_time if total_time > 0 else 0.0
+            } for stage in STAGES
+        },
+        "components_s": dict(best_component_times),
+        "videos_per_second": n_videos / total_time,
+        "end_to_end_videos_per_second": n_videos / best_end_to_end,
+        "peak_traced_memory_mb": benchmark_memory(videos, wn_dictionary, wn_lemmatizer, batch_size) / (1024 * 1024)
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--corpora', type=str, nargs='*', default=list(CORPORA.keys()))
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--batch_size', type=int, default=64)
+    parser.add_argument('--relation_engine', type=str, default="tokens", choices=list(RELATION_ENGINES.keys()))
+    # language parser: spaCy model, components of the model that are not loaded, and whether to use NeuralCoref
+    parser.add_argument('--model', type=str, default=nlp_lib.DEFAULT_MODEL)
+    parser.add_argument('--disable', type=str, nargs='*', default=None)
+    parser.add_argument('--no_coref', action='store_true')
+    # default: benchmarks/results/<commit>.json
+    parser.add_argument('-o', '--output', type=str, default=None)
+    args = parser.parse_args()
+
+    commit = get_commit()
+    nlp_lib.configure_parser(model=args.model, disable=tuple(args.disable) if args.disable is not None else None,
+                             coref=not args.no_coref)
+
+    # loading WordNet and the language parser is measured separately (cold start)
+    t = time.perf_counter()
+    wn_dictionary = WordNetDictionary()
+    wn_lemmatizer = WordNetLemmatizerWrapped()
+    wordnet_load_time = time.perf_counter() - t
+
+    t = time.perf_counter()
+    nlp_lib.get_nlp()
+    parser_load_time = time.perf_counter() - t
+
+    # warm up (lazily initialized parts of spaCy and NeuralCoref)
+    for _ in extract_videos(load_corpus(args.corpora[0])[:5], wn_dictionary, wn_lemmatizer):
+        pass
+
+    results = {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "spacy": spacy.__version__,
+        "model": nlp_lib.get_model_version(),
+        "repeats": args.repeats,
+        "batch_size": args.batch_size,
+        "relation_engine": args.relation_engine,
+        "wordnet_load_s": wordnet_load_time,
+        "parser_load_s": parser_load_time,
+        "corpora": {}
+    }
+    for name in args.corpora:
+        print(f"benchmarking corpus {name} ...")
+        results["corpora"][name] = run_corpus(name, wn_dictionary, wn_lemmatizer, args.repeats, args.batch_size,
+                                             args.relation_engine)
+
+        corpus_results = results["corpora"][name]
+        print(f"  {corpus_results['videos_per_second']:.1f} videos/s (stage-wise), "
+              f"{corpus_results['end_to_end_videos_per_second']:.1f} videos/s (end-to-end)")
+        for stage in STAGES:
+            print(f"  {stage:<12} {corpus_results['stages'][stage]['ms_per_video']:8.2f} ms/video "
+                  f"({corpus_results['stages'][stage]['share']:.1%})")
+
+    # maximum resident set size of the whole run (kilobytes on Linux)
+    results["max_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    output = args.output if args.output is not None else \
+        os.path.join(RESULTS_DIR, f"{commit[:12] if commit is not None else 'unknown'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"results written to {output}")
@@ -1,6 +1,6 @@
 from src import nlp_lib
-from src.entities_lib import EntitiesLib
-from src.relations_lib import RelationsLib
+from src.extraction_lib import extract_all
+from src.utils import sort_by_starting_time
 from src.wordnet_lib import WordNetDictionary, WordNetLemmatizerWrapped
 
 EXAMPLES = []
@@ -32,27 +32,20 @@ if __name__ == "__main__":
         Event Processing.
         """
         # sort sentences according to their starting times
-        starting_times = [t[0] for t in timestamps]
-        starting_times, timestamps, sentences = (list(t) for t in zip(*sorted(zip(starting_times, timestamps, sentences))))
+        sentences, timestamps = sort_by_starting_time(sentences, timestamps)
 
         # create linguisic annoations with the language parser
         doc = nlp_lib.parse(sentences)
 
 
-        # extract Semantic Metadata
-        semantic_metadata = {}
         """
-        1) Extract video- and event-level entities and entity-property pairs.
+        Extract video- and event-level entities, entity-property pairs and relations (in a single pass).
         """
+        result = extract_all(doc, timestamps, wn_dictionary, wn_lemmatizer)
         video_level_entities, event_level_entities, entity_property_pairs = \
-            EntitiesLib.extract_entities_and_properties(doc, timestamps, wn_dictionary, wn_lemmatizer)
-
-
-        """
-        2) Extract video- and event-level relations.
-        """
+            result.video_level_entities, result.event_level_entities, result.entity_property_pairs
         video_level_relations, event_level_relations = \
-            RelationsLib.extract_relations(doc, timestamps, wn_dictionary, wn_lemmatizer)
+            result.video_level_relations, result.event_level_relations
     
         print("--------------------------------------------------------------")
         print("Timestamps \& Sentences:")
@@ -0,0 +1,151 @@
+import argparse
+import json
+import time
+
+from src import nlp_lib, stats_lib
+from src.cache_lib import ExtractionCache, extract_videos_cached
+from src.columnar_lib import ColumnarWriter
+from src.corpus_lib import iter_videos
+from src.dedup_lib import SentenceCache, extract_videos_deduplicated
+from src.extraction_lib import extract_videos
+from src.index_lib import MetadataIndex
+from src.parallel_lib import extract_videos_parallel
+from src.wordnet_lib import WordNetDictionary, WordNetLemmatizerWrapped
+
+parser = argparse.ArgumentParser()
+# ActivityNet Captions annotations or densecap/PDVC result files (.json), or one video per line (.jsonl)
+parser.add_argument('-i', '--input', type=str, required=True)
+# one JSON record per video: {"video_id": ..., "video_level_entities": [...], ...}
+parser.add_argument('-o', '--output', type=str, required=True)
+# jsonl: output file as above, columnar: output directory of NumPy columns (see src/columnar_lib.py)
+parser.add_argument('--output_format', type=str, default="jsonl", choices=["jsonl", "columnar"])
+parser.add_argument('--batch_size', type=int, default=64)
+# number of worker processes (each loading its own language parser and WordNet), 1 to extract in this process
+parser.add_argument('--n_workers', type=int, default=1)
+# number of videos that are sent to a worker at once
+parser.add_argument('--chunk_size', type=int, default=32)
+# parse and extract each unique sentence only once (for videos without pronouns)
+parser.add_argument('--dedup_sentences', action='store_true')
+# on-disk cache of extraction results (SQLite file), results of already processed captioned events are reused
+parser.add_argument('--cache', type=str, default=None)
+parser.add_argument('--cache_size_mb', type=int, default=1024)
+# inverted index for video retrieval (SQLite file, see search_metadata.py), the results are added to it
+parser.add_argument('--index', type=str, default=None)
+parser.add_argument('--log_every', type=int, default=1000)
+# language parser: spaCy model, components of the model that are not loaded, and whether to use NeuralCoref
+parser.add_argument('--model', type=str, default=nlp_lib.DEFAULT_MODEL)
+# (default: NER is only disabled with --no_coref, as NeuralCoref uses it)
+parser.add_argument('--disable', type=str, nargs='*', default=None)
+parser.add_argument('--no_coref', action='store_true')
+# collect per-video statistics (stage timings, counters of hot paths), they are added to each record as "stats"
+# and an aggregated report is printed (and written to stats_output if given)
+parser.add_argument('--stats', action='store_true')
+parser.add_argument('--stats_output', type=str, default=None)
+args = parser.parse_args()
+if args.stats and args.output_format == "columnar":
+    # the columnar format has no columns for the per-video statistics, i.e., they would be lost
+    parser.error("--stats can only be used with --output_format jsonl")
+
+
+if __name__ == "__main__":
+
+    nlp_lib.configure_parser(model=args.model, disable=tuple(args.disable) if args.disable is not None else None,
+                             coref=not args.no_coref)
+    stats_lib.enable(args.stats)
+    stats_report = stats_lib.StatsReport()
+
+    # videos are streamed from the input file, parsed in batches and written one at a time
+    videos = iter_videos(args.input)
+    sentence_cache = None
+    coref_stats = {}
+    if args.n_workers > 1:
+        def extract(v):
+            return extract_videos_parallel(v, args.n_workers, chunk_size=args.chunk_size, batch_size=args.batch_size,
+                                           dedup_sentences=args.dedup_sentences, coref_stats=coref_stats)
+    else:
+        # load WordNet
+        wn_dictionary = WordNetDictionary()
+        wn_lemmatizer = WordNetLemmatizerWrapped()
+
+        if args.dedup_sentences:
+            sentence_cache = SentenceCache(wn_dictionary, wn_lemmatizer)
+
+            def extract(v):
+                return extract_videos_deduplicated(v, wn_dictionary, wn_lemmatizer, args.batch_size, sentence_cache)
+        else:
+            def extract(v):
+                return extract_videos(v, wn_dictionary, wn_lemmatizer, batch_size=args.batch_size)
+
+    cache = None
+    if args.cache is not None:
+        cache = ExtractionCache(args.cache, max_size_bytes=args.cache_size_mb * 1024 * 1024,
+                                dedup_sentences=args.dedup_sentences)
+        results = extract_videos_cached(videos, cache, extract)
+    else:
+        results = extract(videos)
+
+    index = MetadataIndex(args.index, WordNetLemmatizerWrapped()) if args.index is not None else None
+
+    n_videos, n_failed = 0, 0
+    start_time = time.time()
+
+    columnar = args.output_format == "columnar"
+    with (ColumnarWriter(args.output) if columnar else open(args.output, "w", encoding="utf-8")) as f:
+        for video_id, result in results:
+            n_videos += 1
+            if result is None:
+                n_failed += 1
+                print(f"video {video_id} could not be parsed, skipping it")
+                continue
+
+            if args.stats and result.stats is not None:
+                stats_report.add(result.stats)
+
+            if index is not None:
+                index.add(video_id, result, commit=n_videos % args.log_every == 0)
+
+            if columnar:
+                f.add(video_id, result)
+            else:
+                record = {"video_id": video_id}
+                record.update(result.to_dict())
+                if args.stats and result.stats is not None:
+                    record["stats"] = result.stats
+                f.write(json.dumps(record) + "\n")
+
+            if n_videos % args.log_every == 0:
+                print(f"{n_videos} videos processed ({n_videos / (time.time() - start_time):.1f} videos/s)")
+
+    print(f"processed {n_videos} videos ({n_failed} failed) in {time.time() - start_time:.1f}s, "
+          f"results written to {args.output}")
+
+    if not args.no_coref:
+        if args.n_workers <= 1:
+            coref_stats = nlp_lib.get_coref_stats()
+        if coref_stats.get("docs", 0) > 0:
+            print(f"coreference resolution skipped for {coref_stats['coref_skipped']} of {coref_stats['docs']} docs "
+                  f"without pronouns ({coref_stats['coref_skipped'] / coref_stats['docs']:.1%})")
+
+    if sentence_cache is not None:
+        dedup_stats = sentence_cache.stats()
+        print(f"sentence deduplication: {dedup_stats['stitched_videos']} videos stitched from "
+              f"{dedup_stats['parsed_sentences']} parsed sentences ({dedup_stats['reused_sentences']} reused), "
+              f"{dedup_stats['parsed_videos']} videos parsed as a whole "
+              f"({dedup_stats['mismatched_videos']} because of a different parse within the video)")
+
+    if args.stats:
+        print(stats_report.to_string())
+        if args.stats_output is not None:
+            with open(args.stats_output, "w", encoding="utf-8") as f:
+                json.dump(stats_report.to_dict(), f, indent=2)
+
+    if index is not None:
+        print(f"index: {len(index)} videos indexed in {args.index}")
+        index.close()
+
+    if cache is not None:
+        cache_stats = cache.stats()
+        cache.close()
+        print(f"cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+              f"(hit rate {cache_stats['hit_rate']:.1%}), {cache_stats['n_results']} results "
+              f"({cache_stats['size_bytes'] / (1024 * 1024):.1f} MB)")
@@ -1,8 +1,7 @@
 import argparse
 
 from src import nlp_lib
-from src.entities_lib import EntitiesLib
-from src.relations_lib import RelationsLib
+from src.extraction_lib import extract_all
 from src.wordnet_lib import WordNetDictionary, WordNetLemmatizerWrapped
 
 parser = argparse.ArgumentParser()
@@ -30,15 +29,11 @@ if __name__ == "__main__":
     # create linguistic annotations using the language parser
     doc = nlp_lib.parse(sentences)
 
-    # 1) extract video- and event-level entities and entity-property pairs
-    video_level_entities, _, entity_property_pairs = EntitiesLib.extract_entities_and_properties(
-        doc, timestamps, wn_dictionary, wn_lemmatizer
-    )
-
-    # 2) extract video- and event-level relations
-    video_level_relations, _ = RelationsLib.extract_relations(
-        doc, timestamps, wn_dictionary, wn_lemmatizer
-    )
+    # extract video- and event-level entities, entity-property pairs and relations
+    result = extract_all(doc, timestamps, wn_dictionary, wn_lemmatizer)
+    video_level_entities = result.video_level_entities
+    entity_property_pairs = result.entity_property_pairs
+    video_level_relations = result.video_level_relations
 
     # print results
     print(f"--------------------------------------------------------------\n"
@@ -0,0 +1,57 @@
+import argparse
+import asyncio
+import sys
+
+from src import nlp_lib
+from src.service_lib import DEFAULT_MAX_BATCH_SIZE, DEFAULT_MAX_LATENCY_MS, ExtractionService
+from src.wordnet_lib import WordNetDictionary, WordNetLemmatizerWrapped
+
+parser = argparse.ArgumentParser()
+# Unix socket to serve on, requests are read from stdin (and responses written to stdout) if not given
+parser.add_argument('--socket', type=str, default=None)
+# a micro-batch is processed when it is full or max_latency_ms after its first request arrived
+parser.add_argument('--max_batch_size', type=int, default=DEFAULT_MAX_BATCH_SIZE)
+parser.add_argument('--max_latency_ms', type=float, default=DEFAULT_MAX_LATENCY_MS)
+# language parser: spaCy model, components of the model that are not loaded, and whether to use NeuralCoref
+parser.add_argument('--model', type=str, default=nlp_lib.DEFAULT_MODEL)
+# (default: NER is only disabled with --no_coref, as NeuralCoref uses it)
+parser.add_argument('--disable', type=str, nargs='*', default=None)
+parser.add_argument('--no_coref', action='store_true')
+args = parser.parse_args()
+
+
+async def main(output):
+    service = ExtractionService(wn_dictionary, wn_lemmatizer, args.max_batch_size, args.max_latency_ms)
+    await service.start()
+    try:
+        if args.socket is not None:
+            print(f"serving on {args.socket}")
+            await service.serve_unix(args.socket)
+        else:
+            await service.serve_stdio(output)
+    finally:
+        await service.stop()
+        stats = service.stats()
+        print(f"served {stats['requests']} requests in {stats['batches']} batches "
+              f"(mean batch size {stats['mean_batch_size']:.1f})")
+
+
+if __name__ == "__main__":
+
+    # with stdin/stdout, stdout is reserved for responses, all messages are printed to stderr instead
+    output = sys.stdout
+    if args.socket is None:
+        sys.stdout = sys.stderr
+
+    nlp_lib.configure_parser(model=args.model, disable=tuple(args.disable) if args.disable is not None else None,
+                             coref=not args.no_coref)
+
+    # load the language parser and WordNet before serving the first request
+    nlp_lib.get_nlp()
+    wn_dictionary = WordNetDictionary()
+    wn_lemmatizer = WordNetLemmatizerWrapped()
+
+    try:
+        asyncio.run(main(output))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,50 @@
+import argparse
+import json
+
+from src.index_lib import MetadataIndex
+from src.semantic_metadata.extraction_result import ExtractionResult
+from src.wordnet_lib import WordNetLemmatizerWrapped
+
+parser = argparse.ArgumentParser()
+# inverted index (SQLite file), e.g. built by extract_from_corpus.py --index
+parser.add_argument('-i', '--index', type=str, required=True)
+# add the results of extract_from_corpus.py (.jsonl) to the index before searching
+parser.add_argument('--add', type=str, nargs='*', default=[])
+# each query clause is a comma-separated list of terms (OR), all clauses have to match (AND), e.g.,
+# -q entity:dog -q "svo:dog|chase|frisbee,svo:dog|catch|frisbee"
+parser.add_argument('-q', '--query', type=str, action='append', default=[])
+parser.add_argument('--synonyms', action='store_true')
+# print the temporal segments of the events in which the query terms occur
+parser.add_argument('--spans', action='store_true')
+args = parser.parse_args()
+
+
+def read_results(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip() == "":
+                continue
+            record = json.loads(line)
+            yield record["video_id"], ExtractionResult.from_dict(record)
+
+
+if __name__ == "__main__":
+
+    index = MetadataIndex(args.index, WordNetLemmatizerWrapped())
+    for path in args.add:
+        index.add_many(read_results(path))
+        print(f"added {path}, {len(index)} videos indexed")
+
+    if len(args.query) > 0:
+        clauses = [[term.strip() for term in clause.split(",") if term.strip() != ""] for clause in args.query]
+        video_ids = index.search(clauses, with_synonyms=args.synonyms)
+        print(f"{len(video_ids)} videos found")
+
+        terms = [term for clause in clauses for term in clause]
+        for video_id in video_ids:
+            if args.spans:
+                print(f"{video_id}: {index.spans(video_id, terms, with_synonyms=args.synonyms)}")
+            else:
+                print(video_id)
+
+    index.close()
@@ -0,0 +1,191 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from collections import deque
+
+from . import nlp_lib
+from .extraction_lib import EXTRACTION_RULES_VERSION
+from .semantic_metadata.extraction_result import ExtractionResult
+from .utils import sort_by_starting_time
+
+
+# number of cache hits whose access times are buffered before they are written (see ExtractionCache.get)
+ACCESS_BUFFER_SIZE = 1024
+
+
+class ExtractionCache:
+    """
+    content-addressed on-disk cache (SQLite) of extraction results. Results are keyed by a hash of the normalized
+    sentences, the timestamps, the language parser (model and configuration), the extraction mode (sentence
+    deduplication, relation engine) and the version of the extraction rules, i.e., the same captioned events are only
+    parsed and extracted once, no matter to which video they belong.
+    When the cache grows larger than max_size_bytes, the least recently used results are evicted
+    """
+
+    def __init__(self,
+                 path: str,
+                 max_size_bytes: int = 1 << 30,
+                 model_version: str = None,
+                 dedup_sentences: bool = False,
+                 relation_engine: str = "tokens"):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS results "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS results_last_access ON results (last_access)")
+        self.connection.commit()
+
+        self.max_size_bytes = max_size_bytes
+        self.model_version = model_version if model_version is not None else nlp_lib.get_model_version()
+        parser_config = nlp_lib.get_parser_config()
+        self.extraction_config = {
+            "disable": sorted(parser_config["disable"]),
+            "coref": parser_config["coref"],
+            "dedup_sentences": dedup_sentences,
+            "relation_engine": relation_engine
+        }
+        self.size_bytes = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+        # access times of cache hits that are not written yet (key -> time)
+        self.accesses = {}
+
+
+    def key(self, sentences: list, timestamps: list) -> str:
+        """
+        content-based key of captioned events (the order of the events does not matter, as they are sorted by
+        starting time before extraction)
+        """
+        sentences, timestamps = sort_by_starting_time(sentences, timestamps)
+        content = {
+            "sentences": [nlp_lib.process_sentence(s) for s in sentences],
+            "timestamps": timestamps,
+            "model": self.model_version,
+            "config": self.extraction_config,
+            "rules": EXTRACTION_RULES_VERSION
+        }
+
+        return hashlib.sha256(json.dumps(content, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+    def get(self, key: str):
+        """
+        get the cached result, None when there is no result for the key
+        """
+        row = self.connection.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        # access times are written in batches (on put, close, or when the buffer is full), i.e., reads do not commit
+        self.accesses[key] = time.time()
+        if len(self.accesses) >= ACCESS_BUFFER_SIZE:
+            self.__write_accesses()
+            self.connection.commit()
+
+        return ExtractionResult.from_dict(json.loads(row[0]))
+
+
+    def put(self, key: str, result: ExtractionResult):
+        value = json.dumps(result.to_dict())
+        size = len(value)
+
+        row = self.connection.execute("SELECT size FROM results WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            self.size_bytes -= row[0]
+        self.connection.execute(
+            "INSERT OR REPLACE INTO results (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+            (key, value, size, time.time()))
+        self.size_bytes += size
+        self.accesses.pop(key, None)
+
+        # eviction has to know the recent accesses
+        self.__write_accesses()
+        self.__evict()
+        self.connection.commit()
+
+
+    def __write_accesses(self):
+        if len(self.accesses) > 0:
+            self.connection.executemany("UPDATE results SET last_access = ? WHERE key = ?",
+                                        ((t, key) for key, t in self.accesses.items()))
+            self.accesses = {}
+
+
+    def __evict(self):
+        """
+        evict the least recently used results until the cache is not larger than max_size_bytes
+        """
+        while self.size_bytes > self.max_size_bytes:
+            rows = self.connection.execute(
+                "SELECT key, size FROM results ORDER BY last_access LIMIT 64").fetchall()
+            if len(rows) == 0:
+                self.size_bytes = 0
+                return
+
+            for key, size in rows:
+                self.connection.execute("DELETE FROM results WHERE key = ?", (key,))
+                self.size_bytes -= size
+                if self.size_bytes <= self.max_size_bytes:
+                    return
+
+
+    def hit_rate(self) -> float:
+        n_requests = self.hits + self.misses
+        return self.hits / n_requests if n_requests > 0 else 0.0
+
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate(),
+            "size_bytes": self.size_bytes,
+            "n_results": self.connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        }
+
+
+    def close(self):
+        self.__write_accesses()
+        self.connection.commit()
+        self.connection.close()
+
+
+
+def extract_videos_cached(videos, cache: ExtractionCache, extract):
+    """
+    extract semantic metadata for a stream of (video_id, sentences, timestamps) tuples, only videos that are not cached
+    are forwarded to extract (e.g. extract_videos or extract_videos_parallel), whose results are then cached.
+    Yields (video_id, result) tuples in input order
+    """
+    # all videos in input order, with their key and, if cached, their result
+    pending = deque()
+
+    def uncached_videos():
+        for video_id, sentences, timestamps in videos:
+            key = cache.key(sentences, timestamps)
+            result = cache.get(key)
+            pending.append((video_id, key, result))
+            if result is None:
+                yield video_id, sentences, timestamps
+
+    for video_id, result in extract(uncached_videos()):
+        # cached videos that come before the extracted video
+        while pending[0][2] is not None:
+            cached_video_id, _, cached_result = pending.popleft()
+            yield cached_video_id, cached_result
+
+        _, key, _ = pending.popleft()
+        if result is not None:
+            cache.put(key, result)
+        yield video_id, result
+
+    while len(pending) > 0:
+        cached_video_id, _, cached_result = pending.popleft()
+        yield cached_video_id, cached_result
@@ -0,0 +1,349 @@
+import json
+import os
+import struct
+from array import array
+
+import numpy as np
+
+from .semantic_metadata.entity_property import EntityPropertyPair
+from .semantic_metadata.event_entity import EventEntity
+from .semantic_metadata.event_relation import EventRelation
+from .semantic_metadata.extraction_result import ExtractionResult
+from .semantic_metadata.video_entity import VideoEntity
+from .semantic_metadata.video_relation import VideoRelation
+
+"""
+Columnar storage of extraction results: a directory of NumPy (.npy) files, one file per column.
+All strings of the metadata (entity names, properties, verbs, modifiers) are dictionary-encoded, i.e., stored once in a
+UTF-8 blob and referenced by int32 ids, video ids are stored in a UTF-8 blob of their own (with offsets).
+Timestamps are stored as float32 (n x 2) arrays. For each category, the items of all videos are concatenated and
+video_offsets[i]:video_offsets[i + 1] are the items of the i-th video, lists of strings of relations (subjects,
+modifiers, objects) are stored the same way (offsets and values).
+Columns are written in row groups, i.e., only the columns of the last row_group_size videos (and the string dictionary)
+are kept in memory. Columns are loaded on first access and memory-mapped by default, strings are decoded on access.
+"""
+COLUMNAR_FORMAT = 2
+
+# number of videos whose columns are buffered before they are appended to the column files
+DEFAULT_ROW_GROUP_SIZE = 1024
+
+# columns of each category: string columns, string list columns, and whether the items have timestamps
+CATEGORIES = {
+    "video_level_entities": (["name"], [], False),
+    "event_level_entities": (["name"], [], True),
+    "entity_property_pairs": (["entity", "property"], [], False),
+    "video_level_relations": (["verb"], ["subjects", "modifiers", "objects"], False),
+    "event_level_relations": (["verb"], ["subjects", "modifiers", "objects"], True)
+}
+
+
+def _column_path(path: str, category: str, column: str) -> str:
+    return os.path.join(path, f"{category}.{column}.npy")
+
+
+
+class _ColumnFile:
+    """
+    .npy file of a single column, which is written incrementally: values are buffered and appended to the file on
+    flush, the header (which contains the number of rows) is written again when the file is closed
+    """
+    # size of the header, which is padded, i.e., it does not change when it is written again
+    HEADER_SIZE = 128
+
+    def __init__(self, path: str, dtype, typecode: str, row_size: int = 1):
+        self.dtype = np.dtype(dtype)
+        self.row_size = row_size
+        self.buffer = array(typecode)
+        self.n_written_values = 0
+
+        self.file = open(path, "wb")
+        self.__write_header(0)
+
+
+    @property
+    def n_values(self) -> int:
+        return self.n_written_values + len(self.buffer)
+
+
+    def append(self, value):
+        self.buffer.append(value)
+
+
+    def extend(self, values):
+        self.buffer.extend(values)
+
+
+    def extend_bytes(self, values: bytes):
+        self.buffer.frombytes(values)
+
+
+    def flush(self):
+        if len(self.buffer) > 0:
+            self.file.write(np.asarray(self.buffer, dtype=self.dtype).tobytes())
+            self.n_written_values += len(self.buffer)
+            self.buffer = array(self.buffer.typecode)
+
+
+    def close(self):
+        self.flush()
+        self.file.seek(0)
+        self.__write_header(self.n_written_values // self.row_size)
+        self.file.close()
+
+
+    def __write_header(self, n_rows: int):
+        shape = (n_rows,) if self.row_size == 1 else (n_rows, self.row_size)
+        header = repr({"descr": np.lib.format.dtype_to_descr(self.dtype), "fortran_order": False, "shape": shape})
+        magic = np.lib.format.magic(1, 0)
+        header_length = self.HEADER_SIZE - len(magic) - 2
+        assert len(header) < header_length, f"header of column with shape {shape} is too long"
+        header = (header.ljust(header_length - 1) + "\n").encode("latin1")
+        self.file.write(magic + struct.pack("<H", header_length) + header)
+
+
+
+class _LazyStrings:
+    """
+    strings of a UTF-8 blob (values) with offsets, each string is only decoded when it is accessed
+    (and memoized if memoize is True)
+    """
+
+    def __init__(self, offsets: np.ndarray, values: np.ndarray, memoize: bool = True):
+        self.offsets = offsets
+        self.values = values
+        self.decoded = {} if memoize else None
+
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+
+    def __getitem__(self, idx) -> str:
+        idx = int(idx)
+        if self.decoded is not None and idx in self.decoded:
+            return self.decoded[idx]
+
+        s = self.values[self.offsets[idx]:self.offsets[idx + 1]].tobytes().decode("utf-8")
+        if self.decoded is not None:
+            self.decoded[idx] = s
+
+        return s
+
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+
+
+class ColumnarWriter:
+    """
+    writes extraction results of videos to a directory in the columnar format (see above), e.g.,
+        with ColumnarWriter("metadata") as writer:
+            writer.add(video_id, result)
+    """
+
+    def __init__(self, path: str, timestamp_dtype=np.float32, row_group_size: int = DEFAULT_ROW_GROUP_SIZE):
+        assert row_group_size > 0, "row group size should be positive"
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.timestamp_dtype = np.dtype(timestamp_dtype)
+        self.row_group_size = row_group_size
+
+        self.string_ids = {}
+        self.n_videos = 0
+        self.n_items = dict.fromkeys(CATEGORIES, 0)
+        self.columns = {}
+        for category, (string_columns, list_columns, has_timestamps) in CATEGORIES.items():
+            self.__add_column(category, "video_offsets", np.int64, "q").append(0)
+            for column in string_columns:
+                self.__add_column(category, column, np.int32, "i")
+            for column in list_columns:
+                self.__add_column(category, f"{column}.offsets", np.int64, "q").append(0)
+                self.__add_column(category, f"{column}.values", np.int32, "i")
+            if has_timestamps:
+                self.__add_column(category, "timestamp", self.timestamp_dtype, "d", row_size=2)
+        self.__add_column("videos", "id.offsets", np.int64, "q").append(0)
+        self.__add_column("videos", "id.values", np.uint8, "B")
+
+
+    def __add_column(self, category: str, column: str, dtype, typecode: str, row_size: int = 1) -> _ColumnFile:
+        self.columns[(category, column)] = _ColumnFile(_column_path(self.path, category, column), dtype, typecode,
+                                                       row_size)
+        return self.columns[(category, column)]
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+    def __len__(self) -> int:
+        return self.n_videos
+
+
+    def __string_id(self, s: str) -> int:
+        return self.string_ids.setdefault(s, len(self.string_ids))
+
+
+    def add(self, video_id: str, result: ExtractionResult):
+        """
+        append the extraction result of a video
+        """
+        video_ids = self.columns[("videos", "id.values")]
+        video_ids.extend_bytes(video_id.encode("utf-8"))
+        self.columns[("videos", "id.offsets")].append(video_ids.n_values)
+
+        for category, (string_columns, list_columns, has_timestamps) in CATEGORIES.items():
+            items = getattr(result, category)
+            for column in string_columns:
+                self.columns[(category, column)].extend(self.__string_id(getattr(item, column)) for item in items)
+            for column in list_columns:
+                values = self.columns[(category, f"{column}.values")]
+                offsets = self.columns[(category, f"{column}.offsets")]
+                for item in items:
+                    values.extend(self.__string_id(s) for s in getattr(item, column))
+                    offsets.append(values.n_values)
+            if has_timestamps:
+                timestamps = self.columns[(category, "timestamp")]
+                for item in items:
+                    timestamps.extend(item.timestamp)
+
+            self.n_items[category] += len(items)
+            self.columns[(category, "video_offsets")].append(self.n_items[category])
+
+        self.n_videos += 1
+        if self.n_videos % self.row_group_size == 0:
+            for column in self.columns.values():
+                column.flush()
+
+
+    def close(self):
+        """
+        write the remaining rows of all columns, the string dictionary and the metadata of the directory
+        """
+        if self.columns is None:
+            return
+
+        for column in self.columns.values():
+            column.close()
+
+        # string dictionary: UTF-8 blob and the offset of each string in it
+        encoded = [s.encode("utf-8") for s in self.string_ids]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        np.save(_column_path(self.path, "strings", "offsets"), offsets)
+        np.save(_column_path(self.path, "strings", "values"), np.frombuffer(b"".join(encoded), dtype=np.uint8))
+
+        with open(os.path.join(self.path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "format": COLUMNAR_FORMAT,
+                "n_videos": self.n_videos,
+                "n_strings": len(encoded),
+                "timestamp_dtype": self.timestamp_dtype.name
+            }, f, indent=2)
+
+        self.columns = None
+
+
+
+class ColumnarReader:
+    """
+    reads extraction results from a directory in the columnar format. Columns are loaded (memory-mapped if mmap is True)
+    on first access, i.e., analytics jobs only read the columns they use, e.g.,
+        reader.column("event_level_entities", "timestamp")
+    """
+
+    def __init__(self, path: str, mmap: bool = True):
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        assert self.meta.get("format") == COLUMNAR_FORMAT, \
+            f"{path} is not in columnar format version {COLUMNAR_FORMAT}"
+
+        self.path = path
+        self.mmap_mode = "r" if mmap else None
+        self.loaded_columns = {}
+        self.__strings = None
+
+
+    def __len__(self) -> int:
+        return self.meta["n_videos"]
+
+
+    def column(self, category: str, column: str) -> np.ndarray:
+        """
+        a single column, e.g., ("event_level_relations", "verb") or ("event_level_relations", "subjects.values")
+        """
+        key = (category, column)
+        if key not in self.loaded_columns:
+            self.loaded_columns[key] = np.load(_column_path(self.path, category, column), mmap_mode=self.mmap_mode)
+
+        return self.loaded_columns[key]
+
+
+    @property
+    def strings(self) -> _LazyStrings:
+        """
+        string dictionary (strings are decoded on access), the string columns contain indices into it
+        """
+        if self.__strings is None:
+            self.__strings = _LazyStrings(self.column("strings", "offsets"), self.column("strings", "values"))
+
+        return self.__strings
+
+
+    @property
+    def video_ids(self) -> _LazyStrings:
+        return _LazyStrings(self.column("videos", "id.offsets"), self.column("videos", "id.values"), memoize=False)
+
+
+    def get(self, idx: int, categories=None) -> ExtractionResult:
+        """
+        extraction result of the idx-th video, only the given categories are read (all others are empty)
+        """
+        categories = CATEGORIES if categories is None else categories
+        items = {category: self.__get_items(category, idx) if category in categories else [] for category in CATEGORIES}
+
+        return ExtractionResult(**items)
+
+
+    def __iter__(self):
+        """
+        (video_id, result) of each video
+        """
+        for idx, video_id in enumerate(self.video_ids):
+            yield video_id, self.get(idx)
+
+
+    def __get_items(self, category: str, idx: int) -> list:
+        string_columns, list_columns, has_timestamps = CATEGORIES[category]
+        video_offsets = self.column(category, "video_offsets")
+        start, end = int(video_offsets[idx]), int(video_offsets[idx + 1])
+        strings = self.strings
+
+        fields = {column: [strings[i] for i in self.column(category, column)[start:end]] for column in string_columns}
+        for column in list_columns:
+            offsets = self.column(category, f"{column}.offsets")[start:end + 1]
+            values = self.column(category, f"{column}.values")[offsets[0]:offsets[-1]]
+            fields[column] = [
+                [strings[i] for i in values[offsets[k] - offsets[0]:offsets[k + 1] - offsets[0]]]
+                for k in range(end - start)
+            ]
+        if has_timestamps:
+            fields["timestamp"] = self.column(category, "timestamp")[start:end].tolist()
+
+        if category == "video_level_entities":
+            return [VideoEntity(name) for name in fields["name"]]
+        if category == "event_level_entities":
+            return [EventEntity(name, t) for name, t in zip(fields["name"], fields["timestamp"])]
+        if category == "entity_property_pairs":
+            return [EntityPropertyPair(e, p) for e, p in zip(fields["entity"], fields["property"])]
+        if category == "video_level_relations":
+            return [VideoRelation(*r) for r in
+                    zip(fields["subjects"], fields["verb"], fields["modifiers"], fields["objects"])]
+
+        return [EventRelation(*r) for r in
+                zip(fields["subjects"], fields["verb"], fields["modifiers"], fields["objects"], fields["timestamp"])]
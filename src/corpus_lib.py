@@ -0,0 +1,175 @@
+import json
+
+"""
+Streaming readers for captioned event corpora, e.g., ActivityNet Captions annotations or the result files of
+Dense Video Captioning models (densecap, PDVC). Videos are read one at a time, i.e., memory usage does not depend on
+the size of the input file.
+"""
+def iter_videos(path: str):
+    """
+    iterate over all videos of a JSON or JSONL corpus file, yields (video_id, sentences, timestamps) tuples
+    """
+    if path.endswith(".jsonl"):
+        yield from _iter_videos_jsonl(path)
+    else:
+        yield from _iter_videos_json(path)
+
+
+def _iter_videos_jsonl(path: str):
+    """
+    each line contains either a single video {"video_id": ..., "sentences": [...], "timestamps": [...]}
+    (or {"video_id": ..., "events": [{"sentence": ..., "timestamp": [...]}, ...]}), or maps video ids to videos
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line_idx, line in enumerate(f):
+            line = line.strip()
+            if len(line) == 0:
+                continue
+
+            record = json.loads(line)
+            if "video_id" in record:
+                events = to_events(record) if "events" not in record else to_events(record["events"])
+                if events is None:
+                    print(f"line {line_idx + 1} of {path} does not contain captioned events, skipping it")
+                    continue
+                yield (record["video_id"],) + events
+            else:
+                for video_id, value in record.items():
+                    events = to_events(value)
+                    if events is not None:
+                        yield (video_id,) + events
+
+
+def _iter_videos_json(path: str):
+    """
+    the file contains a single object that maps video ids to videos, either directly (ActivityNet Captions annotations)
+    or within "results" (result files of densecap and PDVC), other top-level keys (e.g. "version") are ignored
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        stream = JsonStream(f)
+        for key in stream.iter_object_keys():
+            if key == "results" and stream.peek() == "{":
+                for video_id in stream.iter_object_keys():
+                    events = to_events(stream.decode_value())
+                    if events is not None:
+                        yield (video_id,) + events
+            else:
+                events = to_events(stream.decode_value())
+                if events is not None:
+                    yield (key,) + events
+
+
+def to_events(value):
+    """
+    convert the annotation of a video to (sentences, timestamps), returns None if value is no video annotation.
+    Supported are {"sentences": [...], "timestamps": [...]} (ActivityNet Captions) and
+    [{"sentence": ..., "timestamp": [...]}, ...] (densecap, PDVC)
+    """
+    if isinstance(value, dict) and "sentences" in value and "timestamps" in value:
+        sentences, timestamps = list(value["sentences"]), [list(t) for t in value["timestamps"]]
+    elif isinstance(value, list) and all(isinstance(e, dict) and "sentence" in e and "timestamp" in e for e in value):
+        sentences, timestamps = [e["sentence"] for e in value], [list(e["timestamp"]) for e in value]
+    else:
+        return None
+
+    assert len(sentences) == len(timestamps), "each sentence of a video requires exactly one timestamp"
+
+    return sentences, timestamps
+
+
+
+class JsonStream:
+    """
+    incremental reader for JSON objects, only a bounded part of the file is kept in memory
+    """
+    CHUNK_SIZE = 1 << 16
+    WHITESPACE = " \t\n\r"
+
+    def __init__(self, f):
+        self.f = f
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+
+    def __fill(self) -> bool:
+        """
+        read the next chunk of the file (at least as much as is currently buffered, so that decoding a large value
+        takes amortized linear time), returns False at the end of the file
+        """
+        if self.eof:
+            return False
+
+        chunk = self.f.read(max(self.CHUNK_SIZE, len(self.buffer) - self.pos))
+        if not chunk:
+            self.eof = True
+            return False
+
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+
+    def peek(self) -> str:
+        """
+        skip whitespaces and return the next character ("" at the end of the file)
+        """
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in self.WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.__fill():
+                return ""
+
+
+    def expect(self, characters: str) -> str:
+        c = self.peek()
+        if c == "" or c not in characters:
+            raise ValueError(f"invalid JSON: expected one of '{characters}', but found '{c}'")
+        self.pos += 1
+
+        return c
+
+
+    def decode_value(self):
+        """
+        decode the next JSON value
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.__fill():
+                    continue
+                raise
+
+            # a number at the end of the buffer may be continued in the next chunk
+            if end == len(self.buffer) and self.__fill():
+                continue
+
+            self.pos = end
+            return value
+
+
+    def iter_object_keys(self):
+        """
+        iterate over the keys of the next JSON object. After each key, the caller has to consume the corresponding
+        value (e.g. using decode_value or iter_object_keys) before requesting the next key
+        """
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+
+        while True:
+            key = self.decode_value()
+            assert isinstance(key, str), "invalid JSON: object keys have to be strings"
+            self.expect(":")
+
+            yield key
+
+            if self.expect(",}") == "}":
+                return
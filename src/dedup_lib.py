@@ -0,0 +1,232 @@
+from collections import OrderedDict
+from itertools import islice
+
+import spacy
+
+from . import nlp_lib, stats_lib
+from .constants import Tags
+from .entities_lib import EntitiesLib, ExtractionContext
+from .extraction_lib import extract_videos
+from .relations_lib import RelationsLib
+from .semantic_metadata.entity_property import EntityPropertyPair
+from .semantic_metadata.event_entity import EventEntity
+from .semantic_metadata.event_relation import EventRelation
+from .semantic_metadata.extraction_result import ExtractionResult
+from .semantic_metadata.video_entity import VideoEntity
+from .utils import sort_by_starting_time
+from .wordnet_lib import WordNetDictionary, WordNetLemmatizerWrapped
+
+"""
+Cross-video deduplication of captions. Dense Video Captioning models produce the same sentences over and over.
+Without pronouns, NeuralCoref can not link a sentence to any other sentence of a video, i.e., the semantic metadata of
+a video without pronouns is the combination of the semantic metadata of its sentences. Therefore, each unique sentence
+is parsed and extracted only once, and the results are stitched together for every video that contains it.
+The results equal the results of extract_videos: the context windows of the tagger and the parser reach over sentence
+boundaries, i.e., a sentence parsed on its own may be tagged or attached differently than within its video. Therefore,
+each video is still tagged and parsed as a whole (without NER and NeuralCoref), and it is only stitched together when
+the parse of each of its sentences equals the parse of the sentence on its own, otherwise it is extracted as a whole.
+"""
+# marker for sentences that contain a pronoun (or could not be parsed), videos with such sentences are parsed as a whole
+NOT_REUSABLE = "not_reusable"
+
+
+class SentenceRecord:
+    """
+    semantic metadata of a single sentence, without timestamps
+    """
+    __slots__ = ("syntax", "noun_compounds", "nouns", "relations")
+
+    def __init__(self, syntax: tuple, noun_compounds: list, nouns: list, relations: list):
+        self.syntax = syntax  # parse of the sentence on its own (see get_syntax)
+        self.noun_compounds = noun_compounds  # (name, properties) for each noun compound in the order of the sentence
+        self.nouns = nouns  # (name, properties) for each noun in the order of the sentence
+        self.relations = relations  # VideoRelation objects in the order of the sentence
+
+
+
+class SentenceCache:
+    """
+    LRU cache of the semantic metadata of unique (normalized) sentences
+    """
+
+    def __init__(self,
+                 wn_dictionary: WordNetDictionary,
+                 wn_lemmatizer: WordNetLemmatizerWrapped,
+                 max_sentences: int = 1 << 18):
+        self.wn_dictionary = wn_dictionary
+        self.wn_lemmatizer = wn_lemmatizer
+        self.max_sentences = max_sentences
+        self.records = OrderedDict()
+
+        self.n_parsed_sentences = 0
+        self.n_reused_sentences = 0
+        self.n_stitched_videos = 0
+        self.n_parsed_videos = 0
+        self.n_mismatched_videos = 0
+
+
+    def add_sentences(self, sentences, batch_size: int = 64):
+        """
+        parse and extract all sentences that are not known yet (each unique sentence only once)
+        """
+        new_sentences = {}  # used as insertion-ordered set
+        for sentence in sentences:
+            key = nlp_lib.process_sentence(sentence)
+            if key in self.records:
+                self.records.move_to_end(key)
+                self.n_reused_sentences += 1
+            elif key in new_sentences:
+                self.n_reused_sentences += 1
+            else:
+                new_sentences[key] = None
+
+        sentence_lists = (([key], key) for key in new_sentences)
+        for doc, key in nlp_lib.parse_many(sentence_lists, batch_size=batch_size, as_tuples=True):
+            self.records[key] = self.__extract_record(doc) if doc is not None else NOT_REUSABLE
+            self.n_parsed_sentences += 1
+
+        while len(self.records) > self.max_sentences:
+            self.records.popitem(last=False)
+
+
+    def get_record(self, sentence: str):
+        """
+        record of an already added sentence, None if the sentence is unknown or its record can not be reused
+        """
+        record = self.records.get(nlp_lib.process_sentence(sentence))
+        return record if isinstance(record, SentenceRecord) else None
+
+
+    def __extract_record(self, doc):
+        if any(t.pos_ == Tags.PRON for t in doc):
+            return NOT_REUSABLE
+
+        context = ExtractionContext(doc, self.wn_dictionary, self.wn_lemmatizer)
+        noun_compounds = [
+            (name, EntitiesLib.get_properties_for_tokens(tokens, self.wn_dictionary, self.wn_lemmatizer))
+            for name, tokens in zip(context.noun_compounds, context.tokens_for_noun_compounds)
+        ]
+        nouns = [
+            (name, EntitiesLib.get_properties_for_tokens(tokens, self.wn_dictionary, self.wn_lemmatizer))
+            for name, tokens in zip(context.nouns, context.tokens_for_nouns)
+        ]
+        relations, _ = RelationsLib.extract_relations(
+            doc, [[0.0, 0.0]], self.wn_dictionary, self.wn_lemmatizer, context)
+
+        return SentenceRecord(get_syntax(doc[:]), noun_compounds, nouns, relations)
+
+
+    def stats(self) -> dict:
+        return {
+            "parsed_sentences": self.n_parsed_sentences,
+            "reused_sentences": self.n_reused_sentences,
+            "stitched_videos": self.n_stitched_videos,
+            "parsed_videos": self.n_parsed_videos,
+            "mismatched_videos": self.n_mismatched_videos
+        }
+
+
+
+def get_syntax(sentence: spacy.tokens.Span) -> tuple:
+    """
+    everything the extraction reads from the parse of a sentence: text, POS tag, lemma, dependency and head (relative
+    to the start of the sentence) of each token
+    """
+    return tuple((t.text, t.pos_, t.lemma_, t.dep_, t.head.i - sentence.start) for t in sentence)
+
+
+def stitch_records(records: list, timestamps: list):
+    """
+    combine the records of the (sorted) sentences of a video, the result equals the result of EntitiesLib and
+    RelationsLib for the whole video when its sentences are parsed within the video like on their own
+    (entities are processed in the same order: first all noun compounds, then all nouns)
+    """
+    video_level_entities = {}
+    event_level_entities = {}
+    entity_property_pairs = {}
+    for entities_of_record in [lambda r: r.noun_compounds, lambda r: r.nouns]:
+        for record, timestamp in zip(records, timestamps):
+            for name, properties in entities_of_record(record):
+                video_level_entities.setdefault(VideoEntity(name))
+                event_level_entities.setdefault(EventEntity(name, timestamp))
+                for p in properties:
+                    entity_property_pairs.setdefault(EntityPropertyPair(name, p))
+
+    video_level_relations = {}
+    event_level_relations = {}
+    for record, timestamp in zip(records, timestamps):
+        for r in record.relations:
+            video_level_relations.setdefault(r)
+            event_level_relations.setdefault(
+                EventRelation(list(r.subjects), r.verb, list(r.modifiers), list(r.objects), timestamp))
+
+    return ExtractionResult(
+        video_level_entities=sorted(video_level_entities, key=lambda e: e.name),
+        event_level_entities=sorted(event_level_entities, key=lambda e: e.timestamp[0]),
+        entity_property_pairs=sorted(entity_property_pairs, key=lambda ep: ep.entity),
+        video_level_relations=list(video_level_relations),
+        event_level_relations=list(event_level_relations)
+    )
+
+
+def extract_videos_deduplicated(videos,
+                                wn_dictionary: WordNetDictionary,
+                                wn_lemmatizer: WordNetLemmatizerWrapped,
+                                batch_size: int = 64,
+                                sentence_cache: SentenceCache = None):
+    """
+    extract all semantic metadata from a stream of (video_id, sentences, timestamps) tuples (like extract_videos),
+    but reuse the semantic metadata of sentences that were already seen in other videos whenever possible.
+    Yields (video_id, result) tuples in input order
+    """
+    if sentence_cache is None:
+        sentence_cache = SentenceCache(wn_dictionary, wn_lemmatizer)
+
+    videos = iter(videos)
+    while True:
+        chunk = list(islice(videos, batch_size))
+        if len(chunk) == 0:
+            return
+
+        # sort sentences according to their starting times
+        chunk = [(video_id,) + tuple(sort_by_starting_time(sentences, timestamps))
+                 for video_id, sentences, timestamps in chunk]
+        sentence_cache.add_sentences((s for _, sentences, _ in chunk for s in sentences), batch_size=batch_size)
+
+        # videos whose sentences can all be reused are candidates for stitching, all others are parsed as a whole
+        records_of_videos = [[sentence_cache.get_record(s) for s in sentences] for _, sentences, _ in chunk]
+        candidates, videos_to_parse = [], []
+        for idx, records in enumerate(records_of_videos):
+            if len(records) > 0 and all(r is not None for r in records):
+                candidates.append(idx)
+            else:
+                videos_to_parse.append(idx)
+
+        # a candidate is only stitched together when its sentences are parsed within the video like on their own
+        results = [None] * len(chunk)
+        docs = nlp_lib.parse_syntax_many((chunk[idx][1] for idx in candidates), batch_size=batch_size)
+        for idx, doc in zip(candidates, docs):
+            records = records_of_videos[idx]
+            if doc is None or any(get_syntax(sentence) != record.syntax
+                                  for sentence, record in zip(doc.sents, records)):
+                videos_to_parse.append(idx)
+                sentence_cache.n_mismatched_videos += 1
+                continue
+
+            timestamps = chunk[idx][2]
+            if stats_lib.is_enabled():
+                with stats_lib.collect() as stats, stats_lib.timer("stitch"):
+                    results[idx] = stitch_records(records, timestamps)
+                results[idx].stats = stats
+            else:
+                results[idx] = stitch_records(records, timestamps)
+            sentence_cache.n_stitched_videos += 1
+
+        videos_to_parse.sort()
+        sentence_cache.n_parsed_videos += len(videos_to_parse)
+        parsed = extract_videos((chunk[idx] for idx in videos_to_parse), wn_dictionary, wn_lemmatizer, batch_size)
+        for idx, (_, result) in zip(videos_to_parse, parsed):
+            results[idx] = result
+
+        for (video_id, _, _), result in zip(chunk, results):
+            yield video_id, result
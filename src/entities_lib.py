@@ -1,8 +1,9 @@
 import spacy
 
 from src.semantic_metadata.entity_property import EntityPropertyPair
+from . import stats_lib
 from .constants import Tags, Dependencies
-from .nlp_lib import pronoun_resolution
+from .nlp_lib import pronoun_resolution, get_sentence_idx_of_token
 from .semantic_metadata.event_entity import EventEntity
 from .semantic_metadata.video_entity import VideoEntity
 
@@ -18,46 +19,48 @@ class EntitiesLib:
     def extract_entities_and_properties(doc: spacy.tokens.Doc,
                                         timestamps: list,
                                         wn_dictionary: WordNetDictionary,
-                                        wn_lemmatizer: WordNetLemmatizerWrapped):
+                                        wn_lemmatizer: WordNetLemmatizerWrapped,
+                                        context: "ExtractionContext" = None):
         """
         core functionality of this class:
         extract event-level and video-level entities from a spaCy doc and list of timestamps
+        (an ExtractionContext of the doc may be given to reuse the entities already detected for the doc)
         """
         # get entities
-        noun_compounds, tokens_for_noun_compounds, nouns, tokens_for_nouns, tokens_for_entities = \
-            EntitiesLib.extract_nouns_from_doc(doc, wn_dictionary, wn_lemmatizer)
-        entity_names = noun_compounds + nouns
-        entity_tokens = tokens_for_noun_compounds + tokens_for_nouns
+        if context is None:
+            context = ExtractionContext(doc, wn_dictionary, wn_lemmatizer)
+        entity_names = context.entity_names
+        entity_tokens = context.entity_tokens
+        entity_registry = context.entity_registry
 
 
-        video_level_entities = []
-        event_level_entities = []
-        entity_property_pairs = []
+        # dicts are used as insertion-ordered sets to make the extracted metadata unique
+        video_level_entities = {}
+        event_level_entities = {}
+        entity_property_pairs = {}
 
         # 1) process nouns to entities, find properties of entities
         for entity_name, tokens in zip(entity_names, entity_tokens):
-            sentence_index = EntitiesLib.__get_sentence_idx_of_token(tokens[0], doc)
+            sentence_index = get_sentence_idx_of_token(tokens[0])
 
             # 1.1) entities
             video_entity = VideoEntity(entity_name)
-            if video_entity not in video_level_entities:
-                video_level_entities.append(video_entity)
+            video_level_entities.setdefault(video_entity)
 
             event_entity = EventEntity(entity_name, timestamps[sentence_index])
-            if event_entity not in event_level_entities:
-                event_level_entities.append(event_entity)
+            event_level_entities.setdefault(event_entity)
 
             # 1.2) Properties
-            properties = EntitiesLib.__get_properties_for_tokens(tokens, wn_dictionary, wn_lemmatizer)
+            with stats_lib.timer("properties"):
+                properties = EntitiesLib.get_properties_for_tokens(tokens, wn_dictionary, wn_lemmatizer)
             for p in properties:
                 pair = EntityPropertyPair(video_entity.name, p)  # properties are lemmatized already
-                if pair not in entity_property_pairs:
-                    entity_property_pairs.append(pair)
+                entity_property_pairs.setdefault(pair)
 
         # 2) process resolved pronouns for further event-level entities
         # for each pronoun, we need to know the sentence in which occurs to get the correct timestamps later on
         resolved_pronouns = [
-            (pronoun_resolution(t, doc), EntitiesLib.__get_sentence_idx_of_token(t, doc)) for t in doc if t.pos_ == Tags.PRON
+            (pronoun_resolution(t, doc), get_sentence_idx_of_token(t)) for t in doc if t.pos_ == Tags.PRON
         ]
         # filter out non-resolved pronouns
         resolved_pronouns = [
@@ -66,10 +69,7 @@ class EntitiesLib:
 
         for (n, time_idx) in resolved_pronouns:
             # get the correct noun from the token (can't use token.text because the noun may be a compound noun)
-            noun_from_pronoun = None
-            for idx, token_list in enumerate(entity_tokens):
-                if n in token_list:
-                    noun_from_pronoun = entity_names[idx]
+            noun_from_pronoun = entity_registry.get_entity_name(n)
 
             if noun_from_pronoun is None:
                 # this case happens when the resolved pronoun, i.e., now a token with noun tag, is not a WordNet noun
@@ -78,12 +78,11 @@ class EntitiesLib:
 
             # no (resolved) pronoun can provide a new property
             event_entity = EventEntity(noun_from_pronoun, timestamps[time_idx])
-            if event_entity not in event_level_entities:
-                event_level_entities.append(event_entity)
+            event_level_entities.setdefault(event_entity)
 
-        video_level_entities.sort(key=EntitiesLib.__sort_by_name)
-        event_level_entities.sort(key=EntitiesLib.__sort_by_timestamp)
-        entity_property_pairs.sort(key=EntitiesLib.__sort_by_name_of_ep)
+        video_level_entities = sorted(video_level_entities, key=EntitiesLib.__sort_by_name)
+        event_level_entities = sorted(event_level_entities, key=EntitiesLib.__sort_by_timestamp)
+        entity_property_pairs = sorted(entity_property_pairs, key=EntitiesLib.__sort_by_name_of_ep)
 
         # do not make entities unique because, e.g., "parking_lot" can be in a sentence 2 times
         return video_level_entities, event_level_entities, entity_property_pairs
@@ -125,16 +124,6 @@ class EntitiesLib:
         return ep.entity
 
 
-    @staticmethod
-    def __get_sentence_idx_of_token(token: spacy.tokens.Token,
-                                    doc: spacy.tokens.Doc):
-
-        for i, sent in enumerate(doc.sents):
-            if token in sent:
-                return i
-        return None
-
-
     @staticmethod
     def __get_nouns_from_doc_spacy_and_wordnet(doc: spacy.tokens.Doc,
                                                wn_dictionary: WordNetDictionary,
@@ -142,10 +131,12 @@ class EntitiesLib:
         """
         noun detection from a spaCy doc
         """
+        ignore_token_ids = set() if ignore_tokens is None else {t.i for t in ignore_tokens}
+
         nouns = []
         used_tokens = []
         for token in doc:
-            if ignore_tokens is not None and token in ignore_tokens:
+            if token.i in ignore_token_ids:
                 # skip this token, probably because it was used for a noun compound
                 continue
 
@@ -196,27 +187,23 @@ class EntitiesLib:
         """
         helper function for compound noun detection.
         """
-        compound_roots = set()
-        # collect all heads of potential compounds (not necessarily a noun)
+        compound_roots = []
+        # collect all heads of potential compounds (not necessarily a noun) in the order of the doc
         for token in doc:
             if token.dep_ != Dependencies.COMPOUND:
                 comps = [child.text for child in token.children if child.dep_ == Dependencies.COMPOUND]
                 if len(comps) > 0:
-                    compound_roots.add(token)
+                    compound_roots.append(token)
 
-        # for each head, recursively collect all children with compound dependency (not necessarily nouns)
+        # for each head, collect all descendants connected by compound dependencies (not necessarily nouns)
         compound_tokens = [None] * len(compound_roots)
         for idx, compound_root in enumerate(compound_roots):
-            compound_tokens[idx] = [compound_root]
-            while True:
-                new_sub_compound_tokens = 0
-                for compound_token in compound_tokens[idx]:
-                    for child in compound_token.children:
-                        if child.dep_ == Dependencies.COMPOUND and child not in compound_tokens[idx]:
-                            new_sub_compound_tokens += 1
-                            compound_tokens[idx].append(child)
-                if new_sub_compound_tokens == 0:
-                    break
+            compound_tokens[idx] = []
+            stack = [compound_root]
+            while len(stack) > 0:
+                compound_token = stack.pop()
+                compound_tokens[idx].append(compound_token)
+                stack += [child for child in compound_token.children if child.dep_ == Dependencies.COMPOUND]
 
         # sort tokens for each compound and return tokens
         potential_compounds = []
@@ -233,49 +220,61 @@ class EntitiesLib:
                                                     wn_lemmatizer: WordNetLemmatizerWrapped):
         """
         helper function for compound noun detection.
+        finds the longest (and, among those, leftmost) window of at least two tokens that forms a WordNet noun, checking
+        open (peanut_butter), hyphenated (t-shirt) and closed (weightlifting) compounds in this order.
+        Windows are grown token by token from each start, a variant is not grown any further once no WordNet noun
+        starts with it (see NounPrefixIndex), i.e., only few windows are checked
         """
+        wn_nouns = wn_dictionary.nouns
+        prefix_index = wn_dictionary.noun_prefix_index
+        texts = [token.text.lower() for token in compound_tokens]
+        is_noun = [EntitiesLib.__is_spacy_noun(token) for token in compound_tokens]
         n_tokens = len(compound_tokens)
-        while n_tokens > 1:
-            i = 0
-            found_compound = ""
-            while i + n_tokens <= len(compound_tokens):
-                candidate_token_list = compound_tokens[i:i + n_tokens]
-
-                # check if at least one token is a NOUN or a PROPN
-                if len([t for t in candidate_token_list if EntitiesLib.__is_spacy_noun(t)]) > 0:
-                    candidate_str_list = [token.text.lower() for token in candidate_token_list]
-                    open_compound = '_'.join(candidate_str_list)  # peanut_butter
-                    hyphenated_compound = '-'.join(candidate_str_list)  # t-shirt
-                    regular_compound = ''.join(candidate_str_list)  # weightlifting
-
-                    wn_nouns = wn_dictionary.nouns
-                    if open_compound in wn_nouns or wn_lemmatizer.lemmatize_noun(open_compound) in wn_nouns:
-                        found_compound = open_compound
-
-                    elif hyphenated_compound in wn_nouns or wn_lemmatizer.lemmatize_noun(
-                            hyphenated_compound) in wn_nouns:
-                        found_compound = hyphenated_compound
-
-                    elif regular_compound in wn_nouns or wn_lemmatizer.lemmatize_noun(
-                            regular_compound) in wn_nouns:
-                        found_compound = regular_compound
-
-                if found_compound != "":
-                    # Return the noun lower-cased and non lemmatized
-                    return found_compound.lower(), compound_tokens[i:i + n_tokens]
 
-                i += 1
+        # best match so far: (number of tokens, start, compound)
+        best = (1, 0, None)
+        for i in range(n_tokens - 1):
+            if n_tokens - i <= best[0]:
+                # no window starting here can be longer than the best match
+                break
+
+            # candidate of each variant for the window compound_tokens[i:j + 1], None once the variant is pruned
+            candidates = {"_": texts[i], "-": texts[i], "": texts[i]}
+            has_noun = is_noun[i]
+            for j in range(i + 1, n_tokens):
+                has_noun = has_noun or is_noun[j]
+                found_compound = None
+                for separator in ["_", "-", ""]:  # open, hyphenated, closed compounds (in the order of priority)
+                    if candidates[separator] is None:
+                        continue
+                    if not prefix_index.may_be_noun(candidates[separator] + separator + texts[j]):
+                        candidates[separator] = None
+                        continue
+
+                    candidate = candidates[separator] + separator + texts[j]
+                    candidates[separator] = candidate
+                    stats_lib.count("compound_candidates")
+                    if found_compound is None and has_noun \
+                            and (candidate in wn_nouns or wn_lemmatizer.lemmatize_noun(candidate) in wn_nouns):
+                        found_compound = candidate
+
+                if found_compound is not None and j - i + 1 > best[0]:
+                    best = (j - i + 1, i, found_compound)
+                if all(candidate is None for candidate in candidates.values()):
+                    break
 
-            # so far, no compound found -> search one length smaller
-            n_tokens -= 1
+        n_best, i, found_compound = best
+        if found_compound is None:
+            return None, []
 
-        return None, []
+        # Return the noun lower-cased and non lemmatized
+        return found_compound, compound_tokens[i:i + n_best]
 
 
     @staticmethod
-    def __get_properties_for_tokens(entity_token_list,
-                                    wn_dictionary: WordNetDictionary,
-                                    wn_lemmatizer: WordNetLemmatizerWrapped):
+    def get_properties_for_tokens(entity_token_list,
+                                  wn_dictionary: WordNetDictionary,
+                                  wn_lemmatizer: WordNetLemmatizerWrapped):
         """
         entity-property pair detection from a token list of an entity
         """
@@ -289,3 +288,69 @@ class EntitiesLib:
                     # Add the adjective lemmatized
                     properties.append(wn_lemmatizer.lemmatize_adjective(child.text))
         return properties
+
+
+
+class ExtractionContext:
+    """
+    analysis of a spaCy doc that is shared by entity and relation extraction,
+    i.e., (compound) nouns are detected only once per doc
+    """
+
+    def __init__(self,
+                 doc: spacy.tokens.Doc,
+                 wn_dictionary: WordNetDictionary,
+                 wn_lemmatizer: WordNetLemmatizerWrapped):
+        self.doc = doc
+
+        with stats_lib.timer("nouns"):
+            self.noun_compounds, self.tokens_for_noun_compounds, self.nouns, self.tokens_for_nouns, \
+                self.tokens_for_entities = EntitiesLib.extract_nouns_from_doc(doc, wn_dictionary, wn_lemmatizer)
+            self.entity_names = self.noun_compounds + self.nouns
+            self.entity_tokens = self.tokens_for_noun_compounds + self.tokens_for_nouns
+            self.entity_registry = EntityRegistry(self.entity_names, self.entity_tokens)
+        stats_lib.count("entities", len(self.entity_names))
+
+
+
+class EntityRegistry:
+    """
+    registry of all tokens that are part of an entity, keyed by token index,
+    i.e., "is this token part of an entity" and "to which entity does it belong" are answered in constant time
+    """
+
+    def __init__(self, entity_names: list, entity_tokens: list):
+        self.__entity_name_of_token = {}
+        for name, tokens in zip(entity_names, entity_tokens):
+            for token in tokens:
+                # a token is part of at most one entity (tokens of noun compounds are ignored for nouns)
+                self.__entity_name_of_token.setdefault(token.i, name)
+
+
+    def __contains__(self, token: spacy.tokens.Token) -> bool:
+        return token.i in self.__entity_name_of_token
+
+
+    def __len__(self) -> int:
+        return len(self.__entity_name_of_token)
+
+
+    def get_entity_name(self, token: spacy.tokens.Token):
+        """
+        name of the entity to which the token belongs, None when the token is not part of an entity
+        """
+        return self.__entity_name_of_token.get(token.i)
+
+
+    def has_index(self, i: int) -> bool:
+        """
+        check whether the token with index i is part of an entity
+        """
+        return i in self.__entity_name_of_token
+
+
+    def get_entity_name_of_index(self, i: int):
+        """
+        name of the entity to which the token with index i belongs, None when the token is not part of an entity
+        """
+        return self.__entity_name_of_token.get(i)
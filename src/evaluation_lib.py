@@ -0,0 +1,273 @@
+import numpy as np
+
+from .semantic_metadata.extraction_result import ExtractionResult
+from .wordnet_lib import WordNetLemmatizerWrapped, get_synonyms
+
+"""
+Corpus-scale evaluation of extracted semantic metadata against ground truth metadata. For each video, the decisions of
+the predicts() methods are computed for all prediction-ground truth pairs at once: word matches are computed once per
+distinct entity, property, subject, verb and object, and temporal IoUs as NumPy matrices, which are compared with all
+IoU thresholds in one pass.
+"""
+EVENT_LEVEL_CATEGORIES = ["event_level_entities", "event_level_relations"]
+VIDEO_LEVEL_CATEGORIES = ["video_level_entities", "entity_property_pairs", "video_level_relations"]
+DEFAULT_IOU_THRESHOLDS = (0.3, 0.5, 0.7, 0.9)
+
+
+def iou_matrix(a, b) -> np.ndarray:
+    """
+    temporal IoU of all pairs of segments (n x 2 and m x 2 array-likes), same values as utils.calculate_iou
+    """
+    a = np.asarray(a, dtype=np.float64).reshape(-1, 2)
+    b = np.asarray(b, dtype=np.float64).reshape(-1, 2)
+    a_start, a_end = a[:, 0:1], a[:, 1:2]
+    b_start, b_end = b[:, 0], b[:, 1]
+
+    intersection = np.maximum(0, np.minimum(a_end, b_end) - np.maximum(a_start, b_start))
+    union = np.minimum(np.maximum(a_end, b_end) - np.minimum(a_start, b_start), a_end - a_start + b_end - b_start)
+
+    return intersection / (union + 1e-8)
+
+
+def _match_matrix(predicted_words: list, gt_words: list) -> np.ndarray:
+    """
+    match[i, j] is True when the i-th set of predicted words and the j-th set of ground truth words share a word
+    """
+    match = np.zeros((len(predicted_words), len(gt_words)), dtype=bool)
+
+    rows_of_word = {}
+    for i, words in enumerate(predicted_words):
+        for word in words:
+            rows_of_word.setdefault(word, []).append(i)
+
+    for j, words in enumerate(gt_words):
+        for word in words:
+            rows = rows_of_word.get(word)
+            if rows is not None:
+                match[rows, j] = True
+
+    return match
+
+
+def _unique(keys: list):
+    """
+    distinct keys (in the order of their first occurrence) and the index of each key among them
+    """
+    index = {}
+    ids = np.fromiter((index.setdefault(key, len(index)) for key in keys), dtype=np.intp, count=len(keys))
+
+    return list(index), ids
+
+
+
+class CorpusEvaluator:
+    """
+    precision, recall and F1 score of predicted semantic metadata for a corpus of videos.
+    A prediction is correct when it predicts any ground truth item of its video, a ground truth item is recalled when
+    any prediction of its video predicts it (decisions as of the predicts() methods). Event-level metadata is evaluated
+    for each IoU threshold, counts are summed up over all videos
+    """
+
+    def __init__(self,
+                 wn_lemmatizer: WordNetLemmatizerWrapped,
+                 iou_thresholds=DEFAULT_IOU_THRESHOLDS,
+                 with_synonyms: bool = True):
+        self.wn_lemmatizer = wn_lemmatizer
+        self.iou_thresholds = np.asarray(iou_thresholds, dtype=np.float64)
+        self.with_synonyms = with_synonyms
+
+        # per category: number of predictions, number of ground truth items, correct predictions, recalled ground truth
+        # (one count per IoU threshold)
+        n_thresholds = len(self.iou_thresholds)
+        self.counts = {
+            category: np.zeros((4, n_thresholds), dtype=np.int64)
+            for category in EVENT_LEVEL_CATEGORIES + VIDEO_LEVEL_CATEGORIES
+        }
+        self.n_videos = 0
+
+
+    def add_video(self, prediction: ExtractionResult, ground_truth: ExtractionResult):
+        """
+        evaluate the predicted metadata of a video
+        """
+        for category, match in self.match_matrices(prediction, ground_truth).items():
+            counts = self.counts[category]
+            n_predictions, n_gt = match.shape[:2]
+            if match.ndim == 2:
+                # video-level metadata does not depend on the IoU threshold
+                match = match[:, :, None]
+
+            counts[0] += n_predictions
+            counts[1] += n_gt
+            counts[2] += match.any(axis=1).sum(axis=0)
+            counts[3] += match.any(axis=0).sum(axis=0)
+
+        self.n_videos += 1
+
+
+    def match_matrices(self, prediction: ExtractionResult, ground_truth: ExtractionResult) -> dict:
+        """
+        decisions of the predicts() methods for all pairs of predicted and ground truth metadata of a video:
+        video-level categories map to (predictions x ground truth) arrays,
+        event-level categories to (predictions x ground truth x IoU thresholds) arrays
+        """
+        video_entities = self.__entity_matrix(
+            [e.name for e in prediction.video_level_entities], [e.name for e in ground_truth.video_level_entities])
+        video_relations = self.__relation_matrix(prediction.video_level_relations, ground_truth.video_level_relations)
+
+        entity_property_pairs = self.__entity_matrix(
+            [ep.entity for ep in prediction.entity_property_pairs],
+            [ep.entity for ep in ground_truth.entity_property_pairs]
+        ) & self.__property_matrix(
+            [ep.property for ep in prediction.entity_property_pairs],
+            [ep.property for ep in ground_truth.entity_property_pairs]
+        )
+
+        event_entities = self.__entity_matrix(
+            [e.name for e in prediction.event_level_entities], [e.name for e in ground_truth.event_level_entities])
+        event_entities = self.__apply_iou_thresholds(
+            event_entities, prediction.event_level_entities, ground_truth.event_level_entities)
+
+        event_relations = self.__relation_matrix(prediction.event_level_relations, ground_truth.event_level_relations)
+        event_relations = self.__apply_iou_thresholds(
+            event_relations, prediction.event_level_relations, ground_truth.event_level_relations)
+
+        return {
+            "video_level_entities": video_entities,
+            "event_level_entities": event_entities,
+            "entity_property_pairs": entity_property_pairs,
+            "video_level_relations": video_relations,
+            "event_level_relations": event_relations
+        }
+
+
+    def results(self) -> dict:
+        """
+        precision, recall and F1 score of each category (event-level categories for each IoU threshold)
+        """
+        results = {}
+        for category, counts in self.counts.items():
+            n_predictions, n_gt, n_correct, n_recalled = counts.astype(np.float64)
+            precision = np.divide(n_correct, n_predictions, out=np.zeros_like(n_correct), where=n_predictions > 0)
+            recall = np.divide(n_recalled, n_gt, out=np.zeros_like(n_recalled), where=n_gt > 0)
+            f1 = np.divide(2 * precision * recall, precision + recall, out=np.zeros_like(precision),
+                           where=precision + recall > 0)
+
+            scores = {
+                float(iou): {
+                    "precision": float(precision[t]),
+                    "recall": float(recall[t]),
+                    "f1": float(f1[t]),
+                    "n_predictions": int(counts[0, t]),
+                    "n_ground_truth": int(counts[1, t])
+                } for t, iou in enumerate(self.iou_thresholds)
+            }
+            # video-level metadata does not depend on the IoU threshold
+            results[category] = scores if category in EVENT_LEVEL_CATEGORIES else next(iter(scores.values()))
+
+        return results
+
+
+    """
+    helper functions, word matches are computed for distinct words only and broadcast to all pairs
+    """
+    def __apply_iou_thresholds(self, match: np.ndarray, predictions: list, gt: list) -> np.ndarray:
+        iou = iou_matrix([e.timestamp for e in predictions], [e.timestamp for e in gt])
+
+        return match[:, :, None] & (iou[:, :, None] >= self.iou_thresholds)
+
+
+    def __expand(self, words, word_type: str) -> set:
+        """
+        ground truth words and, if desired, their synonyms
+        """
+        expanded = set(words)
+        if self.with_synonyms:
+            for word in words:
+                expanded |= get_synonyms(word, word_type)
+
+        return expanded
+
+
+    @staticmethod
+    def __broadcast(unique_match: np.ndarray, prediction_ids: np.ndarray, gt_ids: np.ndarray) -> np.ndarray:
+        return unique_match[np.ix_(prediction_ids, gt_ids)]
+
+
+    def __entity_matrix(self, predictions: list, gt: list) -> np.ndarray:
+        """
+        VideoEntity.predicts for all pairs of entity names
+        """
+        unique_predictions, prediction_ids = _unique(predictions)
+        unique_gt, gt_ids = _unique(gt)
+
+        lemmatize = self.wn_lemmatizer.lemmatize_noun
+        unique_match = _match_matrix(
+            [{lemmatize(p)} for p in unique_predictions],
+            [self.__expand([lemmatize(g)], "noun") for g in unique_gt]
+        )
+
+        return self.__broadcast(unique_match, prediction_ids, gt_ids)
+
+
+    def __property_matrix(self, predictions: list, gt: list) -> np.ndarray:
+        """
+        property comparison of EntityPropertyPair.predicts for all pairs of properties (properties are lemmatized)
+        """
+        unique_predictions, prediction_ids = _unique(predictions)
+        unique_gt, gt_ids = _unique(gt)
+
+        unique_match = _match_matrix(
+            [{p} for p in unique_predictions],
+            [self.__expand([g], "noun") for g in unique_gt]
+        )
+
+        return self.__broadcast(unique_match, prediction_ids, gt_ids)
+
+
+    def __entity_list_matrix(self, predictions: list, gt: list) -> np.ndarray:
+        """
+        predicts_subject_or_object for all pairs of subject (or object) lists
+        """
+        unique_predictions, prediction_ids = _unique(predictions)
+        unique_gt, gt_ids = _unique(gt)
+
+        lemmatize = self.wn_lemmatizer.lemmatize_noun
+        unique_match = _match_matrix(
+            [{lemmatize(p) for p in entities} for entities in unique_predictions],
+            [self.__expand({lemmatize(g) for g in entities}, "noun") for entities in unique_gt]
+        )
+
+        return self.__broadcast(unique_match, prediction_ids, gt_ids)
+
+
+    def __verb_matrix(self, predictions: list, gt: list) -> np.ndarray:
+        """
+        predicts_verb for all pairs of (verb, modifiers)
+        """
+        unique_predictions, prediction_ids = _unique(predictions)
+        unique_gt, gt_ids = _unique(gt)
+
+        lemmatize = self.wn_lemmatizer.lemmatize_verb
+
+        def with_modifiers(verb, modifiers):
+            verb = lemmatize(verb)
+            return [verb] + [verb + "_" + m for m in modifiers]
+
+        unique_match = _match_matrix(
+            [set(with_modifiers(verb, modifiers)) for verb, modifiers in unique_predictions],
+            [self.__expand(with_modifiers(verb, modifiers), "verb") for verb, modifiers in unique_gt]
+        )
+
+        return self.__broadcast(unique_match, prediction_ids, gt_ids)
+
+
+    def __relation_matrix(self, predictions: list, gt: list) -> np.ndarray:
+        """
+        VideoRelation.predicts for all pairs of relations
+        """
+        subjects = self.__entity_list_matrix([r.subjects for r in predictions], [r.subjects for r in gt])
+        verbs = self.__verb_matrix([(r.verb, r.modifiers) for r in predictions], [(r.verb, r.modifiers) for r in gt])
+        objects = self.__entity_list_matrix([r.objects for r in predictions], [r.objects for r in gt])
+
+        return subjects & verbs & objects
@@ -0,0 +1,96 @@
+from collections import deque
+
+import spacy
+
+from . import nlp_lib, stats_lib
+from .entities_lib import EntitiesLib, ExtractionContext
+from .relations_array_lib import ArrayRelationsLib
+from .relations_lib import RelationsLib
+from .semantic_metadata.extraction_result import ExtractionResult
+from .utils import sort_by_starting_time
+from .wordnet_lib import WordNetDictionary, WordNetLemmatizerWrapped
+
+
+# version of the extraction rules, increase it whenever a change of the extraction changes its results
+# (results cached by the ExtractionCache are only valid for the same version)
+EXTRACTION_RULES_VERSION = 2
+
+# relation extraction engines (same results): spaCy tokens, or integer arrays of the parse (see relations_array_lib)
+RELATION_ENGINES = {
+    "tokens": RelationsLib,
+    "arrays": ArrayRelationsLib
+}
+
+
+def extract_all(doc: spacy.tokens.Doc,
+                timestamps: list,
+                wn_dictionary: WordNetDictionary,
+                wn_lemmatizer: WordNetLemmatizerWrapped,
+                relation_engine: str = "tokens"):
+    """
+    extract all semantic metadata (entities, entity-property pairs and relations) from a spaCy doc and list of
+    timestamps in a single pass, i.e., the doc is analyzed only once and shared by entity and relation extraction
+    """
+    assert relation_engine in RELATION_ENGINES, f"unknown relation engine {relation_engine}"
+    context = ExtractionContext(doc, wn_dictionary, wn_lemmatizer)
+
+    # 1) extract video- and event-level entities and entity-property pairs
+    with stats_lib.timer("entities"):
+        video_level_entities, event_level_entities, entity_property_pairs = \
+            EntitiesLib.extract_entities_and_properties(doc, timestamps, wn_dictionary, wn_lemmatizer, context)
+
+    # 2) extract video- and event-level relations
+    with stats_lib.timer("relations"):
+        video_level_relations, event_level_relations = \
+            RELATION_ENGINES[relation_engine].extract_relations(doc, timestamps, wn_dictionary, wn_lemmatizer, context)
+
+    return ExtractionResult(
+        video_level_entities=video_level_entities,
+        event_level_entities=event_level_entities,
+        entity_property_pairs=entity_property_pairs,
+        video_level_relations=video_level_relations,
+        event_level_relations=event_level_relations
+    )
+
+
+def extract_videos(videos,
+                   wn_dictionary: WordNetDictionary,
+                   wn_lemmatizer: WordNetLemmatizerWrapped,
+                   batch_size: int = 64,
+                   relation_engine: str = "tokens"):
+    """
+    extract all semantic metadata from a stream of (video_id, sentences, timestamps) tuples, the videos are parsed
+    in batches. Yields (video_id, result) tuples in input order, result is None when a video could not be parsed
+    """
+    # videos without any sentence are not parsed, but still have to be yielded in input order
+    pending = deque()
+
+    def videos_to_parse():
+        for video_id, sentences, timestamps in videos:
+            if len(sentences) == 0:
+                pending.append((video_id, ExtractionResult([], [], [], [], [])))
+                continue
+
+            # sort sentences according to their starting times
+            sentences, timestamps = sort_by_starting_time(sentences, timestamps)
+            pending.append((video_id, None))
+            yield sentences, (video_id, timestamps)
+
+    for doc, (video_id, timestamps) in nlp_lib.parse_many(videos_to_parse(), batch_size=batch_size, as_tuples=True):
+        while pending[0][1] is not None:
+            yield pending.popleft()
+        pending.popleft()
+
+        if doc is None:
+            result = None
+        elif stats_lib.is_enabled():
+            with stats_lib.collect() as stats:
+                stats_lib.count("tokens", len(doc))
+                result = extract_all(doc, timestamps, wn_dictionary, wn_lemmatizer, relation_engine)
+            result.stats = stats
+        else:
+            result = extract_all(doc, timestamps, wn_dictionary, wn_lemmatizer, relation_engine)
+        yield video_id, result
+
+    while len(pending) > 0:
+        yield pending.popleft()
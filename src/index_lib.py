@@ -0,0 +1,215 @@
+import os
+import sqlite3
+from itertools import product
+
+from .semantic_metadata.extraction_result import ExtractionResult
+from .wordnet_lib import WordNetLemmatizerWrapped, get_synonyms
+
+"""
+On-disk inverted index (SQLite) over extracted semantic metadata for video retrieval. Keys are lemmatized terms:
+    entity:<noun>, property:<adjective>, verb:<verb>, svo:<subject>|<verb>|<object>
+Each key maps to the videos that contain it (postings) and, for event-level metadata, to the temporal segments of the
+events in which it occurs (spans).
+"""
+KEY_KINDS = ["entity", "property", "verb", "svo"]
+
+
+class MetadataIndex:
+    """
+    inverted index from lemmatized keys to videos and event time spans, built incrementally (a video that is added
+    again replaces its previous entries). Queries are conjunctions (AND) of clauses, each clause is a disjunction (OR)
+    of terms such as "entity:dog", "verb:chase" or "svo:dog|chase|frisbee"
+    """
+
+    def __init__(self, path: str, wn_lemmatizer: WordNetLemmatizerWrapped):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS videos (id INTEGER PRIMARY KEY, video_id TEXT UNIQUE NOT NULL)")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS postings (key TEXT NOT NULL, video INTEGER NOT NULL, PRIMARY KEY (key, video)) "
+            "WITHOUT ROWID")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS postings_video ON postings (video)")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS spans (key TEXT NOT NULL, video INTEGER NOT NULL, start REAL, end REAL)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS spans_key_video ON spans (key, video)")
+        self.connection.commit()
+
+        self.wn_lemmatizer = wn_lemmatizer
+
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+
+
+    """
+    indexing
+    """
+    def add(self, video_id: str, result: ExtractionResult, commit: bool = True):
+        """
+        index the extraction result of a video (replaces the entries of the video if it was indexed before)
+        """
+        row = self.connection.execute("SELECT id FROM videos WHERE video_id = ?", (video_id,)).fetchone()
+        if row is not None:
+            video = row[0]
+            self.connection.execute("DELETE FROM postings WHERE video = ?", (video,))
+            self.connection.execute("DELETE FROM spans WHERE video = ?", (video,))
+        else:
+            video = self.connection.execute("INSERT INTO videos (video_id) VALUES (?)", (video_id,)).lastrowid
+
+        keys = set()
+        spans = {}  # used as insertion-ordered set
+        for e in result.video_level_entities:
+            keys.add(self.__entity_key(e.name))
+        for ep in result.entity_property_pairs:
+            keys.add(self.__property_key(ep.property))
+        for r in result.video_level_relations:
+            keys.update(self.__relation_keys(r))
+
+        for e in result.event_level_entities:
+            key = self.__entity_key(e.name)
+            keys.add(key)
+            spans.setdefault((key,) + tuple(e.timestamp))
+        for r in result.event_level_relations:
+            for key in self.__relation_keys(r):
+                keys.add(key)
+                spans.setdefault((key,) + tuple(r.timestamp))
+
+        self.connection.executemany("INSERT INTO postings (key, video) VALUES (?, ?)",
+                                    ((key, video) for key in keys))
+        self.connection.executemany("INSERT INTO spans (key, video, start, end) VALUES (?, ?, ?, ?)",
+                                    ((key, video, start, end) for key, start, end in spans))
+        if commit:
+            self.connection.commit()
+
+
+    def add_many(self, results):
+        """
+        index (video_id, result) tuples in a single transaction
+        """
+        for video_id, result in results:
+            self.add(video_id, result, commit=False)
+        self.connection.commit()
+
+
+    def __entity_key(self, name: str) -> str:
+        return f"entity:{self.wn_lemmatizer.lemmatize_noun(name)}"
+
+
+    def __property_key(self, prop: str) -> str:
+        return f"property:{self.wn_lemmatizer.lemmatize_adjective(prop)}"
+
+
+    def __relation_keys(self, relation) -> list:
+        verb = self.wn_lemmatizer.lemmatize_verb(relation.verb)
+        keys = [f"verb:{verb}"]
+        for subject, obj in product(relation.subjects, relation.objects):
+            keys.append(
+                f"svo:{self.wn_lemmatizer.lemmatize_noun(subject)}|{verb}|{self.wn_lemmatizer.lemmatize_noun(obj)}")
+
+        return keys
+
+
+    """
+    queries
+    """
+    def expand_term(self, term: str, with_synonyms: bool = False) -> set:
+        """
+        keys of a query term ("<kind>:<value>"), the value is lemmatized and, if desired, expanded by its synonyms
+        """
+        kind, _, value = term.partition(":")
+        assert kind in KEY_KINDS, f"unknown kind of query term {term}, expected one of {KEY_KINDS}"
+
+        def expand(word: str, word_type: str) -> set:
+            word = word.strip().lower().replace(" ", "_")
+            lemma = self.wn_lemmatizer.lemmatize(word, word_type)
+            return ({lemma} | get_synonyms(lemma, word_type)) if with_synonyms else {lemma}
+
+        if kind == "entity":
+            return {f"entity:{w}" for w in expand(value, "noun")}
+        if kind == "property":
+            return {f"property:{w}" for w in expand(value, "adj")}
+        if kind == "verb":
+            return {f"verb:{w}" for w in expand(value, "verb")}
+
+        parts = value.split("|")
+        assert len(parts) == 3, f"query term {term} should have the form svo:<subject>|<verb>|<object>"
+        subjects, verbs, objects = expand(parts[0], "noun"), expand(parts[1], "verb"), expand(parts[2], "noun")
+        return {f"svo:{s}|{v}|{o}" for s, v, o in product(subjects, verbs, objects)}
+
+
+    def __videos_of_keys(self, keys: set) -> set:
+        videos = set()
+        keys = list(keys)
+        # bounded number of SQL variables per statement (queries with synonyms may have many keys)
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            videos.update(row[0] for row in self.connection.execute(
+                f"SELECT DISTINCT video FROM postings WHERE key IN ({','.join('?' * len(chunk))})", chunk))
+
+        return videos
+
+
+    def search(self, clauses: list, with_synonyms: bool = False) -> list:
+        """
+        ids of all videos that match every clause (AND), a clause matches when any of its terms matches (OR),
+        e.g., [["entity:dog"], ["svo:dog|chase|frisbee", "svo:dog|catch|frisbee"]]
+        """
+        if len(clauses) == 0:
+            return []
+
+        # evaluate the most selective clauses first, stop as soon as no video is left
+        clause_keys = [set().union(*(self.expand_term(t, with_synonyms) for t in clause)) for clause in clauses]
+        videos = None
+        for keys in sorted(clause_keys, key=self.__n_postings):
+            videos = self.__videos_of_keys(keys) if videos is None else videos & self.__videos_of_keys(keys)
+            if len(videos) == 0:
+                return []
+
+        return self.__video_ids(videos)
+
+
+    def __n_postings(self, keys: set) -> int:
+        """
+        (estimated) number of postings of the keys, used to order clauses by selectivity
+        """
+        keys = list(keys)[:500]
+        return self.connection.execute(
+            f"SELECT COUNT(*) FROM postings WHERE key IN ({','.join('?' * len(keys))})", keys).fetchone()[0]
+
+
+    def __video_ids(self, videos: set) -> list:
+        videos = sorted(videos)
+        video_ids = []
+        for i in range(0, len(videos), 500):
+            chunk = videos[i:i + 500]
+            video_ids += [row[0] for row in self.connection.execute(
+                f"SELECT video_id FROM videos WHERE id IN ({','.join('?' * len(chunk))}) ORDER BY id", chunk)]
+
+        return video_ids
+
+
+    def spans(self, video_id: str, terms: list, with_synonyms: bool = False) -> list:
+        """
+        temporal segments of the events of a video in which any of the terms occurs (sorted by starting time)
+        """
+        keys = list(set().union(*(self.expand_term(t, with_synonyms) for t in terms)))
+        row = self.connection.execute("SELECT id FROM videos WHERE video_id = ?", (video_id,)).fetchone()
+        if row is None or len(keys) == 0:
+            return []
+
+        spans = set()
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            spans.update(self.connection.execute(
+                f"SELECT start, end FROM spans WHERE video = ? AND key IN ({','.join('?' * len(chunk))})",
+                [row[0]] + chunk))
+
+        return [[start, end] for start, end in sorted(spans)]
+
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
@@ -0,0 +1,189 @@
+from .semantic_metadata.extraction_result import ExtractionResult
+from .utils import calculate_iou
+
+"""
+Temporal indexes of event-level metadata, answering which entities or relations are active at a point in time,
+overlap a temporal segment, or match a temporal segment with a minimum IoU, without scanning all of them.
+"""
+
+
+class IntervalTree:
+    """
+    static centered interval tree over closed intervals [start, end], each interval carries a value.
+    Queries take O(log n + k) for k results, results are returned in the order in which the intervals were given
+    """
+
+    class Node:
+        __slots__ = ("center", "by_start", "by_end", "left", "right")
+
+        def __init__(self, center, by_start, by_end, left, right):
+            self.center = center
+            self.by_start = by_start  # intervals containing the center, sorted by start
+            self.by_end = by_end  # intervals containing the center, sorted by end (descending)
+            self.left = left  # intervals ending before the center
+            self.right = right  # intervals starting after the center
+
+
+    def __init__(self, intervals: list, values: list = None):
+        """
+        intervals: list of [start, end], values: value of each interval (default: index of the interval)
+        """
+        self.intervals = [(float(start), float(end)) for start, end in intervals]
+        self.values = values if values is not None else list(range(len(self.intervals)))
+        assert len(self.values) == len(self.intervals), "every interval needs exactly one value"
+        assert all(start <= end for start, end in self.intervals), "intervals should not end before they start"
+
+        self.root = self.__build(list(range(len(self.intervals))))
+
+
+    def __len__(self) -> int:
+        return len(self.intervals)
+
+
+    def __build(self, ids: list):
+        if len(ids) == 0:
+            return None
+
+        # center: median of all endpoints, i.e., each subtree holds at most half of the intervals
+        endpoints = sorted(p for idx in ids for p in self.intervals[idx])
+        center = endpoints[len(endpoints) // 2]
+
+        left, right, here = [], [], []
+        for idx in ids:
+            start, end = self.intervals[idx]
+            if end < center:
+                left.append(idx)
+            elif start > center:
+                right.append(idx)
+            else:
+                here.append(idx)
+
+        by_start = sorted(here, key=lambda idx: self.intervals[idx][0])
+        by_end = sorted(here, key=lambda idx: self.intervals[idx][1], reverse=True)
+
+        return IntervalTree.Node(center, by_start, by_end, self.__build(left), self.__build(right))
+
+
+    def __collect(self, ids: list) -> list:
+        ids.sort()
+        return [self.values[idx] for idx in ids]
+
+
+    def __query(self, query_start: float, query_end: float) -> list:
+        """
+        ids of all intervals that overlap [query_start, query_end] (a point query has query_start == query_end)
+        """
+        ids = []
+        stack = [self.root] if self.root is not None else []
+        while len(stack) > 0:
+            node = stack.pop()
+            if query_end < node.center:
+                # all intervals of the node end at or after the center, i.e., after the query
+                for idx in node.by_start:
+                    if self.intervals[idx][0] > query_end:
+                        break
+                    ids.append(idx)
+                if node.left is not None:
+                    stack.append(node.left)
+
+            elif query_start > node.center:
+                # all intervals of the node start at or before the center, i.e., before the query
+                for idx in node.by_end:
+                    if self.intervals[idx][1] < query_start:
+                        break
+                    ids.append(idx)
+                if node.right is not None:
+                    stack.append(node.right)
+
+            else:
+                # the query contains the center, i.e., it overlaps all intervals of the node
+                ids += node.by_start
+                if node.left is not None:
+                    stack.append(node.left)
+                if node.right is not None:
+                    stack.append(node.right)
+
+        return ids
+
+
+    def at(self, t: float) -> list:
+        """
+        values of all intervals that contain the point in time t
+        """
+        return self.__collect(self.__query(t, t))
+
+
+    def overlapping(self, start: float, end: float) -> list:
+        """
+        values of all intervals that overlap the segment [start, end] (touching counts as overlapping)
+        """
+        assert start <= end, "segment should not end before it starts"
+        return self.__collect(self.__query(start, end))
+
+
+    def matching(self, segment: list, min_iou: float) -> list:
+        """
+        values of all intervals whose IoU with the segment is at least min_iou (IoU as of utils.calculate_iou)
+        """
+        if min_iou <= 0:
+            return list(self.values)
+
+        # intervals with a positive IoU overlap the segment
+        ids = [idx for idx in self.__query(segment[0], segment[1])
+               if calculate_iou(self.intervals[idx], segment) >= min_iou]
+
+        return self.__collect(ids)
+
+
+    """
+    bulk queries (e.g., for timelines and segment-level retrieval)
+    """
+    def at_many(self, times) -> list:
+        return [self.at(t) for t in times]
+
+
+    def overlapping_many(self, segments) -> list:
+        return [self.overlapping(start, end) for start, end in segments]
+
+
+    def matching_many(self, segments, min_iou: float) -> list:
+        return [self.matching(segment, min_iou) for segment in segments]
+
+
+
+class TemporalIndex:
+    """
+    interval trees over the event-level entities and event-level relations of an extraction result
+    """
+
+    def __init__(self, result: ExtractionResult):
+        self.entities = IntervalTree([e.timestamp for e in result.event_level_entities], result.event_level_entities)
+        self.relations = IntervalTree([r.timestamp for r in result.event_level_relations], result.event_level_relations)
+
+
+    def at(self, t: float):
+        """
+        event-level entities and relations that are active at the point in time t
+        """
+        return self.entities.at(t), self.relations.at(t)
+
+
+    def overlapping(self, start: float, end: float):
+        """
+        event-level entities and relations that overlap the segment [start, end]
+        """
+        return self.entities.overlapping(start, end), self.relations.overlapping(start, end)
+
+
+    def matching(self, segment: list, min_iou: float):
+        """
+        event-level entities and relations whose IoU with the segment is at least min_iou
+        """
+        return self.entities.matching(segment, min_iou), self.relations.matching(segment, min_iou)
+
+
+    def timeline(self, times) -> list:
+        """
+        (entities, relations) active at each of the given points in time
+        """
+        return [self.at(t) for t in times]
@@ -1,8 +1,19 @@
+import os
+from itertools import islice
+from pathlib import Path
+
 import spacy
 import neuralcoref
+from spacy.tokens import Doc
 
+from src import stats_lib
 from src.constants import Tags
 
+
+# per-doc indices, built on first use (see get_sentence_index and get_coref_index)
+Doc.set_extension("sentence_index", default=None, force=True)
+Doc.set_extension("coref_index", default=None, force=True)
+
 """ 
 Custom spaCy language parser with NeuralCoref
 """
@@ -20,20 +31,149 @@ def custom_sentencizer(doc):
     return doc
 
 
-def get_parser():
-    nlp = spacy.load("en_core_web_lg")
+DEFAULT_MODEL = "en_core_web_lg"
+# components of the spaCy model that are not used by the extraction (EntitiesLib and RelationsLib use POS tags,
+# lemmas and dependencies only). NER is used by NeuralCoref for named entity mentions, i.e., it is only disabled by
+# default when coreference resolution is not used (otherwise the resolved pronouns could change)
+UNUSED_COMPONENTS_WITHOUT_COREF = ("ner",)
+
+
+def get_default_disabled_components(coref: bool = True) -> tuple:
+    return () if coref else UNUSED_COMPONENTS_WITHOUT_COREF
+
+
+def get_parser(model: str = DEFAULT_MODEL, disable: tuple = None, coref: bool = True):
+    """
+    create a language parser, components of the spaCy model given in disable are not loaded
+    (default: see get_default_disabled_components)
+    """
+    disable = get_default_disabled_components(coref) if disable is None else disable
+    nlp = spacy.load(model, disable=list(disable))
 
     # add custom sentencizer to pipeline in front of the parser itself
     nlp.add_pipe(custom_sentencizer, before="parser")
 
     # add neuralcoref to pipeline to enable pronoun resolution
-    neuralcoref.add_to_pipe(nlp)
+    # (as it is used for pronoun resolution only, it is skipped for docs without any pronoun)
+    if coref:
+        neuralcoref.add_to_pipe(nlp)
+        nlp.replace_pipe("neuralcoref", PronounGatedCoref(nlp.get_pipe("neuralcoref")))
 
     return nlp
 
 
-print("building the language parser ...")
-nlp = get_parser()
+
+class PronounGatedCoref:
+    """
+    wrapper of the NeuralCoref pipeline component, which runs coreference resolution only for docs that contain
+    a pronoun (according to the tagger), all other docs are passed through unchanged
+    """
+
+    def __init__(self, coref):
+        self.coref = coref
+        self.n_docs = 0
+        self.n_skipped_docs = 0
+
+
+    def __call__(self, doc):
+        self.n_docs += 1
+        if not has_pronoun(doc):
+            self.n_skipped_docs += 1
+            return doc
+
+        return self.coref(doc)
+
+
+    def pipe(self, docs, batch_size: int = 128, **kwargs):
+        """
+        batched processing (used by nlp.pipe), only the docs with pronouns of a batch are forwarded to NeuralCoref
+        """
+        docs = iter(docs)
+        while True:
+            batch = list(islice(docs, batch_size))
+            if len(batch) == 0:
+                return
+
+            needs_coref = [has_pronoun(doc) for doc in batch]
+            docs_with_pronouns = [doc for doc, flag in zip(batch, needs_coref) if flag]
+            self.n_docs += len(batch)
+            self.n_skipped_docs += len(batch) - len(docs_with_pronouns)
+
+            resolved_docs = iter(self.coref.pipe(docs_with_pronouns, batch_size=batch_size, **kwargs)) \
+                if len(docs_with_pronouns) > 0 else iter([])
+            for doc, flag in zip(batch, needs_coref):
+                yield next(resolved_docs) if flag else doc
+
+
+    def stats(self) -> dict:
+        return {
+            "docs": self.n_docs,
+            "coref_skipped": self.n_skipped_docs
+        }
+
+
+# the shared language parser is created on first use (see get_nlp)
+_parser_config = {"model": DEFAULT_MODEL, "disable": get_default_disabled_components(True), "coref": True}
+_nlp = None
+
+
+def configure_parser(model: str = DEFAULT_MODEL, disable: tuple = None, coref: bool = True):
+    """
+    configure the shared language parser (an already created parser is discarded and created again on next use)
+    """
+    global _nlp, _parser_config
+    disable = get_default_disabled_components(coref) if disable is None else disable
+    _parser_config = {"model": model, "disable": tuple(disable), "coref": coref}
+    _nlp = None
+
+
+def get_parser_config() -> dict:
+    return dict(_parser_config)
+
+
+def get_nlp():
+    """
+    get the shared language parser, which is created on first use
+    """
+    global _nlp
+    if _nlp is None:
+        print("building the language parser ...")
+        _nlp = get_parser(**_parser_config)
+
+    return _nlp
+
+
+def get_coref_stats() -> dict:
+    """
+    number of docs processed by the shared language parser and how often coreference resolution was skipped
+    (docs without pronouns), counts of docs parsed in other processes (n_process > 1) are not included
+    """
+    if _nlp is None or "neuralcoref" not in _nlp.pipe_names:
+        return {"docs": 0, "coref_skipped": 0}
+
+    return _nlp.get_pipe("neuralcoref").stats()
+
+
+def get_model_version():
+    """
+    identifier of the language parser (model, model version, spaCy version and pipeline components),
+    i.e., documents parsed by parsers with the same identifier are equal. The model itself is not loaded for this
+    """
+    model = _parser_config["model"]
+    if _nlp is not None:
+        # the pipeline of a created parser already contains the custom sentencizer and NeuralCoref
+        meta = _nlp.meta
+        pipeline = list(_nlp.pipe_names)
+    else:
+        model_path = Path(model) if os.path.isdir(model) else spacy.util.get_package_path(model)
+        meta = spacy.util.get_model_meta(model_path)
+        pipeline = [name for name in meta.get("pipeline", []) if name not in _parser_config["disable"]]
+        if "parser" in pipeline:
+            pipeline.insert(pipeline.index("parser"), custom_sentencizer.__name__)
+        if _parser_config["coref"]:
+            pipeline.append("neuralcoref")
+
+    return f"{meta['lang']}_{meta['name']}-{meta['version']}|spacy-{spacy.__version__}|{','.join(pipeline)}"
 
 
 
@@ -45,16 +185,98 @@ def parse(sentences: list):
     use language parser to parse sentences
     """
     n_sentences = len(sentences)
-    text = concat_sentences(sentences, n_sentences)
-    doc = nlp(text)
+    with stats_lib.timer("concat"):
+        text = concat_sentences(sentences, n_sentences)
+    with stats_lib.timer("parse"):
+        doc = get_nlp()(text)
+
+    # check whether the number of sentences from doc is equal to the expected number of sentences
+    assert has_n_sentences(doc, n_sentences), \
+        f"expected {n_sentences} sentences, but spaCy found {sum(1 for _ in doc.sents)}:\n{text}"
+
+    return doc
+
+
+def tag(sentences: list):
+    """
+    use language parser to tag sentences, i.e., only the components up to the tagger are run
+    (the doc can be completed by complete_parse, e.g., when its POS tags show that it is needed)
+    """
+    nlp = get_nlp()
+    with stats_lib.timer("concat"):
+        text = concat_sentences(sentences, len(sentences))
+    with stats_lib.timer("parse"):
+        doc = nlp.make_doc(text)
+        for name, component in nlp.pipeline[:nlp.pipe_names.index("tagger") + 1]:
+            doc = component(doc)
+
+    return doc
+
+
+def complete_parse(doc: spacy.tokens.Doc, n_sentences: int):
+    """
+    run the remaining components of the language parser (after the tagger) on a doc created by tag,
+    the result equals the doc created by parse
+    """
+    nlp = get_nlp()
+    with stats_lib.timer("parse"):
+        for name, component in nlp.pipeline[nlp.pipe_names.index("tagger") + 1:]:
+            doc = component(doc)
 
     # check whether the number of sentences from doc is equal to the expected number of sentences
-    assert sum(1 for _ in enumerate(doc.sents)) == n_sentences, \
-        "expected {n_sentences} sentences, but spaCy found {sum(1 for _ in enumerate(doc.sents))}:\n{text}"
+    assert has_n_sentences(doc, n_sentences), \
+        f"expected {n_sentences} sentences, but spaCy found {sum(1 for _ in doc.sents)}:\n{doc.text}"
 
     return doc
 
 
+def parse_many(sentence_lists, batch_size: int = 64, n_process: int = 1, as_tuples: bool = False):
+    """
+    use language parser to parse the sentences of multiple videos in batches (using nlp.pipe),
+    yields one doc per video in input order, or None when the sentences of a video could not be parsed correctly.
+    when as_tuples is True, the input consists of (sentences, context) tuples and (doc, context) tuples are yielded
+    """
+    def texts():
+        for item in sentence_lists:
+            sentences, context = item if as_tuples else (item, None)
+            n_sentences = len(sentences)
+            yield concat_sentences(sentences, n_sentences), (n_sentences, context)
+
+    for doc, (n_sentences, context) in get_nlp().pipe(texts(), as_tuples=True, batch_size=batch_size,
+                                                      n_process=n_process):
+        # check whether the number of sentences from doc is equal to the expected number of sentences,
+        # but do not abort the whole batch when the check fails for a single video
+        if not has_n_sentences(doc, n_sentences):
+            print(f"expected {n_sentences} sentences, but spaCy found {sum(1 for _ in doc.sents)}:\n{doc.text}")
+            doc = None
+
+        yield (doc, context) if as_tuples else doc
+
+
+def parse_syntax_many(sentence_lists, batch_size: int = 64):
+    """
+    like parse_many, but only the components up to the parser are run (POS tags, lemmas, sentences and dependencies),
+    i.e., the components after the parser (NER, NeuralCoref) are skipped
+    """
+    nlp = get_nlp()
+    disable = nlp.pipe_names[nlp.pipe_names.index("parser") + 1:]
+
+    def texts():
+        for sentences in sentence_lists:
+            n_sentences = len(sentences)
+            yield concat_sentences(sentences, n_sentences), n_sentences
+
+    for doc, n_sentences in nlp.pipe(texts(), as_tuples=True, batch_size=batch_size, disable=disable):
+        yield doc if has_n_sentences(doc, n_sentences) else None
+
+
+def has_n_sentences(doc: spacy.tokens.Doc, n_sentences: int):
+    """
+    check whether spaCy found the expected number of sentences in a doc
+    """
+    return sum(1 for _ in doc.sents) == n_sentences
+
+
 def concat_sentences(sentences: list, n_sentences: int):
     """
     concat multiple sentences to a longer text
@@ -86,6 +308,55 @@ def process_sentence(sentence: str):
 """
 Further functionality provided by spaCy
 """
+def has_pronoun(doc: spacy.tokens.Doc):
+    """
+    check whether a doc contains any pronoun (requires the tagger)
+    """
+    return any(token.pos_ == Tags.PRON for token in doc)
+
+
+def get_sentence_index(doc: spacy.tokens.Doc):
+    """
+    get the index of the sentence of each token in a doc, i.e., get_sentence_index(doc)[token.i]
+    (the index is built once per doc and then shared by all users of the doc)
+    """
+    if doc._.sentence_index is None:
+        sentence_index = [None] * len(doc)
+        for idx, sent in enumerate(doc.sents):
+            sentence_index[sent.start:sent.end] = [idx] * (sent.end - sent.start)
+        doc._.sentence_index = sentence_index
+
+    return doc._.sentence_index
+
+
+def get_sentence_idx_of_token(token: spacy.tokens.Token):
+    """
+    find the sentence to which a token belongs
+    """
+    return get_sentence_index(token.doc)[token.i]
+
+
+def get_coref_index(doc: spacy.tokens.Doc):
+    """
+    map the index of each token that is part of a coreference mention (determined by NeuralCoref) to the index of the
+    root token of the main mention of its cluster. When a token occurs in mentions of multiple clusters, the first
+    cluster is used (the index is built once per doc and then shared by all users of the doc).
+    The index is empty when NeuralCoref is not used (configure_parser with coref=False)
+    """
+    if doc._.coref_index is None:
+        coref_index = {}
+        # the extensions of NeuralCoref are only registered once it is added to a pipeline
+        if Doc.has_extension("has_coref") and doc._.has_coref:
+            for cluster in doc._.coref_clusters:
+                main_root_idx = cluster.main.root.i
+                for mention in cluster.mentions:
+                    for i in range(mention.start, mention.end):
+                        coref_index.setdefault(i, main_root_idx)
+        doc._.coref_index = coref_index
+
+    return doc._.coref_index
+
+
 def pronoun_resolution(token: spacy.tokens.Token, doc: spacy.tokens.Doc):
     """
     perform pronoun resolution (using determined clusters by NeuralCoref) for a given pronoun token
@@ -94,19 +365,9 @@ def pronoun_resolution(token: spacy.tokens.Token, doc: spacy.tokens.Doc):
         return token
 
     # we have a pronoun -> try pronoun resolution
-    if not doc._.has_coref:
-        return token
-
-    cluster_of_token = None
-    for cluster in doc._.coref_clusters:
-        for mention in cluster.mentions:
-            if token in mention:
-                cluster_of_token = cluster
-                break
-        if cluster_of_token:
-            break
-
-    if not cluster_of_token:
+    stats_lib.count("coref_lookups")
+    main_root_idx = get_coref_index(doc).get(token.i)
+    if main_root_idx is None:
         return token
 
-    return cluster.main.root
+    return doc[main_root_idx]
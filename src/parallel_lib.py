@@ -0,0 +1,115 @@
+import multiprocessing
+from collections import deque
+from itertools import islice
+
+from . import nlp_lib, stats_lib
+from .dedup_lib import SentenceCache, extract_videos_deduplicated
+from .extraction_lib import extract_videos
+from .semantic_metadata.extraction_result import ExtractionResult
+from .wordnet_lib import WordNetDictionary, WordNetLemmatizerWrapped
+
+"""
+Parallel extraction of semantic metadata using a pool of worker processes. Each worker loads the language parser
+(configured like the shared parser of the main process) and WordNet once and then processes chunks of videos,
+results are sent back serialized (using to_dict).
+"""
+# per-worker state, set by _init_worker
+_wn_dictionary = None
+_wn_lemmatizer = None
+_sentence_cache = None
+
+
+def _init_worker(parser_config: dict, dedup_sentences: bool, collect_stats: bool):
+    global _wn_dictionary, _wn_lemmatizer, _sentence_cache
+
+    stats_lib.enable(collect_stats)
+
+    # make sure that the language parser (configured like the one of the main process) is resident in the worker
+    nlp_lib.configure_parser(**parser_config)
+    nlp_lib.get_nlp()
+
+    _wn_dictionary = WordNetDictionary()
+    _wn_lemmatizer = WordNetLemmatizerWrapped()
+    if dedup_sentences:
+        _sentence_cache = SentenceCache(_wn_dictionary, _wn_lemmatizer)
+
+
+def _extract_chunk(chunk: list, batch_size: int):
+    coref_stats_before = nlp_lib.get_coref_stats()
+    if _sentence_cache is not None:
+        extracted = extract_videos_deduplicated(chunk, _wn_dictionary, _wn_lemmatizer, batch_size, _sentence_cache)
+    else:
+        extracted = extract_videos(chunk, _wn_dictionary, _wn_lemmatizer, batch_size=batch_size)
+
+    results = []
+    for video_id, result in extracted:
+        if result is None:
+            results.append((video_id, None, None))
+        else:
+            results.append((video_id, result.to_dict(), result.stats))
+
+    # coreference statistics of this chunk
+    coref_stats = {k: v - coref_stats_before[k] for k, v in nlp_lib.get_coref_stats().items()}
+
+    return results, coref_stats
+
+
+def _iter_chunks(iterable, chunk_size: int):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if len(chunk) == 0:
+            return
+        yield chunk
+
+
+def extract_videos_parallel(videos,
+                            n_workers: int = None,
+                            chunk_size: int = 32,
+                            batch_size: int = 64,
+                            dedup_sentences: bool = False,
+                            coref_stats: dict = None):
+    """
+    extract all semantic metadata from a stream of (video_id, sentences, timestamps) tuples using n_workers processes
+    (default: number of CPUs), with dedup_sentences each worker reuses the semantic metadata of sentences it has
+    already seen (see dedup_lib). Yields (video_id, result) tuples in input order, result is None when a video could not
+    be parsed. At most 2 * n_workers chunks are in flight, i.e., memory usage does not depend on the number of videos.
+    If given, the coreference statistics of all workers are added up in coref_stats. Per-video statistics are collected
+    by the workers when stats_lib is enabled in the main process
+    """
+    n_workers = n_workers if n_workers is not None else multiprocessing.cpu_count()
+    assert n_workers > 0 and chunk_size > 0, "number of workers and chunk size should be positive"
+    max_pending_chunks = 2 * n_workers
+    batch_size = min(batch_size, chunk_size)
+
+    if coref_stats is not None:
+        coref_stats.setdefault("docs", 0)
+        coref_stats.setdefault("coref_skipped", 0)
+
+    def collect(async_result):
+        results, chunk_coref_stats = async_result.get()
+        if coref_stats is not None:
+            for k, v in chunk_coref_stats.items():
+                coref_stats[k] += v
+
+        for video_id, d, stats in results:
+            if d is None:
+                yield video_id, None
+                continue
+
+            result = ExtractionResult.from_dict(d)
+            result.stats = stats
+            yield video_id, result
+
+    parser_config = nlp_lib.get_parser_config()
+    initargs = (parser_config, dedup_sentences, stats_lib.is_enabled())
+    with multiprocessing.Pool(n_workers, initializer=_init_worker, initargs=initargs) as pool:
+        # results are collected in the order of submission, which makes the output deterministic
+        pending = deque()
+        for chunk in _iter_chunks(videos, chunk_size):
+            pending.append(pool.apply_async(_extract_chunk, (chunk, batch_size)))
+            if len(pending) >= max_pending_chunks:
+                yield from collect(pending.popleft())
+
+        while len(pending) > 0:
+            yield from collect(pending.popleft())
@@ -0,0 +1,293 @@
+import numpy as np
+import spacy
+from spacy.attrs import HEAD, DEP, POS, LOWER, LEMMA
+
+from . import stats_lib
+from .constants import Tags, Dependencies
+from .entities_lib import ExtractionContext, EntityRegistry
+from .relations_lib import RelationsLib, VERB_TAGS, PASSIVE_VERBS_DEPS, VERB_MODIFIERS, VERB_MODIFIERS_FOR_POBJ, \
+    PREPOSITIONS
+from .wordnet_lib import WordNetDictionary, WordNetLemmatizerWrapped
+
+"""
+Alternative relation extraction engine with the same rules and results as RelationsLib, but working on token indices:
+the heads, dependencies, POS tags, lower-cased texts and lemmas of all tokens are read once per doc (doc.to_array) and
+the children of each token are precomputed, i.e., the searches for subjects, objects and modifiers are done on integer
+arrays and lists instead of spaCy tokens and their string attributes.
+"""
+
+
+class DocArrays:
+    """
+    integer representation of the parse of a doc (one entry per token)
+    """
+
+    def __init__(self, doc: spacy.tokens.Doc, entity_registry: EntityRegistry):
+        self.doc = doc
+        self.entity_registry = entity_registry
+
+        n_tokens = len(doc)
+        attrs = doc.to_array([HEAD, DEP, POS, LOWER, LEMMA]).astype(np.uint64).view(np.int64).reshape(n_tokens, 5)
+        # HEAD is stored relative to the token
+        self.head = (np.arange(n_tokens, dtype=np.int64) + attrs[:, 0]).tolist()
+        self.dep = attrs[:, 1].tolist()
+        self.pos = attrs[:, 2].tolist()
+        self.lower = attrs[:, 3].tolist()
+        self.lemma = attrs[:, 4].tolist()
+
+        # children of each token in the order of the doc (like token.children)
+        self.children = [[] for _ in range(n_tokens)]
+        for i, head in enumerate(self.head):
+            if head != i:
+                self.children[head].append(i)
+
+        # ids of the labels, tags and strings the rules use
+        strings = doc.vocab.strings
+        self.ids = {label: strings[label] for label in [
+            Dependencies.NSUBJ, Dependencies.NSUBJPASS, Dependencies.ACL, Dependencies.DOBJ, Dependencies.POBJ,
+            Dependencies.CONJ, Tags.PRON, Tags.ADV, Tags.ADP, "be"]}
+        self.verb_tags = {strings[tag] for tag in VERB_TAGS}
+        self.passive_verb_deps = {strings[dep] for dep in PASSIVE_VERBS_DEPS}
+        self.verb_modifiers = {(strings[dep], strings[pos]) for dep, pos in VERB_MODIFIERS}
+        self.verb_modifiers_for_pobj = {(strings[dep], strings[pos]) for dep, pos in VERB_MODIFIERS_FOR_POBJ}
+        self.prepositions = {strings[p] for p in PREPOSITIONS}
+
+        self.is_entity = [entity_registry.has_index(i) for i in range(n_tokens)]
+        self.is_pronoun = [pos == self.ids[Tags.PRON] for pos in self.pos]
+
+
+    def is_entity_or_pronoun(self, i: int) -> bool:
+        return self.is_entity[i] or self.is_pronoun[i]
+
+
+    def is_preposition(self, i: int) -> bool:
+        return self.lower[i] in self.prepositions
+
+
+
+class ArrayRelationsLib:
+
+    @staticmethod
+    def extract_relations(doc: spacy.tokens.Doc,
+                          timestamps: list,
+                          wn_dictionary: WordNetDictionary,
+                          wn_lemmatizer: WordNetLemmatizerWrapped,
+                          context: ExtractionContext = None):
+        """
+        extract event-level and video-level relations from a spaCy doc and list of timestamps
+        (same interface and results as RelationsLib.extract_relations)
+        """
+        # determine entities
+        if context is None:
+            context = ExtractionContext(doc, wn_dictionary, wn_lemmatizer)
+        entity_registry = context.entity_registry
+        a = DocArrays(doc, entity_registry)
+
+        # inform the user when the input text does not contain any verb
+        if not any(pos in a.verb_tags for pos in a.pos):
+            print(f"\nno relation can be extracted (input text does not contain any verb): \n{doc}")
+            return [], []
+
+        # 1) search for verbs
+        verbs = []
+        for i, pos in enumerate(a.pos):
+            if pos in a.verb_tags:
+
+                if any(a.dep[child] in a.passive_verb_deps for child in a.children[i]):
+                    # do not use passive verbs
+                    continue
+
+                # verb is valid only when it is known by WordNet or lemmatized to "be" (see RelationsLib)
+                if wn_dictionary.is_wordnet_verb(doc[i]) or a.lemma[i] == a.ids["be"]:
+                    verbs.append(i)
+
+        # 2) search for fitting subject
+        tuples = []
+        for verb in verbs:
+            subject = ArrayRelationsLib.__find_subject_for_verb(verb, a)
+            if subject is not None:
+                tuples.append((subject, verb))
+
+        # 3) search for fitting objects
+        candidate_relations = []
+        for subject, verb in tuples:
+            modifiers_of_objects, objects = ArrayRelationsLib.__find_objects_for_verb(verb, a, wn_dictionary)
+            for modifiers, object in zip(modifiers_of_objects, objects):
+                candidate_relations.append((subject, verb, modifiers, object))
+
+        # process the potential relations
+        # 1) for both subject and object look for conjunctions
+        relations = []
+        for subject, verb, modifiers, object in candidate_relations:
+            relations.append([
+                ArrayRelationsLib.__find_conjunct_tokens_of_entities_or_prons(subject, a),
+                verb,
+                modifiers,
+                ArrayRelationsLib.__find_conjunct_tokens_of_entities_or_prons(object, a)
+            ])
+
+        # 2) finalize the relations (on tokens again, like RelationsLib)
+        relations = [
+            [[doc[t] for t in subjects], doc[verb], [doc[t] for t in modifiers], [doc[t] for t in objects]]
+            for subjects, verb, modifiers, objects in relations]
+        return RelationsLib.finalize_relations(relations, doc, timestamps, wn_dictionary, entity_registry)
+
+
+    """
+    helper functions, equivalent to the ones of RelationsLib (tokens are represented by their index)
+    """
+    @staticmethod
+    def __find_subject_for_verb(verb: int, a: DocArrays):
+        nsubj = a.ids[Dependencies.NSUBJ]
+
+        # 1) the verb itself has a child with a desired subject dependency (entities before pronouns)
+        for child in a.children[verb]:
+            if a.dep[child] == nsubj and a.is_entity[child]:
+                return child
+        for child in a.children[verb]:
+            if a.dep[child] == nsubj and a.is_pronoun[child]:
+                return child
+
+        # 2) if the verb itself has the dependency "acl" and parent NOUN, then the parent is the subject
+        if a.dep[verb] == a.ids[Dependencies.ACL] and a.is_entity_or_pronoun(a.head[verb]):
+            return a.head[verb]
+
+        # 3) climb up the heads until a token with a desired subject dependency is found
+        return ArrayRelationsLib.__find_subject_of_parent(a.head[verb], a)
+
+
+    @staticmethod
+    def __find_subject_of_parent(parent: int, a: DocArrays):
+        subject_deps = (a.ids[Dependencies.NSUBJ], a.ids[Dependencies.NSUBJPASS])
+
+        def is_subject(t: int):
+            return a.dep[t] in subject_deps and a.is_entity_or_pronoun(t)
+
+        climb = 1
+        while True:
+            stats_lib.record_max("subject_climb_length", climb)
+
+            # parent may be a subject
+            if is_subject(parent):
+                return parent
+
+            # subject may be any child of the parent (prioritize entities before pronouns)
+            subjects = [child for child in a.children[parent] if is_subject(child)]
+            for s in subjects:
+                if a.is_entity[s]:
+                    return s
+            if len(subjects) > 0:
+                return subjects[0]
+
+            # no subject found on this height
+            if a.head[parent] == parent:
+                return None
+            parent = a.head[parent]
+            climb += 1
+
+
+    @staticmethod
+    def __find_objects_for_verb(verb: int, a: DocArrays, wn_dictionary: WordNetDictionary):
+        objects, modifiers_of_objects = [], []
+
+        # 1) dobj: direct objects
+        dobj = a.ids[Dependencies.DOBJ]
+        for child in a.children[verb]:
+            if a.dep[child] == dobj and a.is_entity_or_pronoun(child):
+                objects.append(child)
+                modifiers_of_objects.append([])
+
+        # 2) pobj: objects of preposition, relations with a coordinating conjunction in the modifiers are split up
+        pobjs, modifiers_of_pobjs = ArrayRelationsLib.__find_pobj(verb, verb, a, wn_dictionary, 1)
+
+        conj = a.ids[Dependencies.CONJ]
+        new_pobjs, modifiers_of_new_pobjs = [], []
+        for pobj, modifiers_of_pobj in zip(pobjs, modifiers_of_pobjs):
+
+            conj_token = [t for t in modifiers_of_pobj if a.dep[t] == conj]
+            if len(conj_token) == 0 or len(modifiers_of_pobj) == 1:
+                continue
+
+            conj_token = conj_token[0]
+            parent_token = a.head[conj_token]
+
+            # nothing to split up
+            if parent_token not in modifiers_of_pobj:
+                continue
+
+            # new relation
+            new_modifiers_of_pobj = [t for t in modifiers_of_pobj if t != parent_token]
+            modifiers_of_new_pobjs.append(new_modifiers_of_pobj)
+            new_pobjs.append(pobj)
+
+            # remove the CONJ from the other modifier list of other relation
+            modifiers_of_pobj.remove(conj_token)
+
+            assert len(modifiers_of_pobj) == len(new_modifiers_of_pobj), \
+                "when using conj in pobj search, then the corresponding tokens on paths should have the same length"
+        pobjs += new_pobjs
+        modifiers_of_pobjs += modifiers_of_new_pobjs
+
+        objects += pobjs
+        modifiers_of_objects += modifiers_of_pobjs
+
+        # verb particles (leafs of the verb) are added to the modifiers of all objects
+        adp = a.ids[Tags.ADP]
+        leaf_modifiers = [
+            child for child in a.children[verb]
+            if (a.dep[child], a.pos[child]) in a.verb_modifiers and len(a.children[child]) == 0
+            and a.pos[child] == adp and a.is_preposition(child)
+        ]
+        for modifiers_of_object in modifiers_of_objects:
+            modifiers_of_object += leaf_modifiers
+            modifiers_of_object.sort()
+
+        return modifiers_of_objects, objects
+
+
+    @staticmethod
+    def __find_pobj(token: int, root_verb: int, a: DocArrays, wn_dictionary: WordNetDictionary, depth: int):
+        stats_lib.record_max("pobj_recursion_depth", depth)
+        pobj = a.ids[Dependencies.POBJ]
+        adv, adp = a.ids[Tags.ADV], a.ids[Tags.ADP]
+
+        pobjs, modifier_lists = [], []
+        for child in a.children[token]:
+            if root_verb != token and a.dep[child] == pobj and a.is_entity_or_pronoun(child):
+                # pobj found, i.e., return it and the current token, do not search any deeper
+                return [child], [[token]]
+
+            # no pobj found, i.e., search recursively by using method on all child tokens
+            if (a.dep[child], a.pos[child]) in a.verb_modifiers_for_pobj:
+                # check whether we have a valid adverb or preposition
+                if a.pos[child] == adv and not wn_dictionary.is_wordnet_adverb(a.doc[child]):
+                    continue
+                elif a.pos[child] == adp and not a.is_preposition(child):
+                    print(f"preposition {a.doc[child]} not known. Add it to PREPOSITIONS in entities_lib.py if desired.")
+                    continue
+                pobjs_rec, modifiers_rec = ArrayRelationsLib.__find_pobj(child, root_verb, a, wn_dictionary, depth + 1)
+                pobjs += pobjs_rec
+                modifier_lists += modifiers_rec
+
+        # if there is a pobj, add the current token to the modifier list
+        if token != root_verb:
+            for modifiers in modifier_lists:
+                modifiers.append(token)
+
+        # validate
+        for modifiers in modifier_lists:
+            assert len([t for t in modifiers if (a.dep[t], a.pos[t]) not in a.verb_modifiers_for_pobj]) == 0, \
+                "error in pobj"
+
+        return pobjs, modifier_lists
+
+
+    @staticmethod
+    def __find_conjunct_tokens_of_entities_or_prons(token: int, a: DocArrays):
+        conj = a.ids[Dependencies.CONJ]
+        conjunct_tokens = [token]
+        for child in a.children[token]:
+            if a.dep[child] == conj and a.is_entity_or_pronoun(child):
+                conjunct_tokens += ArrayRelationsLib.__find_conjunct_tokens_of_entities_or_prons(child, a)
+
+        return conjunct_tokens
@@ -1,8 +1,9 @@
 import spacy
 
+from . import stats_lib
 from .constants import Tags, Dependencies
-from .entities_lib import EntitiesLib
-from .nlp_lib import pronoun_resolution
+from .entities_lib import ExtractionContext, EntityRegistry
+from .nlp_lib import pronoun_resolution, get_sentence_idx_of_token
 from .semantic_metadata.event_relation import EventRelation
 from .semantic_metadata.video_relation import VideoRelation
 from .wordnet_lib import WordNetDictionary, WordNetLemmatizerWrapped
@@ -40,16 +41,17 @@ class RelationsLib:
     def extract_relations(doc: spacy.tokens.Doc,
                           timestamps: list,
                           wn_dictionary: WordNetDictionary,
-                          wn_lemmatizer: WordNetLemmatizerWrapped):
+                          wn_lemmatizer: WordNetLemmatizerWrapped,
+                          context: ExtractionContext = None):
         """
         core functionality of this class:
         extract event-level and video-level relations from a spaCy doc and list of timestamps
+        (an ExtractionContext of the doc may be given to reuse the entities already detected for the doc)
         """
         # determine entities
-        noun_compounds, tokens_for_noun_compounds, nouns, tokens_for_nouns, tokens_for_entities = \
-            EntitiesLib.extract_nouns_from_doc(doc, wn_dictionary, wn_lemmatizer)
-        entity_names = noun_compounds + nouns
-        entity_tokens = tokens_for_noun_compounds + tokens_for_nouns
+        if context is None:
+            context = ExtractionContext(doc, wn_dictionary, wn_lemmatizer)
+        entity_registry = context.entity_registry
 
         # inform the user when the input text does not contain any verb
         if not any([token.pos_ in VERB_TAGS for token in doc]):
@@ -75,14 +77,14 @@ class RelationsLib:
         # 2) search for fitting subject
         tuples = []
         for verb in verbs:
-            subject = RelationsLib.__find_subject_for_verb(verb, tokens_for_entities)
+            subject = RelationsLib.__find_subject_for_verb(verb, entity_registry)
             if subject is not None:
                 tuples.append((subject, verb))
 
         # 3) search for fitting objects
         candidate_relations = []
         for subject, verb in tuples:
-            modifiers_of_objects, objects = RelationsLib.__find_objects_for_verb(verb, tokens_for_entities, wn_dictionary)
+            modifiers_of_objects, objects = RelationsLib.__find_objects_for_verb(verb, entity_registry, wn_dictionary)
             for modifiers, object in zip(modifiers_of_objects, objects):
                 candidate_relations.append((subject, verb, modifiers, object))
 
@@ -91,23 +93,37 @@ class RelationsLib:
         relations = []
         for subject, verb, modifiers, object in candidate_relations:
             relations.append([
-                RelationsLib.__find_conjunct_tokens_of_entities_or_prons(subject, tokens_for_entities),
+                RelationsLib.__find_conjunct_tokens_of_entities_or_prons(subject, entity_registry),
                 verb,
                 modifiers,
-                RelationsLib.__find_conjunct_tokens_of_entities_or_prons(object, tokens_for_entities)
+                RelationsLib.__find_conjunct_tokens_of_entities_or_prons(object, entity_registry)
             ])
 
         # 2) finalize the relations
-        video_level_relations = []
-        event_level_relations = []
+        return RelationsLib.finalize_relations(relations, doc, timestamps, wn_dictionary, entity_registry)
+
+
+    @staticmethod
+    def finalize_relations(relations: list,
+                           doc: spacy.tokens.Doc,
+                           timestamps: list,
+                           wn_dictionary: WordNetDictionary,
+                           entity_registry: EntityRegistry):
+        """
+        turn the relations found in a doc, given as [subject tokens, verb token, modifier tokens, object tokens],
+        into unique video-level and event-level relations (shared by all relation extraction engines)
+        """
+        # dicts are used as insertion-ordered sets to make the extracted relations unique
+        video_level_relations = {}
+        event_level_relations = {}
         for subjects, verb, modifiers, objects in relations:
 
             # for each relation, get the index of the sentence to which it belongs (using the corresponding verb)
             # this is done to link the relations to the corresponding timestamp later
-            sentence_index = RelationsLib.__get_sentence_idx_for_token(doc, verb)
-            assert all([sentence_index == RelationsLib.__get_sentence_idx_for_token(doc, t) for t in subjects]) \
-                   and all([sentence_index == RelationsLib.__get_sentence_idx_for_token(doc, t) for t in modifiers]) \
-                   and all([sentence_index == RelationsLib.__get_sentence_idx_for_token(doc, t) for t in objects]), \
+            sentence_index = get_sentence_idx_of_token(verb)
+            assert all([sentence_index == get_sentence_idx_of_token(t) for t in subjects]) \
+                   and all([sentence_index == get_sentence_idx_of_token(t) for t in modifiers]) \
+                   and all([sentence_index == get_sentence_idx_of_token(t) for t in objects]), \
                 "all tokens of a relation should occur in the same sentence"
 
             # apply pronoun resolution
@@ -116,16 +132,16 @@ class RelationsLib:
 
             # pronoun resolution will fail in cases, i.e., relations may still contain pronouns
             # when a pronoun can not be resolved, it is removed
-            subjects = [t for t in subjects if t in tokens_for_entities]
-            objects = [t for t in objects if t in tokens_for_entities]
+            subjects = [t for t in subjects if t in entity_registry]
+            objects = [t for t in objects if t in entity_registry]
             if len(subjects) == 0 or len(objects) == 0:
                 continue
 
             # produce string representations
-            subjects_string_list = RelationsLib.__convert_entity_tokens_to_string_list(subjects, entity_names, entity_tokens)
+            subjects_string_list = RelationsLib.__convert_entity_tokens_to_string_list(subjects, entity_registry)
             verb_string = verb.text if wn_dictionary.is_wordnet_verb(verb) else verb.lemma_
             modifiers_string_list = [t.text for t in modifiers]
-            objects_string_list = RelationsLib.__convert_entity_tokens_to_string_list(objects, entity_names, entity_tokens)
+            objects_string_list = RelationsLib.__convert_entity_tokens_to_string_list(objects, entity_registry)
             timestamp = timestamps[sentence_index]
 
             video_level_relation = VideoRelation(
@@ -134,8 +150,7 @@ class RelationsLib:
                 modifiers=modifiers_string_list,
                 objects=objects_string_list
             )
-            if video_level_relation not in video_level_relations:
-                video_level_relations.append(video_level_relation)
+            video_level_relations.setdefault(video_level_relation)
 
             event_level_relation = EventRelation(
                 subjects=subjects_string_list,
@@ -143,10 +158,9 @@ class RelationsLib:
                 modifiers=modifiers_string_list,
                 objects=objects_string_list,
                 timestamp=timestamp)
-            if event_level_relation not in event_level_relations:
-                event_level_relations.append(event_level_relation)
+            event_level_relations.setdefault(event_level_relation)
 
-        return video_level_relations, event_level_relations
+        return list(video_level_relations), list(event_level_relations)
 
 
     """
@@ -158,12 +172,12 @@ class RelationsLib:
 
 
     @staticmethod
-    def __is_entity_or_pronoun(token: spacy.tokens.Token, tokens_for_entities: list):
-        return token in tokens_for_entities or token.pos_ == Tags.PRON
+    def __is_entity_or_pronoun(token: spacy.tokens.Token, entity_registry: EntityRegistry):
+        return token in entity_registry or token.pos_ == Tags.PRON
 
 
     @staticmethod
-    def __find_subject_for_verb(verb: spacy.tokens.Token, tokens_for_entities: list):
+    def __find_subject_for_verb(verb: spacy.tokens.Token, entity_registry: EntityRegistry):
         """
         for the input verb, find the corresponding subjects
         """
@@ -172,7 +186,7 @@ class RelationsLib:
 
         # 1.1) noun is an entity
         for child in verb.children:
-            if child.dep_ == Dependencies.NSUBJ and child in tokens_for_entities:
+            if child.dep_ == Dependencies.NSUBJ and child in entity_registry:
                 return child
         # 1.2) noun is a pronoun
         for child in verb.children:
@@ -181,11 +195,11 @@ class RelationsLib:
 
 
         # 2) if the verb itself has the dependency "acl" and parent NOUN, then the parent is the subject
-        if verb.dep_ == Dependencies.ACL and RelationsLib.__is_entity_or_pronoun(verb.head, tokens_for_entities):
+        if verb.dep_ == Dependencies.ACL and RelationsLib.__is_entity_or_pronoun(verb.head, entity_registry):
             return verb.head
 
         # 3) search recursively for a parent that has a desired subject dependency
-        subject = RelationsLib.__find_subject_of_parent(verb.head, tokens_for_entities)
+        subject = RelationsLib.__find_subject_of_parent(verb.head, entity_registry)
         if subject is not None:
             return subject
 
@@ -193,25 +207,27 @@ class RelationsLib:
 
 
     @staticmethod
-    def __find_subject_of_parent(parent: spacy.tokens.Token, tokens_for_entities: list):
+    def __find_subject_of_parent(parent: spacy.tokens.Token, entity_registry: EntityRegistry, climb: int = 1):
         """
         search recursively for a token that has a desired subject dependency
+        (climb is the number of heads visited so far)
         """
+        stats_lib.record_max("subject_climb_length", climb)
         SUBJECT_DEPS = [Dependencies.NSUBJ, Dependencies.NSUBJPASS]
 
-        def is_subject(token: spacy.tokens.Token, tokens_for_entities: list):
+        def is_subject(token: spacy.tokens.Token, entity_registry: EntityRegistry):
             # either the token is an entity or it's a pronoun, on which we may be allowed to use pronoun resolution later on
-            return token.dep_ in SUBJECT_DEPS and RelationsLib.__is_entity_or_pronoun(token, tokens_for_entities)
+            return token.dep_ in SUBJECT_DEPS and RelationsLib.__is_entity_or_pronoun(token, entity_registry)
 
         # parent may be a subject
-        if is_subject(parent, tokens_for_entities):
+        if is_subject(parent, entity_registry):
             return parent
 
         # subject may be any child of the parent (prioritize entities before pronouns)
         # for example, nsubj are children of verbs
-        subjects = list(filter(lambda child: is_subject(child, tokens_for_entities), list(parent.children)))
-        if len([s for s in subjects if s in tokens_for_entities]) > 0:
-            return [s for s in subjects if s in tokens_for_entities][0]
+        subjects = list(filter(lambda child: is_subject(child, entity_registry), list(parent.children)))
+        if len([s for s in subjects if s in entity_registry]) > 0:
+            return [s for s in subjects if s in entity_registry][0]
         if len(subjects) > 0:
             return subjects[0]
 
@@ -220,11 +236,11 @@ class RelationsLib:
         if parent == parent.head:
             return None
         else:
-            return RelationsLib.__find_subject_of_parent(parent.head, tokens_for_entities)
+            return RelationsLib.__find_subject_of_parent(parent.head, entity_registry, climb + 1)
 
 
     @staticmethod
-    def __find_objects_for_verb(verb: spacy.tokens.Token, tokens_for_entities: list, wn_dictionary: WordNetDictionary):
+    def __find_objects_for_verb(verb: spacy.tokens.Token, entity_registry: EntityRegistry, wn_dictionary: WordNetDictionary):
         """
         for the input verb, find the corresponding objects
         """
@@ -232,12 +248,12 @@ class RelationsLib:
 
         # 1) dobj: direct objects
         for child in verb.children:
-            if child.dep_ == Dependencies.DOBJ and RelationsLib.__is_entity_or_pronoun(child, tokens_for_entities):
+            if child.dep_ == Dependencies.DOBJ and RelationsLib.__is_entity_or_pronoun(child, entity_registry):
                 objects.append(child)
                 modifiers_of_objects.append([])
 
         # 2) pobj: objects of preposition
-        pobjs, modifiers_of_pobjs = RelationsLib.__find_pobj(verb, verb, tokens_for_entities, wn_dictionary)
+        pobjs, modifiers_of_pobjs = RelationsLib.__find_pobj(verb, verb, entity_registry, wn_dictionary)
         # when a coordinating conjunction (Dependencies.CONJ) was used for finding a pobj, then we split the resulting
         # relation up into two relations (and remove the coordinating conjunction from the modifiers list)
 
@@ -295,16 +311,18 @@ class RelationsLib:
     @staticmethod
     def __find_pobj(token: spacy.tokens.Token,
                   root_verb: spacy.tokens.Token,
-                  tokens_for_entities: list,
-                  wn_dictionary: WordNetDictionary):
+                  entity_registry: EntityRegistry,
+                  wn_dictionary: WordNetDictionary,
+                  depth: int = 1):
         """
-        find objects of preposition
+        find objects of preposition (depth is the current recursion depth)
         """
+        stats_lib.record_max("pobj_recursion_depth", depth)
         pobjs, modifier_lists = [], []
 
         for child in token.children:
             if root_verb != token and child.dep_ == Dependencies.POBJ \
-                    and RelationsLib.__is_entity_or_pronoun(child, tokens_for_entities):
+                    and RelationsLib.__is_entity_or_pronoun(child, entity_registry):
                 # at least one token has to be between verb and pobj (root_verb != token)
                 # pobj found, i.e., return it and the current token, do not search any deeper
                 return [child], [[token]]
@@ -317,7 +335,8 @@ class RelationsLib:
                 elif child.pos_ == Tags.ADP and not RelationsLib.__is_preposition(child):
                     print(f"preposition {child} not known. Add it to PREPOSITIONS in entities_lib.py if desired.")
                     continue
-                pobjs_rec, modifiers_rec = RelationsLib.__find_pobj(child, root_verb, tokens_for_entities, wn_dictionary)
+                pobjs_rec, modifiers_rec = RelationsLib.__find_pobj(child, root_verb, entity_registry, wn_dictionary,
+                                                                    depth + 1)
                 pobjs += pobjs_rec
                 modifier_lists += modifiers_rec
 
@@ -354,15 +373,14 @@ class RelationsLib:
 
 
     @staticmethod
-    def __convert_entity_tokens_to_string_list(tokens: list, entity_names: list, entity_tokens: list):
+    def __convert_entity_tokens_to_string_list(tokens: list, entity_registry: EntityRegistry):
         assert len(tokens) != 0, "length of entity tokens should never be 0"
 
         entity_strings = []
         for t in tokens:
-            for name, tokens_for_name in zip(entity_names, entity_tokens):
-                if t in tokens_for_name:
-                    entity_strings.append(name)
-                    break
+            name = entity_registry.get_entity_name(t)
+            if name is not None:
+                entity_strings.append(name)
 
         assert len(tokens) == len(entity_strings)
 
@@ -370,21 +388,9 @@ class RelationsLib:
 
 
     @staticmethod
-    def __find_conjunct_tokens_of_entities_or_prons(token: spacy.tokens.Token, tokens_for_entities: list):
+    def __find_conjunct_tokens_of_entities_or_prons(token: spacy.tokens.Token, entity_registry: EntityRegistry):
         conjunct_tokens = [token]
         for child in token.children:
-            if child.dep_ == Dependencies.CONJ and RelationsLib.__is_entity_or_pronoun(child, tokens_for_entities):
-                conjunct_tokens += RelationsLib.__find_conjunct_tokens_of_entities_or_prons(child, tokens_for_entities)
+            if child.dep_ == Dependencies.CONJ and RelationsLib.__is_entity_or_pronoun(child, entity_registry):
+                conjunct_tokens += RelationsLib.__find_conjunct_tokens_of_entities_or_prons(child, entity_registry)
         return conjunct_tokens
-
-
-    @staticmethod
-    def __get_sentence_idx_for_token(doc: spacy.tokens.Doc, token: spacy.tokens.Token):
-        """
-        find the sentence to which a token belongs
-        """
-        for idx, sent in enumerate(doc.sents):
-            if token in sent:
-                return idx
-
-        assert 0 == 1, "token {token} not in doc {doc}"
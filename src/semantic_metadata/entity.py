@@ -2,11 +2,21 @@ from abc import ABC, abstractmethod
 
 
 class Entity(ABC):
+    # entities are immutable and hashable values (no per-instance __dict__)
+    __slots__ = ("name",)
 
     def __init__(self, name: str):
         assert isinstance(name, str), "entity name should be a string"
 
-        self.name = name.lower()
+        object.__setattr__(self, "name", name.lower())
+
+
+    def __setattr__(self, key, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+
+    def __delattr__(self, key):
+        raise AttributeError(f"{type(self).__name__} is immutable")
 
 
     @abstractmethod
@@ -21,3 +31,7 @@ class Entity(ABC):
     @abstractmethod
     def __eq__(self, other) -> bool:
         pass
+
+    @abstractmethod
+    def __hash__(self) -> int:
+        pass
@@ -1,15 +1,29 @@
 from src.semantic_metadata.video_entity import VideoEntity
-from src.wordnet_lib import get_words_from_synsets
+from src.wordnet_lib import WordNetLemmatizerWrapped, get_synonyms
 
 
 class EntityPropertyPair:
+    # entity-property pairs are immutable and hashable values (no per-instance __dict__)
+    __slots__ = ("entity", "property")
 
     def __init__(self, entity: str, property: str):
         assert isinstance(entity, str), "entity name should be a string"
         assert isinstance(property, str), "property name should be a string"
 
-        self.entity = entity.lower()
-        self.property = property.lower()  # properties are lemmatized already
+        object.__setattr__(self, "entity", entity.lower())
+        object.__setattr__(self, "property", property.lower())  # properties are lemmatized already
+
+
+    def __setattr__(self, key, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+
+    def __delattr__(self, key):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+
+    def __reduce__(self):
+        return EntityPropertyPair, (self.entity, self.property)
 
 
     @staticmethod
@@ -46,19 +60,21 @@ class EntityPropertyPair:
         return True
 
 
-    def predicts(self, gt, with_synonyms=True) -> bool:
+    def __hash__(self) -> int:
+        return hash((self.entity, self.property))
+
+
+    def predicts(self, gt, wn_lemmatizer: WordNetLemmatizerWrapped, with_synonyms=True) -> bool:
         assert isinstance(gt, EntityPropertyPair), "given ground truth is not an entity-property pair"
 
         # compare entity
         s_entity = VideoEntity(self.entity)
         gt_entity = VideoEntity(gt.entity)
-        if not s_entity.predicts(gt_entity):
+        if not s_entity.predicts(gt_entity, wn_lemmatizer, with_synonyms):
             return False
 
         # compare property (properties are defined lemmatized -> no lemmatization necessary)
-        gt_list = [gt.property] if not with_synonyms else \
-            [gt.property] + get_words_from_synsets(gt.property, "noun")
-        if self.property not in gt_list:
-            return False
+        if self.property == gt.property:
+            return True
 
-        return True
+        return with_synonyms and self.property in get_synonyms(gt.property, "noun")
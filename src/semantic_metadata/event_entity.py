@@ -5,12 +5,17 @@ from src.wordnet_lib import WordNetLemmatizerWrapped
 
 
 class EventEntity(Entity):
+    __slots__ = ("timestamp",)
 
     def __init__(self, name, timestamp):
         super().__init__(name)
 
         self.__check_timestamp(timestamp)
-        self.timestamp = timestamp
+        object.__setattr__(self, "timestamp", tuple(timestamp))
+
+
+    def __reduce__(self):
+        return EventEntity, (self.name, list(self.timestamp))
 
 
     @staticmethod
@@ -25,17 +30,17 @@ class EventEntity(Entity):
 
     @staticmethod
     def __check_timestamp(timestamp: list):
-        assert isinstance(timestamp, list) and len(timestamp) == 2, \
+        assert isinstance(timestamp, (list, tuple)) and len(timestamp) == 2, \
             f"event-level relation could not be initialized: timestamp {timestamp} in unexpected format"
 
 
     def to_string(self) -> str:
-        return f"{self.timestamp}: {self.name}"
+        return f"{list(self.timestamp)}: {self.name}"
 
 
     def to_dict(self) -> dict:
         d = {
-            't': self.timestamp,
+            't': list(self.timestamp),
             'n': self.name
         }
 
@@ -55,6 +60,10 @@ class EventEntity(Entity):
         return True
 
 
+    def __hash__(self) -> int:
+        return hash((self.name, self.timestamp))
+
+
     def predicts(self, gt, target_iou: float, wn_lemmatizer: WordNetLemmatizerWrapped, with_synonyms: bool = True) -> bool:
         assert isinstance(gt, EventEntity), "given ground truth is not an event-level entity"
 
@@ -5,12 +5,18 @@ from src.wordnet_lib import WordNetLemmatizerWrapped
 
 
 class EventRelation(Relation):
+    __slots__ = ("timestamp",)
 
     def __init__(self, subjects: list, verb: str, modifiers: list, objects: list, timestamp: list):
         super().__init__(subjects, verb, modifiers, objects)
 
         self.__check_timestamp(timestamp)
-        self.timestamp = timestamp
+        object.__setattr__(self, "timestamp", tuple(timestamp))
+
+
+    def __reduce__(self):
+        return EventRelation, (list(self.subjects), self.verb, list(self.modifiers), list(self.objects),
+                               list(self.timestamp))
 
 
     @staticmethod
@@ -28,24 +34,24 @@ class EventRelation(Relation):
 
     @staticmethod
     def __check_timestamp(timestamp: list):
-        assert isinstance(timestamp, list) and len(timestamp) == 2, \
+        assert isinstance(timestamp, (list, tuple)) and len(timestamp) == 2, \
             f"event-level relation could not be initialized: timestamp {timestamp} in unexpected format"
 
 
     def to_string(self) -> str:
-        subjects_str = self.subjects if len(self.subjects) > 1 else self.subjects[0]
-        objects_str = self.objects if len(self.objects) > 1 else self.objects[0]
+        subjects_str = list(self.subjects) if len(self.subjects) > 1 else self.subjects[0]
+        objects_str = list(self.objects) if len(self.objects) > 1 else self.objects[0]
 
-        return f"{self.timestamp}: ({subjects_str}, {self.verb}, {self.modifiers}, {objects_str})"
+        return f"{list(self.timestamp)}: ({subjects_str}, {self.verb}, {list(self.modifiers)}, {objects_str})"
 
 
     def to_dict(self) -> dict:
         d = {
-            't': self.timestamp,
-            's': self.subjects,
+            't': list(self.timestamp),
+            's': list(self.subjects),
             'v': self.verb,
-            'm': self.modifiers,
-            'o': self.objects
+            'm': list(self.modifiers),
+            'o': list(self.objects)
         }
 
         return d
@@ -68,6 +74,10 @@ class EventRelation(Relation):
         return True
 
 
+    def __hash__(self) -> int:
+        return hash((self.subjects, self.verb, self.modifiers, self.objects, self.timestamp))
+
+
     def predicts(self, gt, target_iou: float, wn_lemmatizer: WordNetLemmatizerWrapped, with_synonyms=True) -> bool:
         assert isinstance(gt, EventRelation), "given ground truth is not an event-level relation"
 
@@ -0,0 +1,58 @@
+from src.semantic_metadata.entity_property import EntityPropertyPair
+from src.semantic_metadata.event_entity import EventEntity
+from src.semantic_metadata.event_relation import EventRelation
+from src.semantic_metadata.video_entity import VideoEntity
+from src.semantic_metadata.video_relation import VideoRelation
+
+
+class ExtractionResult:
+    """
+    all semantic metadata extracted from a single video (or text)
+    """
+
+    def __init__(self,
+                 video_level_entities: list,
+                 event_level_entities: list,
+                 entity_property_pairs: list,
+                 video_level_relations: list,
+                 event_level_relations: list):
+        self.video_level_entities = video_level_entities
+        self.event_level_entities = event_level_entities
+        self.entity_property_pairs = entity_property_pairs
+        self.video_level_relations = video_level_relations
+        self.event_level_relations = event_level_relations
+
+        # statistics of the extraction (see stats_lib), not part of the extracted metadata
+        self.stats = None
+
+
+    @staticmethod
+    def from_dict(d: dict):
+        extraction_result = ExtractionResult(
+            video_level_entities=[VideoEntity.from_dict(e) for e in d["video_level_entities"]],
+            event_level_entities=[EventEntity.from_dict(e) for e in d["event_level_entities"]],
+            entity_property_pairs=[EntityPropertyPair.from_dict(ep) for ep in d["entity_property_pairs"]],
+            video_level_relations=[VideoRelation.from_dict(r) for r in d["video_level_relations"]],
+            event_level_relations=[EventRelation.from_dict(r) for r in d["event_level_relations"]]
+        )
+
+        return extraction_result
+
+
+    def to_dict(self) -> dict:
+        d = {
+            'video_level_entities': [e.to_dict() for e in self.video_level_entities],
+            'event_level_entities': [e.to_dict() for e in self.event_level_entities],
+            'entity_property_pairs': [ep.to_dict() for ep in self.entity_property_pairs],
+            'video_level_relations': [r.to_dict() for r in self.video_level_relations],
+            'event_level_relations': [r.to_dict() for r in self.event_level_relations]
+        }
+
+        return d
+
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, ExtractionResult):
+            return False
+
+        return self.to_dict() == other.to_dict()
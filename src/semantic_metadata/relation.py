@@ -2,6 +2,8 @@ from abc import ABC, abstractmethod
 
 
 class Relation(ABC):
+    # relations are immutable and hashable values (no per-instance __dict__), all string lists are stored as tuples
+    __slots__ = ("subjects", "verb", "modifiers", "objects")
 
     def __init__(self, subjects: list, verb: str, modifiers: list, objects: list):
 
@@ -12,19 +14,24 @@ class Relation(ABC):
         self.__check_string_list(objects, check_len_greater_zero=True)
 
         # set attributes
-        self.subjects = [s.lower() for s in subjects]
-        self.verb = verb.lower()
-        self.modifiers = [w.lower() for w in modifiers]
-        self.objects = [o.lower() for o in objects]
-
         # sort subjects and objects (required for equals-methods of EventRelation and VideoRelation)
-        self.subjects.sort()
-        self.objects.sort()
+        object.__setattr__(self, "subjects", tuple(sorted(s.lower() for s in subjects)))
+        object.__setattr__(self, "verb", verb.lower())
+        object.__setattr__(self, "modifiers", tuple(w.lower() for w in modifiers))
+        object.__setattr__(self, "objects", tuple(sorted(o.lower() for o in objects)))
+
+
+    def __setattr__(self, key, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+
+    def __delattr__(self, key):
+        raise AttributeError(f"{type(self).__name__} is immutable")
 
 
     @staticmethod
     def __check_string_list(input_list, check_len_greater_zero: bool):
-        assert isinstance(input_list, list), "relation could not be initialized: no string list"
+        assert isinstance(input_list, (list, tuple)), "relation could not be initialized: no string list"
 
         if check_len_greater_zero:
             assert len(input_list) > 0, "relation could not be initialized: string list should not be empty"
@@ -46,3 +53,8 @@ class Relation(ABC):
     @abstractmethod
     def __eq__(self, other) -> bool:
         pass
+
+
+    @abstractmethod
+    def __hash__(self) -> int:
+        pass
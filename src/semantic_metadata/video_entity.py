@@ -1,13 +1,18 @@
 from src.semantic_metadata.entity import Entity
-from src.wordnet_lib import WordNetLemmatizerWrapped, get_words_from_synsets
+from src.wordnet_lib import WordNetLemmatizerWrapped, get_synonyms
 
 
 class VideoEntity(Entity):
+    __slots__ = ()
 
     def __init__(self, name):
         super().__init__(name)
 
 
+    def __reduce__(self):
+        return VideoEntity, (self.name,)
+
+
     @staticmethod
     def from_dict(d: dict):
         video_entity = VideoEntity(
@@ -38,17 +43,18 @@ class VideoEntity(Entity):
         return True
 
 
+    def __hash__(self) -> int:
+        return hash(self.name)
+
+
     def predicts(self, gt, wn_lemmatizer: WordNetLemmatizerWrapped, with_synonyms: bool = True) -> bool:
         assert isinstance(gt, VideoEntity), "given ground truth is not an video-level entity"
 
         prediction_name = wn_lemmatizer.lemmatize_noun(self.name)
         gt_name = wn_lemmatizer.lemmatize_noun(gt.name)
 
-        # if desired, add all synonyms of gt entities
-        gt_list = [gt_name] if not with_synonyms else \
-            [gt_name] + get_words_from_synsets(gt_name, "noun")
+        if prediction_name == gt_name:
+            return True
 
-        if prediction_name not in gt_list:
-            return False
-
-        return True
+        # if desired, accept all synonyms of gt entities
+        return with_synonyms and prediction_name in get_synonyms(gt_name, "noun")
@@ -1,14 +1,18 @@
 from src.semantic_metadata.relation import Relation
-from src.wordnet_lib import WordNetLemmatizerWrapped, get_words_from_synsets
+from src.wordnet_lib import WordNetLemmatizerWrapped, get_synonyms
 
 
 class VideoRelation(Relation):
-
+    __slots__ = ()
 
     def __init__(self, subjects: list, verb: str, modifiers: list, objects: list):
         super().__init__(subjects, verb, modifiers, objects)
 
 
+    def __reduce__(self):
+        return VideoRelation, (list(self.subjects), self.verb, list(self.modifiers), list(self.objects))
+
+
     @staticmethod
     def from_dict(d: dict):
         video_relation = VideoRelation(
@@ -22,18 +26,18 @@ class VideoRelation(Relation):
 
 
     def to_string(self) -> str:
-        subjects_str = self.subjects if len(self.subjects) > 1 else self.subjects[0]
-        objects_str = self.objects if len(self.objects) > 1 else self.objects[0]
+        subjects_str = list(self.subjects) if len(self.subjects) > 1 else self.subjects[0]
+        objects_str = list(self.objects) if len(self.objects) > 1 else self.objects[0]
 
-        return f"({subjects_str}, {self.verb}, {self.modifiers}, {objects_str})"
+        return f"({subjects_str}, {self.verb}, {list(self.modifiers)}, {objects_str})"
 
 
     def to_dict(self) -> dict:
         d = {
-            's': self.subjects,
+            's': list(self.subjects),
             'v': self.verb,
-            'm': self.modifiers,
-            'o': self.objects
+            'm': list(self.modifiers),
+            'o': list(self.objects)
         }
 
         return d
@@ -54,6 +58,10 @@ class VideoRelation(Relation):
         return True
 
 
+    def __hash__(self) -> int:
+        return hash((self.subjects, self.verb, self.modifiers, self.objects))
+
+
     def predicts(self, gt, wn_lemmatizer: WordNetLemmatizerWrapped, with_synonyms: bool = True) -> bool:
         assert isinstance(gt, VideoRelation), "given ground truth is not an video-level relation"
 
@@ -82,18 +90,13 @@ def predicts_subject_or_object(predictions: list,
     predictions = [wn_lemmatizer.lemmatize_noun(e) for e in predictions]
     gt = [wn_lemmatizer.lemmatize_noun(e) for e in gt]
 
-    gt_list = []
-    for entity in gt:
-        gt_list += [entity]
-        # if desired, add all synonyms of a gt entity
-        if with_synonyms:
-            gt_list += get_words_from_synsets(entity, "noun")
-
-    for p in predictions:
-        if p in gt_list:
-            return True
+    gt_set = set(gt)
+    # if desired, add all synonyms of a gt entity
+    if with_synonyms:
+        for entity in gt:
+            gt_set |= get_synonyms(entity, "noun")
 
-    return False
+    return not gt_set.isdisjoint(predictions)
 
 
 def predicts_verb(prediction_verb: str,
@@ -112,15 +115,10 @@ def predicts_verb(prediction_verb: str,
 
 
     # now for gt verbs: add all synsets
-    gt_list = []
-    for verb in gt:
-        gt_list += [verb]
-        # if desired, add all synonyms of a gt verb
-        if with_synonyms:
-            gt_list += get_words_from_synsets(verb, "verb")
-
-    for p in prediction:
-        if p in gt_list:
-            return True
-
-    return False
+    gt_set = set(gt)
+    # if desired, add all synonyms of a gt verb
+    if with_synonyms:
+        for verb in gt:
+            gt_set |= get_synonyms(verb, "verb")
+
+    return not gt_set.isdisjoint(prediction)
@@ -0,0 +1,233 @@
+import asyncio
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from .extraction_lib import extract_videos
+from .wordnet_lib import WordNetDictionary, WordNetLemmatizerWrapped
+
+"""
+Long-running extraction service for concurrent callers. Requests that arrive within max_latency_ms of each other are
+collected into micro-batches (of at most max_batch_size videos), which are parsed together with nlp.pipe.
+The language parser and WordNet are loaded once and stay resident. Protocol: one JSON object per line,
+    request: {"id": ..., "sentences": [...], "timestamps": [[start, end], ...]}
+    response: {"id": ..., "result": {"video_level_entities": [...], ...}} or {"id": ..., "error": "..."}
+"""
+DEFAULT_MAX_BATCH_SIZE = 32
+DEFAULT_MAX_LATENCY_MS = 10
+
+
+class ExtractionService:
+    """
+    micro-batching extraction of the semantic metadata of videos, e.g.,
+        result = await service.extract(sentences, timestamps)
+    """
+
+    def __init__(self,
+                 wn_dictionary: WordNetDictionary,
+                 wn_lemmatizer: WordNetLemmatizerWrapped,
+                 max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+                 max_latency_ms: float = DEFAULT_MAX_LATENCY_MS):
+        assert max_batch_size > 0 and max_latency_ms >= 0, "batch size should be positive, latency not negative"
+        self.wn_dictionary = wn_dictionary
+        self.wn_lemmatizer = wn_lemmatizer
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000
+
+        # spaCy is not thread-safe, i.e., all batches are processed by the same thread (one after the other), which
+        # keeps the event loop free to accept further requests in the meantime
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.queue = None
+        self.batcher = None
+
+        self.n_requests = 0
+        self.n_batches = 0
+        self.n_failed_requests = 0
+        self.n_failed_batches = 0
+
+
+    async def start(self):
+        self.queue = asyncio.Queue()
+        self.batcher = asyncio.ensure_future(self.__run_batcher())
+
+
+    async def stop(self):
+        if self.batcher is not None:
+            self.batcher.cancel()
+            try:
+                await self.batcher
+            except asyncio.CancelledError:
+                pass
+        self.executor.shutdown(wait=True)
+
+
+    async def extract(self, sentences: list, timestamps: list):
+        """
+        extraction result of a video, None when the video could not be parsed
+        """
+        self.__check_request(sentences, timestamps)
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((sentences, timestamps, future))
+
+        return await future
+
+
+    @staticmethod
+    def __check_request(sentences: list, timestamps: list):
+        assert len(sentences) == len(timestamps), "every sentence needs exactly one timestamp"
+        assert all(isinstance(s, str) for s in sentences), "sentences should be strings"
+        assert all(isinstance(t, (list, tuple)) and len(t) == 2 for t in timestamps), \
+            "timestamps should be [start, end] segments"
+
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.n_requests,
+            "batches": self.n_batches,
+            "mean_batch_size": self.n_requests / self.n_batches if self.n_batches > 0 else 0.0,
+            "failed_requests": self.n_failed_requests,
+            "failed_batches": self.n_failed_batches
+        }
+
+
+    async def __run_batcher(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # wait for the first request of a batch, then collect requests until the batch is full or its deadline
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_latency
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                results = await loop.run_in_executor(self.executor, self.__extract_batch, batch)
+            except Exception as e:
+                results = [e] * len(batch)
+
+            # results of failed requests are their exceptions
+            for (_, _, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+            self.n_requests += len(batch)
+            self.n_batches += 1
+            self.n_failed_requests += sum(1 for result in results if isinstance(result, Exception))
+
+
+    def __extract_batch(self, batch: list) -> list:
+        """
+        results of the requests of a batch, when the batch fails, each of its requests is extracted on its own,
+        i.e., only the requests that fail themselves get their exception as result
+        """
+        videos = [(idx, sentences, timestamps) for idx, (sentences, timestamps, _) in enumerate(batch)]
+        try:
+            return [result for _, result in
+                    extract_videos(videos, self.wn_dictionary, self.wn_lemmatizer, batch_size=self.max_batch_size)]
+        except Exception:
+            self.n_failed_batches += 1
+
+        results = []
+        for video in videos:
+            try:
+                results += [result for _, result in extract_videos([video], self.wn_dictionary, self.wn_lemmatizer)]
+            except Exception as e:
+                results.append(e)
+
+        return results
+
+
+    """
+    JSON lines protocol
+    """
+    async def handle_request(self, line: str) -> str:
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            sentences, timestamps = request["sentences"], request["timestamps"]
+            self.__check_request(sentences, timestamps)
+        except (ValueError, KeyError, TypeError, AttributeError, AssertionError) as e:
+            return json.dumps({"id": request_id, "error": f"invalid request: {e}"})
+
+        try:
+            result = await self.extract(sentences, timestamps)
+            if result is None:
+                response = {"id": request_id, "error": "the sentences could not be parsed"}
+            else:
+                response = {"id": request_id, "result": result.to_dict()}
+        except Exception as e:
+            # the extraction of the request failed, the service keeps running
+            response = {"id": request_id, "error": f"extraction failed: {e}"}
+
+        return json.dumps(response)
+
+
+    async def serve_unix(self, path: str):
+        """
+        serve requests on a Unix socket, responses of a connection are written in the order in which they are ready
+        """
+        async def handle_connection(reader, writer):
+            lock = asyncio.Lock()
+
+            async def respond(line: str):
+                response = await self.handle_request(line)
+                async with lock:
+                    writer.write((response + "\n").encode("utf-8"))
+                    await writer.drain()
+
+            tasks = set()
+            while True:
+                line = await reader.readline()
+                if len(line) == 0:
+                    break
+                if line.strip() == b"":
+                    continue
+                task = asyncio.ensure_future(respond(line.decode("utf-8")))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+            if len(tasks) > 0:
+                await asyncio.wait(tasks)
+            writer.close()
+
+        server = await asyncio.start_unix_server(handle_connection, path=path)
+        async with server:
+            await server.serve_forever()
+
+
+    async def serve_stdio(self, output=None):
+        """
+        serve requests read from stdin, responses are written to output (default: stdout) when they are ready
+        """
+        output = output if output is not None else sys.stdout
+        loop = asyncio.get_running_loop()
+
+        def respond(task):
+            output.write(task.result() + "\n")
+            output.flush()
+
+        tasks = set()
+        while True:
+            # stdin is read by a thread, as reading pipes and files asynchronously is not supported everywhere
+            line = await loop.run_in_executor(None, sys.stdin.readline)
+            if len(line) == 0:
+                break
+            if line.strip() == "":
+                continue
+            task = asyncio.ensure_future(self.handle_request(line))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            task.add_done_callback(respond)
+
+        if len(tasks) > 0:
+            await asyncio.wait(tasks)
@@ -0,0 +1,153 @@
+from . import nlp_lib
+from .entities_lib import EntitiesLib, ExtractionContext
+from .nlp_lib import get_sentence_idx_of_token
+from .relations_lib import RelationsLib
+from .semantic_metadata.entity_property import EntityPropertyPair
+from .semantic_metadata.event_entity import EventEntity
+from .semantic_metadata.event_relation import EventRelation
+from .semantic_metadata.extraction_result import ExtractionResult
+from .semantic_metadata.video_entity import VideoEntity
+from .semantic_metadata.video_relation import VideoRelation
+from .wordnet_lib import WordNetDictionary, WordNetLemmatizerWrapped
+
+"""
+Incremental extraction for captions that are emitted one at a time (e.g., while a video is streamed).
+Each new sentence is tagged on its own. Sentences without pronouns are then parsed on their own (the tagged doc is
+completed), sentences with pronouns are parsed together with the preceding sentences of a bounded context window
+instead, so that their pronouns can be resolved. I.e., every sentence is parsed once, and the cost of an event does not
+depend on the number of previous events.
+"""
+# number of preceding sentences that are parsed together with a new sentence that contains a pronoun
+DEFAULT_CONTEXT_WINDOW = 3
+
+
+class ExtractionSession:
+    """
+    stateful extraction of the semantic metadata of a single video, events are added one at a time.
+    Events are processed in the order in which they are added (not sorted by their starting times), and pronouns can
+    only be resolved to entities of the last context_window sentences, i.e., the results may differ slightly from the
+    ones of extract_all for the whole video
+    """
+
+    def __init__(self,
+                 wn_dictionary: WordNetDictionary,
+                 wn_lemmatizer: WordNetLemmatizerWrapped,
+                 context_window: int = DEFAULT_CONTEXT_WINDOW):
+        assert context_window >= 0, "context window should not be negative"
+        self.wn_dictionary = wn_dictionary
+        self.wn_lemmatizer = wn_lemmatizer
+        self.context_window = context_window
+
+        self.sentences = []
+        self.timestamps = []
+
+        # dicts are used as insertion-ordered sets to make the extracted metadata unique
+        self.video_level_entities = {}
+        self.event_level_entities = {}
+        self.entity_property_pairs = {}
+        self.video_level_relations = {}
+        self.event_level_relations = {}
+
+
+    def add_event(self, sentence: str, timestamp: list) -> ExtractionResult:
+        """
+        extract the semantic metadata of a new captioned event,
+        returns the delta, i.e., only the metadata that was not known before the event
+        """
+        # the POS tags of the sentence decide whether it has to be parsed together with its context
+        doc = nlp_lib.tag([sentence])
+        n_context = min(self.context_window, len(self.sentences)) if nlp_lib.has_pronoun(doc) else 0
+        if n_context > 0:
+            doc = nlp_lib.parse(self.sentences[len(self.sentences) - n_context:] + [sentence])
+        else:
+            doc = nlp_lib.complete_parse(doc, 1)
+
+        self.sentences.append(sentence)
+        self.timestamps.append(list(timestamp))
+
+        # the new sentence is the last sentence of the doc
+        video_level_entities, event_level_entities, entity_property_pairs, video_level_relations, \
+            event_level_relations = self.__extract_sentence(doc, n_context, timestamp)
+
+        return ExtractionResult(
+            video_level_entities=self.__add_new(self.video_level_entities, video_level_entities),
+            event_level_entities=self.__add_new(self.event_level_entities, event_level_entities),
+            entity_property_pairs=self.__add_new(self.entity_property_pairs, entity_property_pairs),
+            video_level_relations=self.__add_new(self.video_level_relations, video_level_relations),
+            event_level_relations=self.__add_new(self.event_level_relations, event_level_relations)
+        )
+
+
+    def result(self) -> ExtractionResult:
+        """
+        all semantic metadata extracted so far (sorted like the result of extract_all)
+        """
+        return ExtractionResult(
+            video_level_entities=sorted(self.video_level_entities, key=lambda e: e.name),
+            event_level_entities=sorted(self.event_level_entities, key=lambda e: e.timestamp[0]),
+            entity_property_pairs=sorted(self.entity_property_pairs, key=lambda ep: ep.entity),
+            video_level_relations=list(self.video_level_relations),
+            event_level_relations=list(self.event_level_relations)
+        )
+
+
+    def __len__(self) -> int:
+        return len(self.sentences)
+
+
+    """
+    helper functions
+    """
+    def __extract_sentence(self, doc, sentence_index: int, timestamp: list):
+        """
+        semantic metadata of the sentence with the given index of the doc
+        (the sentence index serves as timestamp during extraction and is replaced by the timestamp afterwards)
+        """
+        placeholder_timestamps = [[i, i] for i in range(sentence_index + 1)]
+        context = ExtractionContext(doc, self.wn_dictionary, self.wn_lemmatizer)
+
+        # video-level entities and entity-property pairs stem from (compound) nouns of the sentence only
+        video_level_entities = []
+        entity_property_pairs = []
+        for entity_name, tokens in zip(context.entity_names, context.entity_tokens):
+            if get_sentence_idx_of_token(tokens[0]) != sentence_index:
+                continue
+
+            video_level_entities.append(VideoEntity(entity_name))
+            for p in EntitiesLib.get_properties_for_tokens(tokens, self.wn_dictionary, self.wn_lemmatizer):
+                entity_property_pairs.append(EntityPropertyPair(entity_name, p))
+
+        # event-level entities also stem from resolved pronouns of the sentence
+        _, event_entities, _ = EntitiesLib.extract_entities_and_properties(
+            doc, placeholder_timestamps, self.wn_dictionary, self.wn_lemmatizer, context)
+        event_level_entities = [
+            EventEntity(e.name, timestamp) for e in event_entities if e.timestamp[0] == sentence_index
+        ]
+
+        _, event_relations = RelationsLib.extract_relations(
+            doc, placeholder_timestamps, self.wn_dictionary, self.wn_lemmatizer, context)
+        event_relations = [r for r in event_relations if r.timestamp[0] == sentence_index]
+        video_level_relations = [
+            VideoRelation(list(r.subjects), r.verb, list(r.modifiers), list(r.objects)) for r in event_relations
+        ]
+        event_level_relations = [
+            EventRelation(list(r.subjects), r.verb, list(r.modifiers), list(r.objects), timestamp)
+            for r in event_relations
+        ]
+
+        return video_level_entities, event_level_entities, entity_property_pairs, video_level_relations, \
+            event_level_relations
+
+
+    @staticmethod
+    def __add_new(known: dict, items: list) -> list:
+        """
+        add items to the known items, returns the items that were not known before
+        """
+        new_items = []
+        for item in items:
+            if item not in known:
+                known[item] = None
+                new_items.append(item)
+
+        return new_items
@@ -0,0 +1,126 @@
+"""
+Optional instrumentation of the extraction (per-stage timers and counters of hot paths).
+Statistics are only recorded within collect(), otherwise every instrumentation call is a single check of a global,
+i.e., instrumentation has (almost) no overhead when it is not used.
+"""
+import time
+
+
+# statistics of the video that is currently processed, None when no statistics are collected
+_current = None
+
+# whether batch extraction (extract_videos, ...) collects statistics for each video
+_enabled = False
+
+
+def enable(enabled: bool = True):
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+
+class collect:
+    """
+    context manager that collects the statistics of everything processed within it into a dict, e.g.,
+        with stats_lib.collect() as stats:
+            extract_all(...)
+    """
+    __slots__ = ("stats", "previous")
+
+    def __init__(self):
+        self.stats = {}
+        self.previous = None
+
+
+    def __enter__(self) -> dict:
+        global _current
+        self.previous = _current
+        _current = self.stats
+
+        return self.stats
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        global _current
+        _current = self.previous
+
+
+
+class timer:
+    """
+    context manager that adds the time spent within it to the statistic <stage>_s
+    """
+    __slots__ = ("key", "start")
+
+    def __init__(self, stage: str):
+        self.key = f"{stage}_s"
+        self.start = None
+
+
+    def __enter__(self):
+        if _current is not None:
+            self.start = time.perf_counter()
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if _current is not None and self.start is not None:
+            _current[self.key] = _current.get(self.key, 0.0) + time.perf_counter() - self.start
+
+
+
+def count(name: str, n: int = 1):
+    if _current is not None:
+        _current[name] = _current.get(name, 0) + n
+
+
+def record_max(name: str, value):
+    if _current is not None and value > _current.get(name, 0):
+        _current[name] = value
+
+
+
+class StatsReport:
+    """
+    aggregated statistics of a batch run (total, mean and maximum of each statistic over all videos)
+    """
+
+    def __init__(self):
+        self.n_videos = 0
+        self.totals = {}
+        self.maxima = {}
+
+
+    def add(self, stats: dict):
+        if stats is None:
+            return
+
+        self.n_videos += 1
+        for name, value in stats.items():
+            self.totals[name] = self.totals.get(name, 0) + value
+            if name not in self.maxima or value > self.maxima[name]:
+                self.maxima[name] = value
+
+
+    def to_dict(self) -> dict:
+        return {
+            "n_videos": self.n_videos,
+            "stats": {
+                name: {
+                    "total": total,
+                    "mean": total / self.n_videos,
+                    "max": self.maxima[name]
+                } for name, total in sorted(self.totals.items())
+            }
+        }
+
+
+    def to_string(self) -> str:
+        lines = [f"statistics of {self.n_videos} videos (total / mean / max):"]
+        for name, s in self.to_dict()["stats"].items():
+            lines.append(f"  {name:<28} {s['total']:12.4g} {s['mean']:12.4g} {s['max']:12.4g}")
+
+        return "\n".join(lines)
@@ -7,3 +7,16 @@ def calculate_iou(a: list, b: list) -> float:
     iou = float(intersection) / (union + 1e-8)
 
     return iou
+
+
+def sort_by_starting_time(sentences: list, timestamps: list):
+    """
+    sort captioned events (sentences and their temporal segments) according to their starting times
+    """
+    if len(sentences) == 0:
+        return [], []
+
+    starting_times = [t[0] for t in timestamps]
+    _, timestamps, sentences = (list(t) for t in zip(*sorted(zip(starting_times, timestamps, sentences))))
+
+    return sentences, timestamps
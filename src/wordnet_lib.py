@@ -1,132 +1,359 @@
+import os
+import pickle
+from bisect import bisect_left
+from collections import OrderedDict
+from functools import lru_cache
+
 import nltk
 nltk.download('wordnet', quiet=True)
 
 from nltk.corpus import wordnet as wn
 from nltk.stem import WordNetLemmatizer
 
+from . import stats_lib
+
 
 NOUN, VERB, ADJ, ADV = "noun", "verb", "adj", "adv"
 
+# on-disk snapshot of the WordNet vocab (increase the format version whenever the snapshot content changes)
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache")
+WORDNET_VOCAB_PATH = os.path.join(CACHE_DIR, "wordnet_vocab.pickle")
+WORDNET_VOCAB_FORMAT = 1
+
+# custom lemmatizations, which are not performed by WordNet
+CUSTOM_NOUN_LEMMAS = {
+    "men": "man",
+    "bikers": "biker",
+    "businessmen": "businessman"
+}
+
+CUSTOM_VERB_LEMMAS = {
+    form: lemma
+    for lemma, forms in [
+        ("ride", ["riding", "rides", "rode", "ride"]),
+        ("stare", ["staring", "stares", "stared", "stare"]),
+        ("tape", ["taping", "tapes", "taped", "tape"]),
+        ("fall", ["falling", "falls", "fell", "fall"]),
+        ("bathe", ["bathing", "bathes", "bathed", "bathe"]),
+        ("scrape", ["scraping", "scrapes", "scraped", "scrape"]),
+        ("shine", ["shining", "shines", "shone", "shine"]),
+        ("see", ["seeing", "sees", "saw", "see"]),
+        ("feed", ["feeding", "feeds", "fed", "feed"]),
+        ("mope", ["moping", "mopes", "moped", "mope"]),
+        ("plate", ["plating", "plates", "plated", "plate"]),
+        ("rate", ["rating", "rates", "rated", "rate"])
+    ]
+    for form in forms
+}
+
+# maximum number of memoized lemmatizations per word type
+LEMMA_CACHE_SIZE = 2 ** 16
+
+# maximum number of memoized synonym sets (see get_synonyms)
+SYNONYM_CACHE_SIZE = 2 ** 16
+
 
 class WordNetDictionary:
     """
     class for building the WordNet vocab before using it
+    (the vocab is stored as a snapshot on disk and only rebuilt when the snapshot is missing or stale)
     """
 
-    def __init__(self):
-        print("building WordNet vocab ...")
-        self.nouns = self.__get_words_of_type(wn.NOUN)
-        self.verbs = self.__get_words_of_type(wn.VERB)
-        self.adjectives = self.__get_words_of_type(wn.ADJ)
-        self.adverbs = self.__get_words_of_type(wn.ADV)
+    def __init__(self, vocab_path: str = WORDNET_VOCAB_PATH):
+        vocab = self.__load_vocab(vocab_path)
+        if vocab is None:
+            print("building WordNet vocab ...")
+            vocab = self.__build_vocab()
+            self.__save_vocab(vocab, vocab_path)
+
+        self.nouns = vocab["nouns"]
+        self.verbs = vocab["verbs"]
+        self.adjectives = vocab["adjectives"]
+        self.adverbs = vocab["adverbs"]
         self.lemmatizer = WordNetLemmatizerWrapped()
+        self.__noun_prefix_index = None
+
+
+    @property
+    def noun_prefix_index(self):
+        """
+        prefix index over the WordNet nouns (built on first use, only needed for compound noun detection)
+        """
+        if self.__noun_prefix_index is None:
+            self.__noun_prefix_index = NounPrefixIndex(self.nouns)
+
+        return self.__noun_prefix_index
+
+
+    @staticmethod
+    def __get_vocab_version():
+        """
+        version of the vocab snapshot, a snapshot is only valid for the WordNet and NLTK version it was built with
+        """
+        return {
+            "format": WORDNET_VOCAB_FORMAT,
+            "wordnet": wn.get_version(),
+            "nltk": nltk.__version__
+        }
+
+
+    @staticmethod
+    def __build_vocab():
+        words = set(wn.words())
+
+        return {
+            "version": WordNetDictionary.__get_vocab_version(),
+            "nouns": WordNetDictionary.__get_words_of_type(words, wn.NOUN),
+            "verbs": WordNetDictionary.__get_words_of_type(words, wn.VERB),
+            "adjectives": WordNetDictionary.__get_words_of_type(words, wn.ADJ),
+            "adverbs": WordNetDictionary.__get_words_of_type(words, wn.ADV)
+        }
 
 
     @staticmethod
-    def __get_words_of_type(word_type: str):
+    def __load_vocab(vocab_path: str):
+        """
+        load the vocab snapshot, returns None when the snapshot is missing, unreadable or stale
+        """
+        if vocab_path is None or not os.path.isfile(vocab_path):
+            return None
+
+        try:
+            with open(vocab_path, "rb") as f:
+                vocab = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, IndexError):
+            print(f"WordNet vocab snapshot {vocab_path} could not be read, rebuilding it ...")
+            return None
+
+        if not isinstance(vocab, dict) or vocab.get("version") != WordNetDictionary.__get_vocab_version():
+            print(f"WordNet vocab snapshot {vocab_path} is stale, rebuilding it ...")
+            return None
+
+        return vocab
+
+
+    @staticmethod
+    def __save_vocab(vocab: dict, vocab_path: str):
+        """
+        write the vocab snapshot atomically, so that concurrently starting workers never read a partial snapshot
+        """
+        if vocab_path is None:
+            return
+
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(vocab_path)), exist_ok=True)
+            tmp_path = f"{vocab_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump(vocab, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, vocab_path)
+        except OSError as e:
+            # the snapshot is only an optimization, the vocab can still be used
+            print(f"WordNet vocab snapshot could not be written to {vocab_path}: {e}")
+
+
+    @staticmethod
+    def __get_words_of_type(words: set, word_type: str):
         """
         get all WordNet words of a specific type (wn.NOUN, wn.VERB, wn.ADJ, or wn.ADV)
         """
         word_set = set()
-        for word in set(wn.words()):
+        for word in words:
             if len(wn.synsets(word, word_type)) > 0:
                 word_set.add(word)
 
-        return word_set
+        return frozenset(word_set)
 
 
     def is_wordnet_noun(self, token):
+        stats_lib.count("wordnet_lookups")
         noun_str = token.text.lower()
         return noun_str in self.nouns or self.lemmatizer.lemmatize_noun(noun_str) in self.nouns
 
     def is_wordnet_verb(self, token):
+        stats_lib.count("wordnet_lookups")
         verb_str = token.text.lower()
         return verb_str in self.verbs or self.lemmatizer.lemmatize_verb(verb_str) in self.verbs
 
     def is_wordnet_adjective(self, token):
+        stats_lib.count("wordnet_lookups")
         adj_str = token.text.lower()
         return adj_str in self.adjectives or self.lemmatizer.lemmatize_adjective(adj_str) in self.adjectives
 
     def is_wordnet_adverb(self, token):
+        stats_lib.count("wordnet_lookups")
         adv_str = token.text.lower()
         return adv_str in self.adverbs or self.lemmatizer.lemmatize_adverb(adv_str) in self.adverbs
 
 
 
+class NounPrefixIndex:
+    """
+    sorted index over the WordNet nouns, which allows to check whether a string can still become a WordNet noun
+    (or the noun lemma of a word) when further characters are appended.
+    Noun lemmatization replaces suffixes (e.g., "ches" -> "ch"), depending on the NLTK version even repeatedly
+    (e.g., "boxeses" -> "boxes" -> "box"), or maps an irregular form (e.g., "geese" -> "goose") that is added to the
+    index itself. Only characters of the replaced suffixes (suffix_characters) are ever removed from the word, i.e.,
+    the lemma of a word in the WordNet nouns always starts with the word without its trailing suffix_characters.
+    """
+
+    def __init__(self, nouns):
+        irregular_forms = get_irregular_noun_forms() | set(CUSTOM_NOUN_LEMMAS)
+        self.entries = sorted(set(nouns) | irregular_forms)
+        self.suffix_characters = "".join(sorted(
+            {c for old, new in wn.MORPHOLOGICAL_SUBSTITUTIONS[wn.NOUN] for c in old}))
+
+
+    def has_prefix(self, prefix: str):
+        """
+        check whether any entry starts with prefix
+        """
+        idx = bisect_left(self.entries, prefix)
+        return idx < len(self.entries) and self.entries[idx].startswith(prefix)
+
+
+    def may_be_noun(self, word: str):
+        """
+        check whether a word may be a WordNet noun or may be lemmatized to one (if False, it is neither, and neither is
+        any word that starts with it)
+        """
+        return self.has_prefix(word.rstrip(self.suffix_characters))
+
+
+
+def get_irregular_noun_forms():
+    """
+    irregular noun forms of WordNet (e.g., "geese"), read from its exception file noun.exc
+    """
+    try:
+        with wn.open("noun.exc") as f:
+            return {line.split()[0] for line in f.read().splitlines() if len(line.split()) > 0}
+    except (OSError, LookupError, ValueError) as e:
+        # the exception file can not be read (e.g., corpus reader without file access), use the exceptions that the
+        # lemmatizer itself loaded instead
+        print(f"WordNet exception file noun.exc could not be read ({e}), using the loaded exceptions")
+        return set(getattr(wn, "_exception_map", {}).get(wn.NOUN, {}))
+
+
+
 class WordNetLemmatizerWrapped:
     """
     wrapped WordNet lemmatizer in order to add custom lemmatizations
+    (lemmatizations are memoized per word type, as the same words have to be lemmatized over and over)
     """
-    def __init__(self):
+    def __init__(self, cache_size: int = LEMMA_CACHE_SIZE):
         self.lemmatizer = WordNetLemmatizer()
+        self.cache_size = cache_size
+
+        # WordNet word type and custom lemmas of each word type
+        self.word_types = {
+            NOUN: ("n", CUSTOM_NOUN_LEMMAS),
+            VERB: ("v", CUSTOM_VERB_LEMMAS),
+            ADJ: ("a", {}),
+            ADV: ("r", {})
+        }
+        # memoized lemmas per word type (no lru_cache, i.e., the lemmatizer can be pickled, e.g., for worker processes),
+        # when a cache is full, its least recently used entry is evicted
+        self.lemma_caches = {word_type: OrderedDict() for word_type in self.word_types}
+        self.cache_hits = dict.fromkeys(self.word_types, 0)
+        self.cache_misses = dict.fromkeys(self.word_types, 0)
+
+
+    def __lemmatize(self, word: str, word_type: str):
+        cache = self.lemma_caches[word_type]
+        lemma = cache.get(word)
+        if lemma is not None:
+            self.cache_hits[word_type] += 1
+            cache.move_to_end(word)
+            return lemma
+
+        self.cache_misses[word_type] += 1
+        lemma = self.__lemmatize_uncached(word, *self.word_types[word_type])
+        if len(cache) >= self.cache_size > 0:
+            cache.popitem(last=False)
+        if self.cache_size > 0:
+            cache[word] = lemma
+
+        return lemma
+
+
+    def __lemmatize_uncached(self, word: str, wn_word_type: str, custom_lemmas: dict):
+        # custom lemmatization
+        # e.g.: "men" should be lemmatized to "man", which is not performed by WordNet
+        if word in custom_lemmas:
+            return custom_lemmas[word]
 
+        return self.lemmatizer.lemmatize(word, wn_word_type)
 
-    def lemmatize_noun(self, noun: str):
-        noun = noun.lower()
 
-        # custom lemmatization
-        # e.g.: "men" should be lemmatized to "man", which is not performed by WordNet
-        if noun == "men":
-            return "man"
-        if noun == "bikers":
-            return "biker"
-        if noun == "businessmen":
-            return "businessman"
+    def lemmatize(self, word: str, word_type: str):
+        """
+        lemmatize a word of the given type (NOUN, VERB, ADJ, or ADV)
+        """
+        if word_type not in self.word_types:
+            exit("word type not known by WordNet")
+
+        stats_lib.count("lemmatizer_calls")
+        return self.__lemmatize(word.lower(), word_type)
 
-        wn_lemma = self.lemmatizer.lemmatize(noun, wn.NOUN)
 
-        return wn_lemma
+    def lemmatize_many(self, words, word_type: str):
+        """
+        lemmatize multiple words of the same type (NOUN, VERB, ADJ, or ADV), each distinct word is lemmatized only once
+        """
+        if word_type not in self.word_types:
+            exit("word type not known by WordNet")
+
+        lemmas = {}
+        for word in words:
+            word = word.lower()
+            if word not in lemmas:
+                stats_lib.count("lemmatizer_calls")
+                lemmas[word] = self.__lemmatize(word, word_type)
+
+        return [lemmas[word.lower()] for word in words]
+
+
+    def lemmatize_noun(self, noun: str):
+        stats_lib.count("lemmatizer_calls")
+        return self.__lemmatize(noun.lower(), NOUN)
 
 
     def lemmatize_verb(self, verb: str):
-        verb = verb.lower()
-
-        if verb in ["riding", "rides", "rode", "ride"]:
-            return "ride"
-        if verb in ["staring", "stares", "stared", "stare"]:
-            return "stare"
-        if verb in ["taping", "tapes", "taped", "tape"]:
-            return "tape"
-        if verb in ["falling", "falls", "fell", "fall"]:
-            return "fall"
-        if verb in ["bathing", "bathes", "bathed", "bathe"]:
-            return "bathe"
-        if verb in ["scraping", "scrapes", "scraped", "scrape"]:
-            return "scrape"
-        if verb in ["shining", "shines", "shone", "shine"]:
-            return "shine"
-        if verb in ["seeing", "sees", "saw", "see"]:
-            return "see"
-        if verb in ["feeding", "feeds", "fed", "feed"]:
-            return "feed"
-        if verb in ["moping", "mopes", "moped", "mope"]:
-            return "mope"
-        if verb in ["plating", "plates", "plated", "plate"]:
-            return "plate"
-        if verb in ["rating", "rates", "rated", "rate"]:
-            return "rate"
-
-        wn_lemma = self.lemmatizer.lemmatize(verb, wn.VERB)
-
-        return wn_lemma
+        stats_lib.count("lemmatizer_calls")
+        return self.__lemmatize(verb.lower(), VERB)
 
 
     def lemmatize_adjective(self, adj: str):
-        adj = adj.lower()
-
         # no custom lemmatizations
-        wn_lemma = self.lemmatizer.lemmatize(adj, wn.ADJ)
-
-        return wn_lemma
+        stats_lib.count("lemmatizer_calls")
+        return self.__lemmatize(adj.lower(), ADJ)
 
 
     def lemmatize_adverb(self, adv: str):
-        adv = adv.lower()
-
         # no custom lemmatizations
-        wn_lemma = self.lemmatizer.lemmatize(adv, wn.ADV)
+        stats_lib.count("lemmatizer_calls")
+        return self.__lemmatize(adv.lower(), ADV)
 
-        return wn_lemma
+
+    def cache_info(self):
+        """
+        hits, misses and current size of the lemma cache for each word type
+        """
+        return {
+            word_type: {
+                "hits": self.cache_hits[word_type],
+                "misses": self.cache_misses[word_type],
+                "size": len(self.lemma_caches[word_type])
+            }
+            for word_type in self.word_types
+        }
+
+
+    def cache_clear(self):
+        for word_type in self.word_types:
+            self.lemma_caches[word_type].clear()
+            self.cache_hits[word_type] = 0
+            self.cache_misses[word_type] = 0
 
 
 
@@ -164,3 +391,12 @@ def get_words_from_synsets(word: str, word_type: str, verbose: bool = False):
         print(lemmas)
 
     return lemmas
+
+
+@lru_cache(maxsize=SYNONYM_CACHE_SIZE)
+def get_synonyms(word: str, word_type: str) -> frozenset:
+    """
+    all WordNet words from the given word's synsets as a set (see get_words_from_synsets),
+    synonym sets are memoized, as evaluation looks up the synonyms of the same ground truth words over and over
+    """
+    return frozenset(get_words_from_synsets(word, word_type))
@@ -0,0 +1,42 @@
+import pytest
+
+from benchmarks.generate_corpora import CORPORA, get_corpus_path
+from src.corpus_lib import iter_videos
+
+
+@pytest.fixture(scope="session")
+def nlp():
+    """
+    shared language parser (tests that need it are skipped when spaCy, NeuralCoref or the model are not installed)
+    """
+    spacy = pytest.importorskip("spacy")
+    pytest.importorskip("neuralcoref")
+    from src import nlp_lib
+
+    if not spacy.util.is_package(nlp_lib.DEFAULT_MODEL):
+        pytest.skip(f"spaCy model {nlp_lib.DEFAULT_MODEL} is not installed")
+    nlp_lib.configure_parser()
+
+    return nlp_lib.get_nlp()
+
+
+@pytest.fixture(scope="session")
+def wordnet():
+    """
+    (WordNetDictionary, WordNetLemmatizerWrapped)
+    """
+    pytest.importorskip("nltk")
+    from src.wordnet_lib import WordNetDictionary, WordNetLemmatizerWrapped
+
+    try:
+        return WordNetDictionary(), WordNetLemmatizerWrapped()
+    except LookupError:
+        pytest.skip("WordNet is not installed")
+
+
+@pytest.fixture(scope="session")
+def benchmark_corpora():
+    """
+    (video_id, sentences, timestamps) tuples of each bundled benchmark corpus
+    """
+    return {name: list(iter_videos(get_corpus_path(name))) for name in CORPORA}
@@ -0,0 +1,42 @@
+import pytest
+
+
+@pytest.fixture
+def make_cache(tmp_path):
+    pytest.importorskip("spacy")
+    pytest.importorskip("neuralcoref")
+    from src import nlp_lib
+    from src.cache_lib import ExtractionCache
+
+    caches = []
+
+    def make(parser_config: dict = None, **kwargs):
+        nlp_lib.configure_parser(**(parser_config or {}))
+        cache = ExtractionCache(str(tmp_path / f"cache_{len(caches)}.sqlite"), model_version="model", **kwargs)
+        caches.append(cache)
+        return cache
+
+    yield make
+    for cache in caches:
+        cache.close()
+    nlp_lib.configure_parser()
+
+
+SENTENCES = ["A man is holding a ball.", "The dog jumps over a table."]
+TIMESTAMPS = [[0.0, 2.0], [1.0, 3.0]]
+
+
+def test_key_does_not_depend_on_event_order(make_cache):
+    cache = make_cache()
+    assert cache.key(SENTENCES, TIMESTAMPS) == cache.key(SENTENCES[::-1], TIMESTAMPS[::-1])
+
+
+@pytest.mark.parametrize("parser_config, kwargs", [
+    ({}, {"dedup_sentences": True}),
+    ({}, {"relation_engine": "arrays"}),
+    ({"coref": False}, {}),
+    ({"disable": ("ner",)}, {})
+])
+def test_key_depends_on_extraction_mode(make_cache, parser_config, kwargs):
+    default_key = make_cache().key(SENTENCES, TIMESTAMPS)
+    assert make_cache(parser_config, **kwargs).key(SENTENCES, TIMESTAMPS) != default_key
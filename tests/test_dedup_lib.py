@@ -0,0 +1,24 @@
+import pytest
+
+from benchmarks.generate_corpora import CORPORA
+
+
+@pytest.mark.parametrize("corpus", list(CORPORA))
+def test_deduplicated_extraction_matches_extract_videos(nlp, wordnet, benchmark_corpora, corpus):
+    from src.dedup_lib import SentenceCache, extract_videos_deduplicated
+    from src.extraction_lib import extract_videos
+
+    wn_dictionary, wn_lemmatizer = wordnet
+    videos = benchmark_corpora[corpus]
+    sentence_cache = SentenceCache(wn_dictionary, wn_lemmatizer)
+    deduplicated = list(extract_videos_deduplicated(videos, wn_dictionary, wn_lemmatizer,
+                                                    sentence_cache=sentence_cache))
+    expected = list(extract_videos(videos, wn_dictionary, wn_lemmatizer))
+
+    assert [video_id for video_id, _ in deduplicated] == [video_id for video_id, _ in expected]
+    mismatches = [
+        video_id for (video_id, result), (_, expected_result) in zip(deduplicated, expected)
+        if (result.to_dict() if result is not None else None) !=
+           (expected_result.to_dict() if expected_result is not None else None)
+    ]
+    assert len(mismatches) == 0, f"{len(mismatches)} videos differ, e.g., {mismatches[:5]}"
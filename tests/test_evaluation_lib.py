@@ -0,0 +1,80 @@
+import random
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("nltk")
+
+from src.semantic_metadata.entity_property import EntityPropertyPair
+from src.semantic_metadata.event_entity import EventEntity
+from src.semantic_metadata.event_relation import EventRelation
+from src.semantic_metadata.extraction_result import ExtractionResult
+from src.semantic_metadata.video_entity import VideoEntity
+from src.semantic_metadata.video_relation import VideoRelation
+from src.utils import calculate_iou
+
+# words with lemmas and synonyms among each other (e.g., men -> man, dog -> domestic_dog)
+NOUNS = ["man", "men", "boy", "person", "dog", "dogs", "domestic_dog", "car", "auto", "ball"]
+PROPERTIES = ["red", "large", "big", "small", "car"]
+VERBS = ["run", "runs", "ran", "walk", "walks", "hold", "throw"]
+MODIFIERS = ["in", "on", "up"]
+# segments with touching endpoints, zero length, containment and equal segments
+SEGMENTS = [[0.0, 1.0], [1.0, 2.0], [0.0, 2.0], [1.0, 1.0], [0.5, 1.5], [0.0, 4.0], [3.0, 10.0], [2.5, 7.3]]
+# IoU thresholds, including IoUs of segment pairs, i.e., IoUs that are exactly equal to the threshold
+IOU_THRESHOLDS = sorted({0.0, 0.3, 0.5, 0.7, 1.0} | {
+    calculate_iou(SEGMENTS[i], SEGMENTS[j]) for i, j in [(0, 2), (0, 4), (2, 5), (4, 2), (6, 7)]})
+
+
+def random_relation(rng: random.Random):
+    return ([rng.choice(NOUNS) for _ in range(rng.randint(1, 2))], rng.choice(VERBS),
+            rng.sample(MODIFIERS, rng.randint(0, 2)), [rng.choice(NOUNS) for _ in range(rng.randint(1, 2))])
+
+
+def random_result(rng: random.Random):
+    return ExtractionResult(
+        video_level_entities=[VideoEntity(rng.choice(NOUNS)) for _ in range(rng.randint(0, 5))],
+        event_level_entities=[EventEntity(rng.choice(NOUNS), rng.choice(SEGMENTS)) for _ in range(rng.randint(0, 6))],
+        entity_property_pairs=[EntityPropertyPair(rng.choice(NOUNS), rng.choice(PROPERTIES))
+                               for _ in range(rng.randint(0, 4))],
+        video_level_relations=[VideoRelation(*random_relation(rng)) for _ in range(rng.randint(0, 4))],
+        event_level_relations=[EventRelation(*random_relation(rng), rng.choice(SEGMENTS))
+                               for _ in range(rng.randint(0, 5))]
+    )
+
+
+@pytest.mark.parametrize("with_synonyms", [True, False])
+def test_match_matrices_equal_predicts(wordnet, with_synonyms):
+    from src.evaluation_lib import CorpusEvaluator
+
+    _, wn_lemmatizer = wordnet
+    evaluator = CorpusEvaluator(wn_lemmatizer, IOU_THRESHOLDS, with_synonyms)
+    rng = random.Random(0)
+    n_matches = 0
+    for _ in range(200):
+        prediction, ground_truth = random_result(rng), random_result(rng)
+        match = evaluator.match_matrices(prediction, ground_truth)
+
+        for category in ["video_level_entities", "entity_property_pairs", "video_level_relations"]:
+            for i, p in enumerate(getattr(prediction, category)):
+                for j, g in enumerate(getattr(ground_truth, category)):
+                    assert match[category][i, j] == p.predicts(g, wn_lemmatizer, with_synonyms), (category, p, g)
+                    n_matches += match[category][i, j]
+
+        for category in ["event_level_entities", "event_level_relations"]:
+            for t, iou in enumerate(IOU_THRESHOLDS):
+                for i, p in enumerate(getattr(prediction, category)):
+                    for j, g in enumerate(getattr(ground_truth, category)):
+                        assert match[category][i, j, t] == p.predicts(g, iou, wn_lemmatizer, with_synonyms), \
+                            (category, iou, p, g)
+                        n_matches += match[category][i, j, t]
+
+    assert n_matches > 0
+
+
+def test_iou_matrix_equals_calculate_iou():
+    from src.evaluation_lib import iou_matrix
+
+    iou = iou_matrix(SEGMENTS, SEGMENTS)
+    for i, a in enumerate(SEGMENTS):
+        for j, b in enumerate(SEGMENTS):
+            assert iou[i, j] == calculate_iou(a, b)
@@ -0,0 +1,98 @@
+import random
+
+import pytest
+
+pytest.importorskip("nltk")
+
+from src.interval_lib import IntervalTree, TemporalIndex
+from src.semantic_metadata.event_entity import EventEntity
+from src.semantic_metadata.event_relation import EventRelation
+from src.semantic_metadata.extraction_result import ExtractionResult
+from src.utils import calculate_iou
+
+# endpoints on a coarse grid, i.e., many touching endpoints, zero-length segments and duplicate intervals
+GRID = [0.0, 0.5, 1.0, 1.5, 2.0, 3.0, 4.5, 7.25, 10.0]
+
+
+def random_intervals(rng: random.Random, n: int) -> list:
+    intervals = []
+    for _ in range(n):
+        start, end = sorted(rng.sample(GRID, 2)) if rng.random() < 0.8 else [rng.choice(GRID)] * 2
+        intervals.append([start, end])
+        if rng.random() < 0.2:
+            intervals.append([start, end])
+
+    return intervals
+
+
+def scan_at(intervals: list, t: float) -> list:
+    return [idx for idx, (start, end) in enumerate(intervals) if start <= t <= end]
+
+
+def scan_overlapping(intervals: list, start: float, end: float) -> list:
+    return [idx for idx, (s, e) in enumerate(intervals) if s <= end and e >= start]
+
+
+def scan_matching(intervals: list, segment: list, min_iou: float) -> list:
+    return [idx for idx, interval in enumerate(intervals) if calculate_iou(interval, segment) >= min_iou]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_interval_tree_equals_linear_scan(seed):
+    rng = random.Random(seed)
+    intervals = random_intervals(rng, rng.randint(0, 40))
+    tree = IntervalTree(intervals)
+    assert len(tree) == len(intervals)
+
+    times = GRID + [-1.0, 0.25, 2.5, 11.0]
+    segments = [[start, end] for start in times for end in times if start <= end]
+    # IoUs of the intervals with the segments, i.e., thresholds that are exactly reached
+    thresholds = [0.0, 0.2, 0.5, 1.0] + [calculate_iou(rng.choice(intervals), rng.choice(segments))
+                                         for _ in range(5) if len(intervals) > 0]
+
+    for t in times:
+        assert tree.at(t) == scan_at(intervals, t), t
+    for start, end in segments:
+        assert tree.overlapping(start, end) == scan_overlapping(intervals, start, end), (start, end)
+    for min_iou in thresholds:
+        for segment in segments:
+            assert tree.matching(segment, min_iou) == scan_matching(intervals, segment, min_iou), (segment, min_iou)
+
+    assert tree.at_many(times) == [scan_at(intervals, t) for t in times]
+    assert tree.overlapping_many(segments) == [scan_overlapping(intervals, start, end) for start, end in segments]
+    for min_iou in thresholds:
+        assert tree.matching_many(segments, min_iou) == [scan_matching(intervals, s, min_iou) for s in segments]
+
+
+def test_interval_tree_returns_values_in_input_order():
+    tree = IntervalTree([[2.0, 3.0], [0.0, 5.0], [2.0, 3.0], [3.0, 3.0]], ["a", "b", "c", "d"])
+
+    assert tree.at(3.0) == ["a", "b", "c", "d"]
+    assert tree.overlapping(3.5, 4.0) == ["b"]
+    assert tree.matching([2.0, 3.0], 1.0 - 1e-6) == ["a", "c"]
+    assert IntervalTree([]).at(0.0) == []
+
+
+def test_temporal_index_equals_linear_scan():
+    rng = random.Random(0)
+    entity_segments = random_intervals(rng, 30)
+    relation_segments = random_intervals(rng, 30)
+    entities = [EventEntity(f"entity_{idx}", segment) for idx, segment in enumerate(entity_segments)]
+    relations = [EventRelation([f"subject_{idx}"], "run", [], ["object"], segment)
+                 for idx, segment in enumerate(relation_segments)]
+    index = TemporalIndex(ExtractionResult([], entities, [], [], relations))
+
+    times = GRID + [0.25, 2.5]
+    for t in times:
+        assert index.at(t) == ([entities[idx] for idx in scan_at(entity_segments, t)],
+                               [relations[idx] for idx in scan_at(relation_segments, t)])
+    assert index.timeline(times) == [index.at(t) for t in times]
+
+    for start, end in [[0.0, 1.0], [1.0, 1.0], [2.5, 7.25], [-1.0, 11.0]]:
+        assert index.overlapping(start, end) == (
+            [entities[idx] for idx in scan_overlapping(entity_segments, start, end)],
+            [relations[idx] for idx in scan_overlapping(relation_segments, start, end)])
+        for min_iou in [0.0, 0.3, 1.0]:
+            assert index.matching([start, end], min_iou) == (
+                [entities[idx] for idx in scan_matching(entity_segments, [start, end], min_iou)],
+                [relations[idx] for idx in scan_matching(relation_segments, [start, end], min_iou)])
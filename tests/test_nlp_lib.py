@@ -0,0 +1,114 @@
+from types import SimpleNamespace
+
+import pytest
+
+spacy = pytest.importorskip("spacy")
+pytest.importorskip("neuralcoref")
+
+from spacy.tokens import Doc
+from spacy.vocab import Vocab
+
+from src import nlp_lib
+
+
+requires_model = pytest.mark.skipif(not spacy.util.is_package(nlp_lib.DEFAULT_MODEL),
+                                    reason=f"spaCy model {nlp_lib.DEFAULT_MODEL} is not installed")
+
+
+@pytest.fixture
+def parser_config():
+    yield nlp_lib.configure_parser
+    nlp_lib.configure_parser()
+
+
+@requires_model
+@pytest.mark.parametrize("coref", [True, False])
+def test_model_version_does_not_depend_on_created_parser(parser_config, coref):
+    parser_config(coref=coref)
+    version_of_config = nlp_lib.get_model_version()
+    nlp_lib.get_nlp()
+    version_of_parser = nlp_lib.get_model_version()
+
+    assert version_of_config == version_of_parser
+    pipeline = version_of_parser.split("|")[-1].split(",")
+    assert len(pipeline) == len(set(pipeline))
+    assert ("neuralcoref" in pipeline) == coref
+
+
+def make_doc(words: list, pos: list, clusters: list):
+    """
+    doc with the given POS tags and coreference clusters, given as (main, [mentions]) of (start, end) token spans
+    """
+    doc = Doc(Vocab(), words=words)
+    for token, tag in zip(doc, pos):
+        token.pos_ = tag
+    doc._.coref_clusters = [
+        SimpleNamespace(main=doc[main[0]:main[1]], mentions=[doc[start:end] for start, end in mentions])
+        for main, mentions in clusters
+    ]
+    doc._.has_coref = len(clusters) > 0
+
+    return doc
+
+
+def test_pronoun_resolution_single_cluster():
+    doc = make_doc(["man", "rides", "and", "he", "smiles"], ["NOUN", "VERB", "CCONJ", "PRON", "VERB"],
+                   [((0, 1), [(0, 1), (3, 4)])])
+
+    assert nlp_lib.pronoun_resolution(doc[3], doc) == doc[0]
+    assert nlp_lib.get_coref_index(doc) == {0: 0, 3: 0}
+
+
+def test_pronoun_resolution_first_cluster_wins():
+    doc = make_doc(["man", "rides", "bike", "and", "it", "shines"], ["NOUN", "VERB", "NOUN", "CCONJ", "PRON", "VERB"],
+                   [((2, 3), [(2, 3), (4, 5)]), ((0, 1), [(0, 1), (4, 5)])])
+
+    assert nlp_lib.pronoun_resolution(doc[4], doc) == doc[2]
+
+
+def test_pronoun_resolution_unresolved_pronoun():
+    doc = make_doc(["man", "rides", "and", "they", "smile"], ["NOUN", "VERB", "CCONJ", "PRON", "VERB"],
+                   [((0, 1), [(0, 1)])])
+    assert nlp_lib.pronoun_resolution(doc[3], doc) == doc[3]
+
+    doc = make_doc(["they", "smile"], ["PRON", "VERB"], [])
+    assert nlp_lib.pronoun_resolution(doc[0], doc) == doc[0]
+
+
+def test_pronoun_resolution_passes_non_pronouns_through():
+    doc = make_doc(["man", "rides", "and", "person", "smiles"], ["NOUN", "VERB", "CCONJ", "NOUN", "VERB"],
+                   [((0, 1), [(0, 1), (3, 4)])])
+
+    assert nlp_lib.pronoun_resolution(doc[3], doc) == doc[3]
+    assert nlp_lib.pronoun_resolution(doc[1], doc) == doc[1]
+
+
+@pytest.fixture
+def without_coref_extension():
+    """
+    remove the has_coref extension of NeuralCoref (registered by parsers created before) and restore it afterwards
+    """
+    removed = Doc.remove_extension("has_coref") if Doc.has_extension("has_coref") else None
+    yield
+    if removed is not None:
+        default, method, getter, setter = removed
+        kwargs = {name: f for name, f in [("method", method), ("getter", getter), ("setter", setter)] if f is not None}
+        if method is None and getter is None:
+            kwargs["default"] = default
+        Doc.set_extension("has_coref", force=True, **kwargs)
+
+
+@requires_model
+@pytest.mark.parametrize("relation_engine", ["tokens", "arrays"])
+def test_extraction_of_pronouns_without_coref(parser_config, wordnet, without_coref_extension, relation_engine):
+    from src.extraction_lib import extract_all
+
+    parser_config(coref=False)
+    doc = nlp_lib.parse(["A man is holding a red ball.", "He throws the ball to a dog."])
+    assert "neuralcoref" not in nlp_lib.get_nlp().pipe_names
+    assert nlp_lib.get_coref_index(doc) == {}
+
+    result = extract_all(doc, [[0.0, 2.0], [2.0, 4.0]], *wordnet, relation_engine=relation_engine)
+    # the pronoun can not be resolved, i.e., it neither becomes an entity nor the subject of a relation
+    assert {"man", "ball", "dog"} <= {e.name for e in result.video_level_entities}
+    assert all(r.verb != "throws" for r in result.video_level_relations)
@@ -0,0 +1,25 @@
+import pytest
+
+from benchmarks.generate_corpora import CORPORA
+
+
+def get_relations(result):
+    if result is None:
+        return None
+
+    return ([r.to_dict() for r in result.video_level_relations],
+            [r.to_dict() for r in result.event_level_relations])
+
+
+@pytest.mark.parametrize("corpus", list(CORPORA))
+def test_array_engine_matches_token_engine(nlp, wordnet, benchmark_corpora, corpus):
+    from src.extraction_lib import extract_videos
+
+    wn_dictionary, wn_lemmatizer = wordnet
+    videos = benchmark_corpora[corpus]
+    expected = list(extract_videos(videos, wn_dictionary, wn_lemmatizer, relation_engine="tokens"))
+    results = list(extract_videos(videos, wn_dictionary, wn_lemmatizer, relation_engine="arrays"))
+
+    assert [video_id for video_id, _ in results] == [video_id for video_id, _ in expected]
+    for (video_id, result), (_, expected_result) in zip(results, expected):
+        assert get_relations(result) == get_relations(expected_result), f"relations of {video_id} differ"
@@ -0,0 +1,82 @@
+import re
+
+# irregular forms and forms that NLTK versions with repeated suffix replacements lemmatize in several steps
+EXTRA_WORDS = ["geese", "men", "businessmen", "t-shirts", "boxeses", "boxeseses", "glasseses", "churches", "knives",
+               "ladies"]
+
+
+def get_windows(benchmark_corpora, max_length: int = 4):
+    """
+    sequences of up to max_length consecutive words of the sentences of the benchmark corpora, and each word of the
+    sentences followed by each of EXTRA_WORDS
+    """
+    windows = {(word,) for word in EXTRA_WORDS}
+    for videos in benchmark_corpora.values():
+        for _, sentences, _ in videos:
+            for sentence in sentences:
+                words = re.findall(r"[a-z]+(?:-[a-z]+)*", sentence.lower())
+                for i in range(len(words)):
+                    windows.update(tuple(words[i:j]) for j in range(i + 1, min(i + max_length, len(words)) + 1))
+                    windows.update((words[i], word) for word in EXTRA_WORDS)
+
+    return sorted(windows)
+
+
+def test_irregular_noun_forms(wordnet):
+    from src.wordnet_lib import get_irregular_noun_forms
+
+    irregular_forms = get_irregular_noun_forms()
+    assert "geese" in irregular_forms
+    assert "dogs" not in irregular_forms
+
+
+def test_noun_prefix_pruning_agrees_with_unpruned_lemmatization(wordnet, benchmark_corpora):
+    """
+    compound detection grows a candidate token by token and stops once the prefix index rules out that it can become a
+    WordNet noun, i.e., the pruned check has to accept exactly the candidates that the unpruned check accepts
+    """
+    wn_dictionary, wn_lemmatizer = wordnet
+    prefix_index = wn_dictionary.noun_prefix_index
+
+    n_accepted = 0
+    for window in get_windows(benchmark_corpora):
+        for separator in ["_", "-", ""]:
+            candidate = separator.join(window)
+            accepted = candidate in wn_dictionary.nouns \
+                or wn_lemmatizer.lemmatize_noun(candidate) in wn_dictionary.nouns
+            accepted_pruned = accepted and all(
+                prefix_index.may_be_noun(separator.join(window[:k])) for k in range(1, len(window) + 1))
+
+            assert accepted_pruned == accepted, f"{candidate} is pruned, but lemmatized to a WordNet noun"
+            n_accepted += accepted
+
+    assert n_accepted > 0
+
+
+def test_lemmatize_many_equals_lemmatize(wordnet):
+    from src.wordnet_lib import NOUN, VERB
+
+    _, wn_lemmatizer = wordnet
+    words = ["Men", "dogs", "men", "geese", "Dogs", "t-shirts"]
+    assert wn_lemmatizer.lemmatize_many(words, NOUN) == [wn_lemmatizer.lemmatize(w, NOUN) for w in words]
+    assert wn_lemmatizer.lemmatize_many(["running", "ran"], VERB) == ["run", "run"]
+    assert wn_lemmatizer.lemmatize_many([], NOUN) == []
+
+
+def test_lemma_cache_evicts_least_recently_used(wordnet):
+    import pickle
+
+    from src.wordnet_lib import NOUN, WordNetLemmatizerWrapped
+
+    wn_lemmatizer = WordNetLemmatizerWrapped(cache_size=2)
+    wn_lemmatizer.lemmatize_noun("dogs")
+    wn_lemmatizer.lemmatize_noun("cats")
+    wn_lemmatizer.lemmatize_noun("dogs")  # hit, "cats" becomes the least recently used word
+    wn_lemmatizer.lemmatize_noun("geese")
+    assert list(wn_lemmatizer.lemma_caches[NOUN]) == ["dogs", "geese"]
+    assert wn_lemmatizer.cache_info()[NOUN] == {"hits": 1, "misses": 3, "size": 2}
+
+    # the lemmatizer (including its caches) can be sent to worker processes
+    unpickled = pickle.loads(pickle.dumps(wn_lemmatizer))
+    assert unpickled.lemmatize_noun("geese") == "goose"
+    assert list(unpickled.lemma_caches[NOUN]) == ["dogs", "geese"]